@@ -0,0 +1,650 @@
+import base64
+import numpy as np
+
+# base64 alphabet as a lookup table for the vectorized encoder
+_B64_ALPHABET = np.frombuffer(b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/', dtype=np.uint8)
+_B64_PAD = ord('=')
+
+
+def b64encode_array(values):
+    '''
+    Base64 encode every element of a fixed-width bytes array in one go.
+    Returns a tuple (encoded, lengths) where encoded is a 2-D uint8 array with one
+    zero-padded row per value and lengths holds the number of valid bytes in each row.
+
+    Parameters
+        ----------
+        values : numpy.ndarray
+            1-D array of dtype 'S<n>' (values must not contain NUL bytes)
+    '''
+    values = np.ascontiguousarray(values)
+    count = len(values)
+    width = max(values.dtype.itemsize, 1)
+    lengths = np.char.str_len(values).astype(np.int64) if count else np.zeros(0, dtype=np.int64)
+    groups = -(-width // 3)
+
+    raw = np.zeros((count, groups * 3), dtype=np.uint8)
+    raw[:, :values.dtype.itemsize] = values.view(np.uint8).reshape(count, values.dtype.itemsize)
+    raw = raw.reshape(count, groups, 3).astype(np.uint32)
+    triple = (raw[..., 0] << 16) | (raw[..., 1] << 8) | raw[..., 2]
+    sextets = np.stack([(triple >> 18) & 63, (triple >> 12) & 63, (triple >> 6) & 63, triple & 63], axis=-1)
+    encoded = _B64_ALPHABET[sextets].reshape(count, groups * 4)
+
+    # padding: one leftover byte -> "==", two leftover bytes -> "="
+    out_lengths = (lengths + 2) // 3 * 4
+    remainder = lengths % 3
+    rows = np.nonzero(remainder == 1)[0]
+    encoded[rows, out_lengths[rows] - 2] = _B64_PAD
+    encoded[rows, out_lengths[rows] - 1] = _B64_PAD
+    rows = np.nonzero(remainder == 2)[0]
+    encoded[rows, out_lengths[rows] - 1] = _B64_PAD
+    return encoded, out_lengths
+
+
+def bytes_array(values):
+    '''
+    Raw bytes of every element of a fixed-width bytes array, in the (encoded, lengths) form
+    b64encode_array returns - for payloads that carry values unencoded (protobuf)
+    '''
+    values = np.ascontiguousarray(values)
+    count = len(values)
+    width = values.dtype.itemsize
+    lengths = np.char.str_len(values).astype(np.int64) if count else np.zeros(0, dtype=np.int64)
+    return values.view(np.uint8).reshape(count, width), lengths
+
+
+def varint_array(values):
+    '''
+    Protobuf varint encoding of every element of a non-negative integer array in one go,
+    in the (encoded, lengths) form b64encode_array returns so it can go straight into join_segments
+    '''
+    values = np.asarray(values, dtype=np.uint64)
+    count = len(values)
+    lengths = np.ones(count, dtype=np.int64)
+    rest = values >> np.uint64(7)
+    while rest.any():
+        lengths += rest > 0
+        rest >>= np.uint64(7)
+    width = int(lengths.max()) if count else 1
+    encoded = np.zeros((count, width), dtype=np.uint8)
+    rest = values.copy()
+    for i in range(width):
+        encoded[:, i] = (rest & np.uint64(0x7f)).astype(np.uint8) | ((lengths > i + 1).astype(np.uint8) << 7)
+        rest >>= np.uint64(7)
+    return encoded, lengths
+
+
+def varint_length(values):
+    '''
+    Number of bytes the protobuf varint encoding of every element takes
+    '''
+    values = np.asarray(values, dtype=np.int64)
+    lengths = np.ones(len(values), dtype=np.int64)
+    for limit in (1 << 7, 1 << 14, 1 << 21, 1 << 28):
+        lengths += values >= limit
+    return lengths
+
+
+def join_segments(constants, variables):
+    '''
+    Interleave constant byte strings with per-row variable segments and flatten the result.
+    Every row is laid out as constants[0] + variables[0] + constants[1] + ... + constants[-1].
+
+    Parameters
+        ----------
+        constants : list of bytes
+            len(variables) + 1 constant pieces shared by every row
+        variables : list of (encoded, lengths) tuples
+            as returned by b64encode_array, all with the same number of rows
+    '''
+    row_count = len(variables[0][1])
+    blocks = []
+    masks = []
+    for index, const in enumerate(constants):
+        const_arr = np.frombuffer(const, dtype=np.uint8)
+        blocks.append(np.broadcast_to(const_arr, (row_count, len(const_arr))))
+        masks.append(np.ones((row_count, len(const_arr)), dtype=bool))
+        if index < len(variables):
+            encoded, lengths = variables[index]
+            blocks.append(encoded)
+            masks.append(np.arange(encoded.shape[1]) < lengths[:, None])
+    matrix = np.concatenate(blocks, axis=1)
+    mask = np.concatenate(masks, axis=1)
+    return matrix[mask].tobytes()
+
+
+def common_dtype(arrays):
+    '''
+    dtype a pandas DataFrame built from these columns would report for a whole row
+    (what df.iterrows() hands back). Mixed numeric columns promote to the widest numeric
+    type, anything involving bool or object columns falls back to object.
+    '''
+    dtypes = [np.asarray(a).dtype for a in arrays]
+    if dtypes and all(d.kind in 'iuf' for d in dtypes):
+        return np.result_type(*dtypes)
+    return np.dtype(object)
+
+
+def format_values(values, dtype):
+    '''
+    Convert a column to a fixed-width bytes array holding str() of each value, exactly
+    as str() renders the Python scalars pandas yields for a row of the given dtype.
+    '''
+    values = np.asarray(values)
+    if dtype.kind == 'f':
+        # float32 channels come back from pandas as Python floats, so format at double precision.
+        # CPython's float repr is both the reference and faster than numpy's own float -> str cast
+        return np.array(list(map(float.__repr__, values.astype(np.float64).tolist())), dtype='S')
+    if dtype.kind in 'iu':
+        return values.astype(dtype).astype('S')
+    return np.array([str(v).encode('utf-8') for v in values.tolist()], dtype='S')
+
+
+# base64 alphabet -> 6-bit value lookup table for the vectorized decoder ('=' maps to 0)
+_B64_VALUES = np.zeros(256, dtype=np.uint32)
+_B64_VALUES[_B64_ALPHABET] = np.arange(64, dtype=np.uint32)
+_SEPARATOR = ord(' ')
+
+
+def _separate(decoded, lengths):
+    '''
+    Put a space after every value of a concatenated buffer, returns (buffer, starts, lengths)
+    '''
+    ends = np.cumsum(lengths)
+    starts = ends - lengths + np.arange(len(lengths))
+    return np.insert(decoded, ends, _SEPARATOR), starts, lengths
+
+
+def b64decode_values(values):
+    '''
+    Base64 decode a list of str values (eg. the "$" of scanner cells) in one go - the inverse of b64encode_array.
+    Returns a tuple (decoded, starts, lengths) where decoded is a 1-D uint8 array holding every
+    decoded value followed by a space, and value i is decoded[starts[i]:starts[i] + lengths[i]].
+    '''
+    count = len(values)
+    text = np.frombuffer(''.join(values).encode('ascii'), dtype=np.uint8)
+    quads = text.reshape(-1, 4)
+    sextets = _B64_VALUES[quads]
+    triple = (sextets[:, 0] << 18) | (sextets[:, 1] << 12) | (sextets[:, 2] << 6) | sextets[:, 3]
+    raw = np.stack([triple >> 16, triple >> 8, triple], axis=-1).astype(np.uint8)
+    # padding: "==" -> one byte in the last group, "=" -> two
+    valid = np.ones(raw.shape, dtype=bool)
+    valid[:, 1] = quads[:, 2] != _B64_PAD
+    valid[:, 2] = quads[:, 3] != _B64_PAD
+    b64_lengths = np.fromiter(map(len, values), dtype=np.int64, count=count)
+    lengths = b64_lengths // 4 * 3
+    filled = np.nonzero(b64_lengths)[0]
+    last = np.cumsum(b64_lengths)[filled] // 4 - 1
+    lengths[filled] -= (quads[last, 2] == _B64_PAD).astype(np.int64) + (quads[last, 3] == _B64_PAD)
+    return _separate(raw[valid], lengths)
+
+
+def join_values(values):
+    '''
+    Raw bytes values (eg. protobuf scanner cells) in the (decoded, starts, lengths) form b64decode_values returns
+    '''
+    lengths = np.fromiter(map(len, values), dtype=np.int64, count=len(values))
+    return _separate(np.frombuffer(b''.join(values), dtype=np.uint8), lengths)
+
+
+def parse_values(decoded, starts, lengths, dtype):
+    '''
+    Parse the text values of a (decoded, starts, lengths) buffer as written by format_values
+    into an array of dtype - floats are read by NumPy's parser in a single pass, integers straight
+    into dtype (so 64-bit values above 2**53 stay exact), bools from their first character
+    ("True" / "1"), anything else is returned as str objects.
+    '''
+    dtype = np.dtype(dtype)
+    count = len(starts)
+    if dtype.kind in 'iu':
+        values = decoded.tobytes().split()
+        if len(values) != count:
+            raise Exception(f"Expected {count} numeric values, parsed {len(values)}")
+        return np.array(values, dtype=dtype)
+    if dtype.kind == 'f':
+        parsed = np.fromstring(decoded.tobytes(), dtype=np.float64, sep=' ') if count else np.zeros(0)
+        if len(parsed) != count:
+            raise Exception(f"Expected {count} numeric values, parsed {len(parsed)}")
+        return parsed.astype(dtype)
+    if dtype.kind == 'b':
+        first = decoded[starts]
+        return (first == ord('T')) | (first == ord('1'))
+    blob = decoded.tobytes()
+    return np.array([blob[start:start + length].decode('utf-8') for start, length in zip(starts.tolist(), lengths.tolist())], dtype=object)
+
+
+class TelemetryRowEncoder():
+    '''
+    Column-at-a-time encoder for the HBase REST {"Row":[...]} payload.
+    Produces byte-identical output to building each row with string concatenation over
+    df.iterrows(), without ever materializing per-row Python objects.
+    With wire_format="protobuf" the same rows are produced as a protobuf CellSet instead
+    (identical cell values, no base64).
+
+    Parameters
+        ----------
+        column_family : str
+            column family every cell is written to (eg. "telemetry")
+        columns : list of str
+            telemetry channels to write, in cell order
+        row_key_prefix : str
+            prefix of every row key, the row index is appended (eg. "<uuid>:")
+        constant_cells : list of (qualifier, value) tuples
+            cells with the same value on every row, written before the telemetry channels
+        chunk_rows : int
+            number of rows encoded per vectorized pass (bounds temporary memory)
+    '''
+    def __init__(self, column_family, columns, row_key_prefix, constant_cells=(), chunk_rows=4096):
+        self.column_family = column_family
+        self.columns = list(columns)
+        self.row_key_prefix = row_key_prefix.encode('utf-8')
+        self.chunk_rows = chunk_rows
+
+        # encode column qualifiers (and constant values) once per file
+        cells = b''
+        for qualifier, value in constant_cells:
+            cells += b'{"column":"' + self._b64(column_family + ":" + str(qualifier)) + b'","$":"' + self._b64(str(value)) + b'"},'
+        self.constants = [b', {"key":"']
+        separator = b'","Cell":[' + cells
+        for col_name in self.columns:
+            self.constants.append(separator + b'{"column":"' + self._b64(column_family + ":" + str(col_name)) + b'","$":"')
+            separator = b'"},'
+        self.constants.append(b'"}]}' if self.columns else b'","Cell":[' + cells[:-1] + b']}')
+
+        # protobuf: constant cells and the "column" part of every channel cell
+        self.pb_constant_cells = b''.join(_field(2, encode_cell(column_family + ":" + str(qualifier), str(value))) for qualifier, value in constant_cells)
+        self.pb_columns = [_field(2, (column_family + ":" + str(col_name)).encode('utf-8')) + b'\x22' for col_name in self.columns]
+
+    @staticmethod
+    def _b64(text):
+        return base64.b64encode(text.encode('utf-8'))
+
+    def _column_arrays(self, data):
+        return [np.asarray(data[col_name]) for col_name in self.columns]
+
+    def iter_rows(self, data, start=0, stop=None, chunk_rows=None, wire_format="json"):
+        '''
+        Generator over rows [start, stop) of data, yielding (chunk_start, chunk_stop, fragment) where
+        fragment is the comma separated row definitions for that chunk (no {"Row":[ ]} wrapper).
+        Row keys are row_key_prefix + row position.
+        With wire_format="protobuf" fragment is bytes holding the encoded CellSet rows
+        (fragments simply concatenate into a CellSet).
+
+        Parameters
+            ----------
+            data : pandas.DataFrame or dict of 1-D arrays
+                must contain every column passed to the constructor
+            chunk_rows : int
+                rows per yielded fragment, defaults to the encoder's chunk_rows
+            wire_format : str
+                "json" or "protobuf"
+        '''
+        arrays = self._column_arrays(data)
+        dtype = common_dtype(arrays)
+        total = len(arrays[0]) if arrays else len(data)
+        stop = total if stop is None else min(stop, total)
+        chunk_rows = chunk_rows or self.chunk_rows
+        for chunk_start in range(start, stop, chunk_rows):
+            chunk_stop = min(chunk_start + chunk_rows, stop)
+            keys = np.char.add(self.row_key_prefix, np.arange(chunk_start, chunk_stop).astype('S'))
+            if wire_format == "protobuf":
+                values = [format_values(column[chunk_start:chunk_stop], dtype) for column in arrays]
+                yield chunk_start, chunk_stop, self._protobuf_rows(keys, values)
+                continue
+            variables = [b64encode_array(keys)]
+            for values in arrays:
+                variables.append(b64encode_array(format_values(values[chunk_start:chunk_stop], dtype)))
+            yield chunk_start, chunk_stop, join_segments(self.constants, variables)[2:].decode('utf-8')
+
+    def _protobuf_rows(self, keys, columns):
+        '''
+        CellSet rows for a chunk: per row field 1 (Row) holding the key and one Cell per constant
+        cell and channel. Only the length prefixes differ between rows, so they are built as
+        varint arrays and interleaved with the constant pieces by join_segments.
+        '''
+        key = bytes_array(keys)
+        constants = [b'\x0a', b'\x0a', b'', self.pb_constant_cells]
+        variables = [None, varint_array(key[1]), key]
+        row_length = 1 + varint_length(key[1]) + key[1] + len(self.pb_constant_cells)
+        for pb_column, values in zip(self.pb_columns, columns):
+            value = bytes_array(values)
+            cell_length = len(pb_column) + varint_length(value[1]) + value[1]
+            row_length += 1 + varint_length(cell_length) + cell_length
+            constants[-1] += b'\x12'
+            constants += [pb_column, b'', b'']
+            variables += [varint_array(cell_length), varint_array(value[1]), value]
+        variables[0] = varint_array(row_length)
+        return join_segments(constants, variables)
+
+    def encode_rows(self, data, start=0, stop=None):
+        '''
+        Encode rows [start, stop) of data as one string of comma separated row definitions
+        '''
+        return ', '.join(fragment for _, _, fragment in self.iter_rows(data, start, stop))
+
+    def encode_payload(self, data, start=0, stop=None, wire_format="json"):
+        '''
+        Full REST payload for rows [start, stop) of data, ready for HBaseRestTable.insert:
+        {"Row":[...]} text, or CellSet bytes with wire_format="protobuf"
+        '''
+        if wire_format == "protobuf":
+            return b''.join(fragment for _, _, fragment in self.iter_rows(data, start, stop, wire_format=wire_format))
+        return '{"Row":[' + self.encode_rows(data, start, stop) + ']}'
+
+
+def block_dtype(dtype):
+    '''
+    Storage dtype of a channel in a sample block: doubles stay float64 (lat/lon, session time),
+    other floats become little-endian float32 and everything else (ints, bitfields, bools) int32
+    '''
+    dtype = np.dtype(dtype)
+    if dtype.kind == 'f':
+        return np.dtype('<f8') if dtype.itemsize == 8 else np.dtype('<f4')
+    return np.dtype('<i4')
+
+
+class SampleBlockEncoder():
+    '''
+    Encoder for the packed "sample block" layout: every HBase row holds block_samples consecutive
+    samples, with one cell per channel whose value is the raw little-endian array of those samples.
+    Rows are keyed row_key_prefix + zero-padded block number (eg. "<uuid>:000042"), so a prefix scan
+    returns the blocks in time order. Besides the constant cells and the channels every row carries
+    block_start (first sample index), block_rows (samples in the block) and block_schema
+    ("<name>:<dtype>,..." so readers can decode the blobs without knowing the source file).
+
+    Parameters
+        ----------
+        column_family : str
+            column family every cell is written to (eg. "telemetry")
+        columns : list of str
+            telemetry channels to write, in cell order
+        row_key_prefix : str
+            prefix of every row key, the block number is appended (eg. "<uuid>:")
+        constant_cells : list of (qualifier, value) tuples
+            cells with the same value on every row, written before the block cells
+        block_samples : int
+            number of consecutive samples packed into one row
+    '''
+    def __init__(self, column_family, columns, row_key_prefix, constant_cells=(), block_samples=600):
+        self.column_family = column_family
+        self.columns = list(columns)
+        self.row_key_prefix = row_key_prefix
+        self.block_samples = block_samples
+        self.constant_cells = ''.join(self._cell(qualifier, str(value).encode('utf-8')) + ',' for qualifier, value in constant_cells)
+        self.qualifiers = {col_name: self._b64(column_family + ":" + col_name) for col_name in self.columns}
+        self.pb_constant_cells = [(column_family + ":" + str(qualifier), str(value)) for qualifier, value in constant_cells]
+
+    @staticmethod
+    def _b64(raw):
+        if isinstance(raw, str):
+            raw = raw.encode('utf-8')
+        return base64.b64encode(raw).decode('ascii')
+
+    def _cell(self, qualifier, value):
+        return '{"column":"' + self._b64(self.column_family + ":" + qualifier) + '","$":"' + self._b64(value) + '"}'
+
+    def block_key(self, block):
+        return f"{self.row_key_prefix}{block:06d}"
+
+    def iter_rows(self, data, start=0, stop=None, blocks_per_chunk=8, wire_format="json"):
+        '''
+        Generator over the blocks covering samples [start, stop) of data, yielding
+        (sample_start, sample_stop, fragment) where fragment is the comma separated row definitions
+        for up to blocks_per_chunk blocks (CellSet bytes with wire_format="protobuf", which carries the
+        sample arrays without base64). The range is widened to whole blocks, so a block is always
+        written complete.
+        Positions are in samples so HBaseChunkedWriter counts samples, the same as for TelemetryRowEncoder.
+
+        Parameters
+            ----------
+            data : pandas.DataFrame or dict of 1-D arrays
+                must contain every column passed to the constructor
+            blocks_per_chunk : int
+                blocks per yielded fragment
+            wire_format : str
+                "json" or "protobuf"
+        '''
+        arrays = {}
+        for col_name in self.columns:
+            values = np.asarray(data[col_name])
+            arrays[col_name] = np.ascontiguousarray(values, dtype=block_dtype(values.dtype))
+        total = len(next(iter(arrays.values()))) if arrays else len(data)
+        stop = total if stop is None else min(stop, total)
+        schema = ','.join(f"{col_name}:{values.dtype.str}" for col_name, values in arrays.items())
+        schema_cell = self._cell("block_schema", schema.encode('utf-8'))
+
+        first_block = start // self.block_samples
+        last_block = -(-stop // self.block_samples)
+        for chunk_block in range(first_block, last_block, blocks_per_chunk):
+            rows = []
+            for block in range(chunk_block, min(chunk_block + blocks_per_chunk, last_block)):
+                block_start = block * self.block_samples
+                block_stop = min(block_start + self.block_samples, total)
+                if wire_format == "protobuf":
+                    prefix = self.column_family + ":"
+                    cells = self.pb_constant_cells + [
+                        (prefix + "block_start", str(block_start)),
+                        (prefix + "block_rows", str(block_stop - block_start)),
+                        (prefix + "block_schema", schema)
+                    ]
+                    cells += [(prefix + col_name, values[block_start:block_stop].tobytes()) for col_name, values in arrays.items()]
+                    rows.append((self.block_key(block), cells))
+                    continue
+                cells = [
+                    self._cell("block_start", str(block_start).encode('utf-8')),
+                    self._cell("block_rows", str(block_stop - block_start).encode('utf-8')),
+                    schema_cell
+                ]
+                for col_name, values in arrays.items():
+                    cells.append('{"column":"' + self.qualifiers[col_name] + '","$":"' + self._b64(values[block_start:block_stop].tobytes()) + '"}')
+                rows.append('{"key":"' + self._b64(self.block_key(block)) + '","Cell":[' + self.constant_cells + ','.join(cells) + ']}')
+            fragment = encode_cell_set(rows) if wire_format == "protobuf" else ', '.join(rows)
+            yield chunk_block * self.block_samples, min((chunk_block + blocks_per_chunk) * self.block_samples, total), fragment
+
+    def encode_payload(self, data, start=0, stop=None, wire_format="json"):
+        '''
+        Full REST payload for the blocks covering rows [start, stop) of data:
+        {"Row":[...]} text, or CellSet bytes with wire_format="protobuf"
+        '''
+        fragments = [fragment for _, _, fragment in self.iter_rows(data, start, stop, wire_format=wire_format)]
+        if wire_format == "protobuf":
+            return b''.join(fragments)
+        return '{"Row":[' + ', '.join(fragments) + ']}'
+
+
+def decode_sample_block(cells, column_family="telemetry", columns=None):
+    '''
+    Decode the cells of one row written by SampleBlockEncoder.
+    Returns (block_start, {channel: numpy array}) with the channels of columns (default: every channel
+    of the block_schema) found in cells, or None if the row is not a sample block (eg. a metadata row)
+
+    Parameters
+        ----------
+        cells : dict
+            {column: value} of the row, both raw bytes (eg. b"telemetry:Speed" -> the packed samples)
+        column_family : str
+            column family the blocks were written to
+        columns : list of str
+            optional channels to decode
+    '''
+    prefix = (column_family + ":").encode('utf-8')
+    schema_cell = cells.get(prefix + b"block_schema")
+    if schema_cell is None:
+        return None
+    schema = dict(item.split(":", 1) for item in schema_cell.decode('utf-8').split(","))
+    arrays = {}
+    for col_name in (columns if columns is not None else schema):
+        value = cells.get(prefix + col_name.encode('utf-8'))
+        if col_name in schema and value is not None:
+            arrays[col_name] = np.frombuffer(value, dtype=schema[col_name])
+    return int(cells[prefix + b"block_start"]), arrays
+
+
+def sample_block_rows(key, cells, column_family="telemetry"):
+    '''
+    Expand one row written by SampleBlockEncoder into the rows the one-row-per-sample layout would
+    have: yields (row_key, {column: text value}) per sample, keyed like the block with the block number
+    replaced by the sample index (eg. "<uuid>:000003" -> "<uuid>:1800", "<uuid>:1801", ...) and with the
+    block's constant cells (uuid, TrackID, ...) repeated on every sample.
+    Yields nothing if the row is not a sample block.
+
+    Parameters
+        ----------
+        key : bytes
+            row key of the block
+        cells : dict
+            {column: value} of the row, both raw bytes
+        column_family : str
+            column family the blocks were written to
+    '''
+    block = decode_sample_block(cells, column_family)
+    if block is None:
+        return
+    block_start, arrays = block
+    prefix = column_family + ":"
+    channels = {prefix + col_name: values.astype(str).tolist() for col_name, values in arrays.items()}
+    bookkeeping = {prefix + "block_start", prefix + "block_rows", prefix + "block_schema"}
+    constants = {}
+    for column, value in cells.items():
+        column = column.decode('utf-8')
+        if column not in bookkeeping and column not in channels:
+            constants[column] = value.decode('utf-8', errors='replace')
+    sample_count = len(next(iter(arrays.values()))) if arrays else int(cells[(prefix + "block_rows").encode('utf-8')])
+    key_prefix = key.decode('utf-8').rsplit(":", 1)[0]
+    for offset in range(sample_count):
+        row = dict(constants)
+        for column, values in channels.items():
+            row[column] = values[offset]
+        yield f"{key_prefix}:{block_start + offset}", row
+
+
+# HBase REST protobuf wire format (application/x-protobuf), from the gateway's CellSetMessage.proto:
+#   message Cell { optional bytes row = 1; optional bytes column = 2; optional int64 timestamp = 3; optional bytes data = 4; }
+#   message CellSet { message Row { required bytes key = 1; repeated Cell values = 2; } repeated Row rows = 1; }
+
+def _varint(value):
+    out = bytearray()
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _field(number, payload):
+    # length-delimited field: tag, length, payload
+    return _varint(number << 3 | 2) + _varint(len(payload)) + payload
+
+
+def _bytes(value):
+    return value.encode('utf-8') if isinstance(value, str) else bytes(value)
+
+
+def encode_cell(column, value):
+    '''
+    Protobuf Cell message for one "family:qualifier" column and value (str or bytes)
+    '''
+    return _field(2, _bytes(column)) + _field(4, _bytes(value))
+
+
+def encode_cell_set(rows):
+    '''
+    Protobuf CellSet for HBaseRestTable.insert(..., wire_format="protobuf").
+    Encoded CellSets concatenate into a valid CellSet, so chunks can be built separately.
+
+    Parameters
+        ----------
+        rows : iterable of (key, cells) tuples
+            cells is an iterable of (column, value) with column "family:qualifier";
+            keys, columns and values may be str (written as utf-8) or bytes
+    '''
+    out = []
+    for key, cells in rows:
+        out.append(_field(1, _field(1, _bytes(key)) + b''.join(_field(2, encode_cell(column, value)) for column, value in cells)))
+    return b''.join(out)
+
+
+def _read_varint(buf, pos):
+    result = 0
+    shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _skip_field(buf, pos, wire_type):
+    if wire_type == 0:
+        return _read_varint(buf, pos)[1]
+    if wire_type == 1:
+        return pos + 8
+    if wire_type == 5:
+        return pos + 4
+    if wire_type == 2:
+        length, pos = _read_varint(buf, pos)
+        return pos + length
+    raise Exception(f"Unsupported protobuf wire type {wire_type}")
+
+
+def decode_cell_set(data):
+    '''
+    Decode a protobuf CellSet (a scanner batch or row read with Accept: application/x-protobuf).
+    Returns a list of (key, [(column, value), ...]) with every key, column and value as raw bytes.
+    '''
+    buf = bytes(data)
+    end = len(buf)
+    pos = 0
+    rows = []
+    while pos < end:
+        tag = buf[pos]
+        pos += 1
+        if tag != 0x0a:
+            pos = _skip_field(buf, pos, tag & 7)
+            continue
+        length = buf[pos]
+        pos += 1
+        if length >= 0x80:
+            length, pos = _read_varint(buf, pos - 1)
+        row_end = pos + length
+        key = b''
+        cells = []
+        while pos < row_end:
+            tag = buf[pos]
+            pos += 1
+            if tag != 0x12 and tag != 0x0a:
+                pos = _skip_field(buf, pos, tag & 7)
+                continue
+            length = buf[pos]
+            pos += 1
+            if length >= 0x80:
+                length, pos = _read_varint(buf, pos - 1)
+            if tag == 0x0a:
+                key = buf[pos:pos + length]
+                pos += length
+                continue
+            cell_end = pos + length
+            column = value = b''
+            while pos < cell_end:
+                tag = buf[pos]
+                pos += 1
+                if tag == 0x18:
+                    pos = _read_varint(buf, pos)[1]
+                    continue
+                if tag & 7 != 2:
+                    pos = _skip_field(buf, pos, tag & 7)
+                    continue
+                length = buf[pos]
+                pos += 1
+                if length >= 0x80:
+                    length, pos = _read_varint(buf, pos - 1)
+                if tag == 0x12:
+                    column = buf[pos:pos + length]
+                elif tag == 0x22:
+                    value = buf[pos:pos + length]
+                pos += length
+            cells.append((column, value))
+        rows.append((key, cells))
+    return rows
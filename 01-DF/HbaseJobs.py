@@ -0,0 +1,146 @@
+"""
+HBase helpers shared by the daily jobs (df_job_bestlap.py, df_job_leaderboard.py):
+opening their tables, scanning rows into dictionaries, reading the lap index, listing
+the sessions of the main table and clearing the rows of a row key prefix
+
+The jobs open AsyncHBaseRestTable's - the blocking helpers here take the HBaseRestTable
+underneath (`table.table`), the coroutines take the AsyncHBaseRestTable itself.
+"""
+
+from contextlib import closing
+from HbaseEncoder import sample_block_rows
+from HbaseRest import AsyncHBaseRestTable
+from HbaseScan import ScanSpec
+
+
+def open_tables(table_paths, user, password, rest_node, rest_node_ip, rest_port, **options):
+    """
+    AsyncHBaseRestTable for each of table_paths, in the same order. options are passed on to every
+    table (eg. concurrency=, and session= so the tables share one keep-alive connection pool)
+    """
+    return [AsyncHBaseRestTable(user, password, rest_node, rest_node_ip, rest_port, table_path, **options) for table_path in table_paths]
+
+
+def close_tables(*tables):
+    """Shut down the request pools of AsyncHBaseRestTable's opened by open_tables"""
+    for table in tables:
+        table.close()
+
+
+def decode_rows(rows):
+    """
+    Generator decoding rows (row_key, [(column, value), ...]) in bytes, as HBaseRestTable.iter_cells yields
+    them for scanner batches of either wire format, into row dictionaries
+    ({'_row_key': key, '<family>:<qualifier>': value}) with the values as text. A row in the packed
+    sample block layout (df_load_table LOADER_LAYOUT=blocks) becomes one dictionary per sample
+    (<uuid>:<sample index>), so the jobs read either layout the same way
+    """
+    for key, cells in rows:
+        cells = dict(cells)
+        if b'telemetry:block_schema' in cells:
+            for sample_key, sample in sample_block_rows(key, cells):
+                sample['_row_key'] = sample_key
+                yield sample
+            continue
+        row = {'_row_key': key.decode('utf-8')}
+        for column, value in cells.items():
+            row[column.decode('utf-8')] = value.decode('utf-8', errors='replace')
+        yield row
+
+
+def iter_scan(table, scan_spec, wire_format="json"):
+    """
+    Generator over the row dictionaries of a scan (see decode_rows) as their batches arrive, the next
+    batch being read while the caller works on the current one. The scanner is deleted when the scan
+    ends or fails and when the generator is closed (wrap it in contextlib.closing() if the loop may stop early)
+    """
+    with closing(table.iter_batches(scan_spec, wire_format)) as batches:
+        yield from decode_rows(table.iter_cells(batches, wire_format))
+
+
+def iter_scan_parallel(table, scan_spec, parallelism, split_keys, wire_format="json"):
+    """
+    Region-parallel version of iter_scan (HBaseRestTable.iter_rows_parallel): one scanner per key range,
+    parallelism of them reading at once, rows of different ranges interleaved. Every scanner is
+    deleted when the scan ends or fails and when the generator is closed
+    """
+    print(f"Scanning {table.table} by key range, {parallelism} scanners at a time")
+    with closing(table.iter_rows_parallel(scan_spec, wire_format, parallelism, split_keys, raw=True)) as rows:
+        yield from decode_rows(rows)
+
+
+def scan_rows(table, scan_spec, wire_format="json"):
+    """
+    Scan a table with a ScanSpec into a list of row dictionaries (see decode_rows)
+    """
+    return list(iter_scan(table, scan_spec, wire_format))
+
+
+def load_lap_index(lap_index_table, column_family, wire_format="json"):
+    """
+    Read every entry of the lap index table (written by df_load_table)
+    Returns: (lap rows, sessions) - the decoded lap rows ({'<column_family>:<field>': value}) and the set
+    of session uuids the index covers, ie. with a session row (written even for a file without laps) or
+    lap rows. Both are empty if the table cannot be read
+    """
+    scan_spec = ScanSpec().columns(column_family)
+    try:
+        rows = scan_rows(lap_index_table, scan_spec, wire_format)
+    except Exception as e:
+        print(f"  ⚠️ Could not read lap index: {e}")
+        return [], set()
+    sessions = {row[f"{column_family}:uuid"] for row in rows if f"{column_family}:uuid" in row}
+    return [row for row in rows if f"{column_family}:lap_number" in row], sessions
+
+
+def list_sessions(main_table, column_family, parallelism, split_keys, wire_format="json"):
+    """
+    Session uuids in the main table, taken from the metadata row every session has (<uuid>:0).
+    Only one column of the metadata family (column_family) is read, so no telemetry cells are sent back,
+    but every region is still scanned - the jobs only call this in their lap index backfill mode.
+    Returns: set of uuids, None if the table cannot be read
+    """
+    scan_spec = ScanSpec().columns(f"{column_family}:uuid")
+    try:
+        with closing(main_table.iter_rows_parallel(scan_spec, wire_format, parallelism, split_keys, raw=True)) as rows:
+            return {row_key.decode('utf-8').split(':', 1)[0] for row_key, _ in rows}
+    except Exception as e:
+        print(f"  ⚠️ Could not list sessions: {e}")
+        return None
+
+
+def iter_session_rows(table, sessions, columns, wire_format="json"):
+    """
+    Row dictionaries (see decode_rows) of the given sessions only, one row key prefix (<uuid>:) scan
+    after another, with just the given columns
+    """
+    for uuid_value in sessions:
+        print(f"  Scanning rows with prefix: {uuid_value}:")
+        yield from iter_scan(table, ScanSpec().prefix(f"{uuid_value}:").columns(*columns), wire_format)
+
+
+def print_delete_progress(stats):
+    """Progress line of a bulk delete (HBaseBulkDeleter on_progress)"""
+    print(f"    {stats['rows']} rows: {stats['deleted']} deleted, {stats['failed']} failed ({stats['rows_per_sec']:.0f} rows/s)")
+
+
+def delete_rows_by_prefix(table, row_key_prefix, label, parallelism, scan_batch, throttle=None):
+    """
+    Delete all rows with a given prefix (to overwrite the old <label> of a track). The row keys stream
+    from a key-only scan straight into concurrent DELETEs (parallelism in flight, throttle shared by
+    the whole job), so clearing a prefix takes seconds rather than one round trip per row.
+    Returns the HBaseBulkDeleter stats
+    """
+    print(f"  Deleting old {label} data with prefix: {row_key_prefix}")
+    
+    stats = table.delete_prefix(row_key_prefix, parallelism, None, print_delete_progress, scan_batch, throttle)
+    
+    if not stats['rows']:
+        print(f"  No existing {label} data to delete")
+        return stats
+    
+    for row_key, error in stats['failed_keys'][:10]:
+        print(f"  Warning: Failed to delete row {row_key}: {error}")
+    
+    print(f"  Deleted {stats['deleted']} old rows in {stats['seconds']:.1f}s ({stats['rows_per_sec']:.0f} rows/s, {stats['failed']} failed)")
+    return stats
@@ -1,17 +1,176 @@
+import os
+import tempfile
 import requests
+from requests.adapters import HTTPAdapter
 import base64
 import json
 import pandas as pd
+import numpy as np
+import time
+import zlib
+import queue
+import asyncio
+import threading
+from collections import deque, OrderedDict
+from itertools import islice
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from urllib.parse import urlsplit, urlunsplit
+from HbaseEncoder import decode_cell_set, decode_sample_block, b64decode_values, join_values, parse_values
+from HbaseScan import ScanSpec, key_only, first_key_only, prefix_end
+from HbaseMetrics import call_event, emit
+
+# (column, value) of a JSON scanner cell
+_CELL = itemgetter("column", "$")
+
+# wire formats the REST gateway speaks -> Content-Type / Accept header
+WIRE_FORMATS = {"json": "application/json", "protobuf": "application/x-protobuf"}
+
+# returned by HBaseReadCache.get for keys that are not cached
+MISS = object()
+
+def _float_or_nan(value):
+    try:
+        return float(value)
+    except ValueError:
+        return np.nan
+
+# request body encodings the client can send -> zlib wbits (HTTP deflate is the zlib format)
+CONTENT_ENCODINGS = {"gzip": 31, "deflate": 15}
+
+def compressed_chunks(data, encoding="gzip", level=6, chunk_size=1024*1024, stats=None):
+    '''
+    Compress a request body (str or bytes) for Content-Encoding: encoding one chunk_size piece at a
+    time, as a generator requests streams out with chunked transfer encoding - the compressed copy
+    is never held in full next to the payload.
+    stats (a dict) is filled in as the body is sent: bytes (compressed size) and seconds (time spent compressing)
+    '''
+    compressor = zlib.compressobj(level, zlib.DEFLATED, CONTENT_ENCODINGS[encoding])
+    view = data if isinstance(data, str) else memoryview(data)
+    stats = stats if stats is not None else {}
+    stats.update(bytes=0, seconds=0.0)
+    for start in range(0, len(data), chunk_size):
+        st = time.perf_counter()
+        piece = view[start:start + chunk_size]
+        chunk = compressor.compress(piece.encode('utf-8') if isinstance(piece, str) else piece)
+        stats['seconds'] += time.perf_counter() - st
+        if chunk:
+            stats['bytes'] += len(chunk)
+            yield chunk
+    st = time.perf_counter()
+    chunk = compressor.flush()
+    stats['seconds'] += time.perf_counter() - st
+    stats['bytes'] += len(chunk)
+    yield chunk
 
 class HBaseRest():
-  def __init__(self, user, password, rest_node, rest_node_ip, rest_node_port):
+  '''
+  Client for the HBase REST gateway.
+  All calls go through one pooled keep-alive requests.Session, so scanner batches, inserts and
+  deletes reuse open TCP/TLS connections instead of paying a new handshake per request.
+  The connection pool is thread safe: threads can share one client (or pass session= to let
+  several clients share a pool).
+
+  Parameters
+      ----------
+      pool_size : int
+          maximum number of connections kept open to the gateway
+      session : requests.Session
+          optional existing session (eg. another client's .session) to share its connection pool
+      hooks : list
+          optional callables receiving one dict per REST call (HbaseMetrics.call_event: op, table,
+          status, rows, cells, request / response bytes, server time, decode time), eg. a
+          HbaseMetrics.HistogramSink or JsonLinesSink
+      compression : str
+          "gzip" or "deflate" to send request bodies of compress_min_bytes or more compressed
+          (streamed, see compressed_chunks), None to send them as they are. Pays off for bulk
+          inserts over slow links; costs client CPU (reported to the hooks as compress_seconds)
+      accept_encoding : str
+          Accept-Encoding of every call: response encodings the gateway may pick (decoded
+          transparently by requests), "identity" to have responses sent uncompressed
+      compress_min_bytes : int
+          smaller request bodies are sent uncompressed
+      gateways : GatewayPool
+          optional REST gateways to spread the calls over (rest_node is then only a placeholder
+          for them); ignored when session is given - pass a GatewaySession to share both
+  '''
+  def __init__(self, user, password, rest_node, rest_node_ip, rest_node_port, pool_size=10, session=None, hooks=None,
+               compression=None, accept_encoding="gzip, deflate", compress_min_bytes=1024, gateways=None):
     self.user = user
     self.password = password
     self.host = rest_node
     self.ip = rest_node_ip
     self.port = rest_node_port
     self.url = "https://" + rest_node + ":" + rest_node_port
-    requests = __import__('requests')
+    self.session = session if session is not None else self.create_session(pool_size, gateways)
+    self.hooks = list(hooks or [])
+    if compression is not None and compression not in CONTENT_ENCODINGS:
+      raise Exception(f"compression must be one of {', '.join(CONTENT_ENCODINGS)} or None, not {compression!r}")
+    self.compression = compression
+    self.accept_encoding = accept_encoding
+    self.compress_min_bytes = compress_min_bytes
+
+  @staticmethod
+  def create_session(pool_size=10, gateways=None):
+    '''
+    Keep-alive session with a connection pool of pool_size connections per host
+    (pool_block makes extra threads wait for a free connection rather than open throwaway ones),
+    routing the calls over the endpoints of gateways (GatewayPool) when given
+    '''
+    if gateways is not None:
+      return GatewaySession(gateways, pool_size)
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=True)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+  def close(self):
+    '''
+    Close every pooled connection
+    '''
+    self.session.close()
+
+  def request(self, op, method, url, rows=0, **kwargs):
+    '''
+    One call to the gateway over the pooled session, measured for the hooks as op
+    (rows: rows the request writes, when known). Negotiates the response encoding and compresses
+    the request body as configured (compression) - streamed, or in memory over a GatewaySession,
+    which can only retry a call on another gateway when the body can be sent again. A call that
+    fails without a response is reported with status 0 before the error is raised.
+    '''
+    headers = dict(kwargs.pop('headers', None) or {})
+    headers['Accept-Encoding'] = self.accept_encoding
+    data = kwargs.get('data')
+    body_bytes = len(data) if data is not None else 0
+    compressed = {}
+    if self.compression and body_bytes >= self.compress_min_bytes:
+      kwargs['data'] = compressed_chunks(data, self.compression, stats=compressed)
+      if isinstance(self.session, GatewaySession):
+        kwargs['data'] = b''.join(kwargs['data'])
+      headers['Content-Encoding'] = self.compression
+    if not self.hooks:
+      return self.session.request(method, url, auth = (self.user, self.password), headers=headers, verify=False, **kwargs)
+    st = time.perf_counter()
+    res = None
+    try:
+      res = self.session.request(method, url, auth = (self.user, self.password), headers=headers, verify=False, **kwargs)
+      return res
+    finally:
+      event = call_event(op, requests.utils.unquote(getattr(self, 'table', '')), time.perf_counter() - st, res,
+                         request_bytes=compressed.get('bytes', body_bytes), rows=rows, request_body_bytes=body_bytes,
+                         compress_seconds=compressed.get('seconds', 0.0))
+      if res is None:
+        event['status'] = 0
+      emit(self.hooks, event)
+
+  def record(self, op, seconds, res=None, **measures):
+    '''
+    Pass measurements the client took itself (eg. decode time) to the hooks
+    '''
+    if self.hooks:
+      emit(self.hooks, call_event(op, requests.utils.unquote(getattr(self, 'table', '')), seconds, res, **measures))
     
   def get_version(self):
     '''
@@ -20,7 +179,7 @@ class HBaseRest():
         ----------
     '''
     url = self.url + "/version/cluster"
-    return(requests.get(url, auth = (self.user, self.password), verify=False))
+    return(self.request("version", "GET", url))
     
   def get_cluster_status(self):
     '''
@@ -29,7 +188,7 @@ class HBaseRest():
         ----------
     '''
     url = self.url + "/status/cluster"
-    return(requests.get(url, auth = (self.user, self.password), verify=False))
+    return(self.request("status", "GET", url))
   
   def get_nonsystem_tables(self):
     '''
@@ -41,7 +200,7 @@ class HBaseRest():
         ----------
     '''
     url = self.url + "/"
-    return(requests.get(url, auth = (self.user, self.password), headers={'Accept': 'application/json'}, verify=False))
+    return(self.request("tables", "GET", url, headers={'Accept': 'application/json'}))
   
   def get_namespaces(self):
     '''
@@ -53,7 +212,7 @@ class HBaseRest():
         ----------
     '''
     url = self.url + "/namespaces"
-    return(requests.get(url, auth = (self.user, self.password), headers={'Accept': 'application/json'}, verify=False))
+    return(self.request("namespaces", "GET", url, headers={'Accept': 'application/json'}))
 
   def get_namespace_description(self, namespace):
     '''
@@ -63,7 +222,7 @@ class HBaseRest():
         ----------
     '''
     url = self.url + "/namespaces/" + namespace
-    return(requests.get(url, auth = (self.user, self.password), verify=False))
+    return(self.request("namespace", "GET", url))
   
   def get_tables_in_namespace(self, namespace):
     '''
@@ -73,29 +232,70 @@ class HBaseRest():
         ----------
     '''
     url = self.url + "/namespaces/" + namespace + '/tables'
-    return(requests.get(url, auth = (self.user, self.password), headers={'Accept': 'application/json'}, verify=False))
+    return(self.request("namespace_tables", "GET", url, headers={'Accept': 'application/json'}))
   
 class HBaseRestTable(HBaseRest):
-    def __init__(self, user, password, rest_node, rest_node_ip, rest_node_port, table):
-        requests = __import__('requests')
-        base64 = requests = __import__('base64')
-        json = requests = __import__('json')
-        pandas = requests = __import__('pandas')
-        super().__init__(user, password, rest_node, rest_node_ip, rest_node_port)
+    def __init__(self, user, password, rest_node, rest_node_ip, rest_node_port, table, pool_size=10, session=None, cache=None, hooks=None, batch_sizer=None,
+                 compression=None, accept_encoding="gzip, deflate", compress_min_bytes=1024, gateways=None):
+        super().__init__(user, password, rest_node, rest_node_ip, rest_node_port, pool_size, session, hooks,
+                         compression, accept_encoding, compress_min_bytes, gateways)
         self.table = table.replace("/", "%2F").replace(":", "%3A")
+        # optional HBaseReadCache for get_row, multiget and scan_table_by_prefix / scan_table_by_range
+        self.cache = cache
+        # sizes the reads of scans whose ScanSpec has no batch of its own (pass one to share or persist what it learns)
+        self.batch_sizer = batch_sizer if batch_sizer is not None else ScanBatchSizer()
 
     def get_table_schema(self):
       url = self.url + "/" + self.table + "/schema"
-      return(requests.get(url, auth = (self.user, self.password), headers={'Accept': 'application/json'}, verify=False))
+      return(self.request("schema", "GET", url, headers={'Accept': 'application/json'}))
     
     def get_table_regions(self):
       url = self.url + "/" + self.table + "/regions"
-      return(requests.get(url, auth = (self.user, self.password), headers={'Accept': 'application/json'}, verify=False))
+      return(self.request("regions", "GET", url, headers={'Accept': 'application/json'}))
+
+    def region_ranges(self, split_keys=None):
+        """
+        Row key ranges [(start_key, end_key), ...] covering the whole table, one per region
+        (keys as bytes, b"" for an open end). split_keys adds boundaries inside the regions, so a
+        table with few regions can still be read by several scanners.
+        Falls back to a single range when the region list cannot be read.
 
-    def insert(self, data):
+        Parameters:
+            split_keys: list of str/bytes - optional extra row key boundaries (e.g., ["4", "8", "c"])
+        """
+        bounds = set()
+        res = self.get_table_regions()
+        if res.status_code == 200:
+            for region in res.json().get("Region", []):
+                for key in (region.get("startKey"), region.get("endKey")):
+                    if key:
+                        bounds.add(base64.b64decode(key))
+        bounds.update(key.encode('utf-8') if isinstance(key, str) else key for key in (split_keys or []))
+        bounds.discard(b"")
+        edges = [b""] + sorted(bounds) + [b""]
+        return list(zip(edges[:-1], edges[1:]))
+
+    @staticmethod
+    def range_scanner(filter, start_key, end_key):
+        """
+        Scanner definition limited to the row range [start_key, end_key) (bytes, b"" for an open end).
+        A ScanSpec is narrowed with its own row bounds (None when nothing is left to scan);
+        a hand-written XML filter must not set startRow / endRow itself.
+        """
+        if isinstance(filter, ScanSpec):
+            spec = filter.with_rows(start_key, end_key)
+            return None if spec.is_empty() else spec
+        attributes = ''.join(f' {name}="{base64.b64encode(key).decode()}"' for name, key in (("startRow", start_key), ("endRow", end_key)) if key)
+        return filter.replace("<Scanner", "<Scanner" + attributes, 1)
+
+    def insert(self, data, wire_format="json", invalidate=None, rows=0):
       '''
       Write rows to a table. 
       The row, column qualifier, and value must each be Base-64 encoded.
+      With wire_format="protobuf" data is a protobuf CellSet instead (HbaseEncoder.encode_cell_set),
+      which carries keys and values as raw bytes.
+      With a read cache, the table's cached reads are dropped afterwards - only those overlapping
+      the row key prefix invalidate when it is given.
 
       Parameters
           ----------
@@ -108,33 +308,182 @@ class HBaseRestTable(HBaseRest):
               A row definition needs to be in the following format:
                 {"key":"<row key>","Cell":[<column definition>,<column definition>, <more column definition ....>},
                 {"column":"<cf:column qualifier>","$":"<value>"},{"column":"<column qualifier>","$":"<value>"}, <add more columns.....>}, {"key":"<row key>","Cell":[{"column":"<column qualifier>","$":"<value>"},{"column":"<column qualifier>","$":"<value>"}, <add more columns.....>},
+          wire_format : str
+              "json" or "protobuf"
+          invalidate : str
+              row key prefix of every row written (eg. "file:<name>"), to keep the rest of the table cached
+          rows : int
+              number of rows in data, reported to the hooks
       '''
       url = self.url + "/" + self.table + "/dummyrowkey"
-      return(requests.put(url, auth = (self.user, self.password), data=data, headers={'Accept': 'application/json', 'Content-Type': 'application/json'}, verify=False))
+      try:
+          return(self.request("insert", "PUT", url, rows=rows, data=data, headers={'Accept': 'application/json', 'Content-Type': WIRE_FORMATS[wire_format]}))
+      finally:
+          self.invalidate(invalidate)
     
-    def read_batch(self, scanner):
-      return(requests.get(scanner, auth = (self.user, self.password), headers={'Accept': 'application/json'}, verify=False))
+    def read_batch(self, scanner, wire_format="json", cells=None):
+      # cells: batch of this read instead of the scanner's own
+      url = scanner + "?c=" + str(cells) if cells else scanner
+      return(self.request("scanner_read", "GET", url, headers={'Accept': WIRE_FORMATS[wire_format]}))
     
     def create_scanner(self, filter):
        url = self.url + "/" + self.table + "/scanner"
-       res = requests.put(url, data = filter, auth = (self.user, self.password), headers={'Accept': 'application/xml', 'Content-Type': 'text/xml'}, verify=False)
+       res = self.request("scanner_create", "PUT", url, data = str(filter), headers={'Accept': 'application/xml', 'Content-Type': 'text/xml'})
        return(res.headers["Location"])
 
     def delete_scanner(self, scanner):
-       return(requests.delete(scanner, auth = (self.user, self.password), headers={'Accept': 'application/json'}, verify=False))
+       return(self.request("scanner_delete", "DELETE", scanner, headers={'Accept': 'application/json'}))
 
-    def read_full_table(self, scanner):
+    def read_full_table(self, scanner, wire_format="json"):
       all_data = []
       status_code = 200
       while status_code == 200:
-          res = self.read_batch(scanner)
-          #res = requests.get(scanner, auth = (self.user, self.password), headers={'Accept': 'application/json'}, verify=False)
+          res = self.read_batch(scanner, wire_format)
+          #res = self.session.get(scanner, auth = (self.user, self.password), headers={'Accept': 'application/json'}, verify=False)
           status_code = res.status_code
           if status_code == 200:
-              all_data.append(res.text)
+              all_data.append(res.content if wire_format == "protobuf" else res.text)
       return(all_data)
+
+    def iter_batches(self, filter, wire_format="json", prefetch=True):
+        """
+        Streaming scan: generator over the raw batches of a new scanner (JSON text, or CellSet bytes
+        with wire_format="protobuf"), handed out as they arrive instead of collected like read_full_table.
+        With prefetch the next batch is already being read in the background while the caller works
+        on the current one. The scanner is deleted when the scan ends or fails and when the generator
+        is closed - wrap it in contextlib.closing() if the loop may stop early.
+        For a ScanSpec without a batch every read is sized by the table's ScanBatchSizer; a batch
+        teaches it once the next read shows it was full (only the last batch of a scan is short).
+
+        Parameters:
+            filter: HbaseScan.ScanSpec or str - scanner definition, as for create_scanner
+            wire_format: str - "json" or "protobuf"
+            prefetch: bool - read the next batch while the current one is processed
+        """
+        if isinstance(filter, ScanSpec) and filter.is_empty():
+            return
+        sizer = self.batch_sizer if isinstance(filter, ScanSpec) and filter.batch is None else None
+        scanner = self.create_scanner(filter)
+
+        def read():
+            cells = sizer.cells(self.table) if sizer is not None else None
+            st = time.perf_counter()
+            res = self.read_batch(scanner, wire_format, cells)
+            return res, cells, time.perf_counter() - st
+
+        reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hbase-scan") if prefetch else None
+        pending = None
+        previous = None
+        try:
+            while True:
+                res, cells, seconds = pending.result() if pending is not None else read()
+                pending = None
+                if res.status_code == 204:
+                    break
+                if res.status_code != 200:
+                    raise Exception(f"Failed to read scanner batch: HTTP {res.status_code}")
+                if sizer is not None:
+                    if previous is not None:
+                        sizer.observe(self.table, *previous)
+                    previous = (cells, len(res.content), seconds)
+                if reader is not None:
+                    pending = reader.submit(read)
+                yield res.content if wire_format == "protobuf" else res.text
+        finally:
+            if reader is not None:
+                reader.shutdown(wait=True)
+            self.delete_scanner(scanner)
+
+    def iter_rows(self, filter, wire_format="json", prefetch=True):
+        """
+        Streaming scan yielding decoded rows (row_key, {column_name: value}) as their batches arrive,
+        decoded like parse_scan_results. Memory stays at about one batch whatever the table size.
+        Scanner deletion and prefetch work as for iter_batches.
+
+        Parameters:
+            filter: HbaseScan.ScanSpec or str - scanner definition, as for create_scanner
+            wire_format: str - "json" or "protobuf" (values are returned as bytes)
+            prefetch: bool - read the next batch while the current one is processed
+        """
+        with closing(self.iter_batches(filter, wire_format, prefetch)) as batches:
+            yield from self.decode_rows(batches, wire_format)
+
+    def iter_rows_parallel(self, filter, wire_format="json", parallelism=4, split_keys=None, queue_size=16, chunk_rows=1000, raw=False):
+        """
+        Region-parallel scan: one scanner per region (or per sub-range, see region_ranges), with up to
+        parallelism of them reading at once on different region servers. Decoded rows are merged
+        through a bounded queue, so memory stays flat when the caller is slower than the scanners.
+        Yields (row_key, {column_name: value}) like iter_rows; rows keep their order within a range,
+        but ranges are interleaved. Every scanner is deleted when the scan ends or fails and when the
+        generator is closed - wrap it in contextlib.closing() if the loop may stop early.
+
+        Parameters:
+            filter: HbaseScan.ScanSpec or str - scanner definition (XML without startRow / endRow)
+            wire_format: str - "json" or "protobuf" (values are returned as bytes)
+            parallelism: int - scanners reading at the same time
+            split_keys: list of str/bytes - optional extra range boundaries (see region_ranges)
+            queue_size: int - decoded chunks allowed to wait in the queue
+            chunk_rows: int - rows handed over per queue entry
+            raw: bool - yield the rows undecoded as iter_cells does, (row_key, [(column, value), ...]) in bytes
+        """
+        # one scanner per range, skipping the ranges a ScanSpec's own row bounds exclude
+        scanners = [self.range_scanner(filter, start_key, end_key) for start_key, end_key in self.region_ranges(split_keys)]
+        scanners = [scanner for scanner in scanners if scanner is not None]
+        results = queue.Queue(maxsize=queue_size)
+        stop = threading.Event()
+        done = object()
+
+        def put(item):
+            # give up once the consumer has gone away, instead of blocking on a full queue forever
+            while not stop.is_set():
+                try:
+                    results.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+
+        def scan_range(scanner):
+            try:
+                if stop.is_set():
+                    return
+                with closing(self.iter_batches(scanner, wire_format, prefetch=False)) as batches:
+                    rows = self.iter_cells(batches, wire_format) if raw else self.decode_rows(batches, wire_format)
+                    while not stop.is_set():
+                        chunk = list(islice(rows, chunk_rows))
+                        if not chunk:
+                            break
+                        put(chunk)
+            except Exception as e:
+                put(e)
+            finally:
+                put(done)
+
+        executor = ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix="hbase-region-scan")
+        try:
+            for scanner in scanners:
+                executor.submit(scan_range, scanner)
+            remaining = len(scanners)
+            while remaining:
+                item = results.get()
+                if item is done:
+                    remaining -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield from item
+        finally:
+            stop.set()
+            executor.shutdown(wait=True)
+
+    def scan_table_parallel(self, filter, wire_format="json", parallelism=4, split_keys=None):
+        """
+        Region-parallel version of a full scan (see iter_rows_parallel).
+        Returns dict of {row_key: {column_name: value}}
+        """
+        with closing(self.iter_rows_parallel(filter, wire_format, parallelism, split_keys)) as rows:
+            return dict(rows)
     
-    def scan_table_by_prefix(self, row_prefix, column_family=None):
+    def scan_table_by_prefix(self, row_prefix, column_family=None, wire_format="json"):
         """
         Scan table for rows matching a prefix pattern.
         Returns dict of {row_key: {column_name: value}}
@@ -142,66 +491,1320 @@ class HBaseRestTable(HBaseRest):
         Parameters:
             row_prefix: str - prefix to match row keys (e.g., "file:")
             column_family: str - optional column family to filter (e.g., "file_metadata")
+            wire_format: str - "json" or "protobuf" (values are returned as bytes)
         """
-        # Create scanner filter XML
+        # The prefix becomes a startRow / endRow range, so only the regions holding it are read
+        spec = ScanSpec().prefix(row_prefix)
         if column_family:
-            filter_xml = f'<Scanner batch="100"><filter>{{"type":"PrefixFilter","value":"{base64.b64encode(row_prefix.encode()).decode()}"}}</filter><column>{base64.b64encode(column_family.encode()).decode()}</column></Scanner>'
-        else:
-            filter_xml = f'<Scanner batch="100"><filter>{{"type":"PrefixFilter","value":"{base64.b64encode(row_prefix.encode()).decode()}"}}</filter></Scanner>'
-        
-        # Create scanner
-        scanner_url = self.create_scanner(filter_xml)
-        
-        # Read all data
-        all_data = self.read_full_table(scanner_url)
+            spec.columns(column_family)
+        return self.scan_cached(spec, wire_format)
+
+    def scan_table_by_range(self, start_row, end_row=None, column_family=None, wire_format="json"):
+        """
+        Scan a contiguous row key range [start_row, end_row) - only the regions holding the range are read.
+        Returns dict of {row_key: {column_name: value}}
         
-        # Delete scanner
-        self.delete_scanner(scanner_url)
+        Parameters:
+            start_row: str - first row key of the range (inclusive)
+            end_row: str - optional row key the range stops at (exclusive), defaults to the end of the table
+            column_family: str - optional column family to filter (e.g., "file_metadata")
+            wire_format: str - "json" or "protobuf" (values are returned as bytes)
+        """
+        spec = ScanSpec().rows(start_row, end_row)
+        if column_family:
+            spec.columns(column_family)
+        return self.scan_cached(spec, wire_format)
+
+    def scan_cached(self, spec, wire_format="json", families=False):
+        """
+        Read a whole ScanSpec into {row_key: {column_name: value}}, through the read cache when there is one
+        (families: keep the column family in the column names, see decode_rows)
+        """
+        key = ("scan", str(spec), wire_format, families)
+        rows = self.cache.get(self.table, key) if self.cache is not None else MISS
+        if rows is MISS:
+            # Read and decode the batches as they arrive (the scanner is deleted at the end)
+            with closing(self.iter_batches(spec, wire_format)) as batches:
+                rows = self.parse_scan_results(batches, wire_format, families)
+            if self.cache is not None:
+                self.cache.put(self.table, key, rows, rows_size(rows), spec.start_row, spec.end_row)
+        return {row_key: dict(row) for row_key, row in rows.items()}
+
+    def get_row(self, row_key, column_family=None, wire_format="json"):
+        """
+        Read a single row by key.
+        Returns dict of {column_name: value}, empty if the row does not exist
         
-        # Parse results into dict
-        results = {}
+        Parameters:
+            row_key: str - row key to fetch
+            column_family: str - optional column family to fetch
+            wire_format: str - "json" or "protobuf" (values are returned as bytes)
+        """
+        cached, missing = self.cached_rows([row_key], column_family, wire_format)
+        if not missing:
+            return cached[row_key]
+        url = self.url + "/" + self.table + "/" + requests.utils.quote(row_key, safe="")
+        if column_family:
+            url += "/" + column_family
+        res = self.request("get", "GET", url, headers={'Accept': WIRE_FORMATS[wire_format]})
+        if res.status_code == 404:
+            row = {}
+        elif res.status_code != 200:
+            raise Exception(f"Failed to read row {row_key}: HTTP {res.status_code}")
+        else:
+            row = self.parse_scan_results([res.content if wire_format == "protobuf" else res.text], wire_format).get(row_key, {})
+        self.cache_rows({row_key: row}, [row_key], column_family, wire_format)
+        return dict(row)
+
+    def cached_rows(self, row_keys, column_family=None, wire_format="json"):
+        """
+        Look row keys up in the read cache.
+        Returns ({row_key: {column_name: value}} of the cached rows, list of the keys that are not cached)
+        """
+        if self.cache is None:
+            return {}, list(row_keys)
+        cached, missing = {}, []
+        for row_key in dict.fromkeys(row_keys):
+            row = self.cache.get(self.table, ("row", row_key, column_family, wire_format))
+            if row is MISS:
+                missing.append(row_key)
+            else:
+                cached[row_key] = dict(row)
+        return cached, missing
+
+    def cache_rows(self, rows, row_keys, column_family=None, wire_format="json"):
+        """
+        Store the rows read for row_keys in the read cache (keys missing from rows are cached as not existing)
+        """
+        if self.cache is None:
+            return
+        for row_key in row_keys:
+            row = rows.get(row_key, {})
+            start = row_key.encode('utf-8')
+            self.cache.put(self.table, ("row", row_key, column_family, wire_format), row, rows_size({row_key: row}), start, start + b'\x00')
+
+    @staticmethod
+    def multiget_batches(row_keys, column_family=None, max_keys=100, max_url_bytes=4096):
+        """
+        Split row keys (duplicates dropped) into multiget requests of at most max_keys keys
+        and about max_url_bytes of query string each
+        """
+        batches, batch, size = [], [], 0
+        for row_key in dict.fromkeys(row_keys):
+            spec = row_key + "/" + column_family if column_family else row_key
+            length = len("&row=") + len(requests.utils.quote(spec, safe=""))
+            if batch and (len(batch) >= max_keys or size + length > max_url_bytes):
+                batches.append(batch)
+                batch, size = [], 0
+            batch.append(row_key)
+            size += length
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def read_multiget(self, row_keys, column_family=None, wire_format="json"):
+        """
+        Read one batch of rows in a single multiget request.
+        Returns the raw response body (JSON text, or CellSet bytes with wire_format="protobuf"),
+        None when none of the rows exist
+        """
+        specs = [row_key + "/" + column_family if column_family else row_key for row_key in row_keys]
+        url = self.url + "/" + self.table + "/multiget?" + "&".join("row=" + requests.utils.quote(spec, safe="") for spec in specs)
+        res = self.request("multiget", "GET", url, headers={'Accept': WIRE_FORMATS[wire_format]})
+        if res.status_code == 404:
+            # none of the rows exist
+            return None
+        if res.status_code != 200:
+            raise Exception(f"Failed to read {len(row_keys)} rows: HTTP {res.status_code}")
+        return res.content if wire_format == "protobuf" else res.text
+
+    def multiget_batch(self, row_keys, column_family=None, wire_format="json"):
+        """
+        Read one batch of rows in a single multiget request.
+        Returns dict of {row_key: {column_name: value}} for the rows that exist
+        """
+        data = self.read_multiget(row_keys, column_family, wire_format)
+        return self.parse_scan_results([data], wire_format) if data is not None else {}
+
+    def multiget(self, row_keys, column_family=None, wire_format="json", max_keys=100, max_url_bytes=4096, parallelism=4):
+        """
+        Read many rows by key through the gateway's multiget endpoint - many keys per request instead of
+        a scanner (create, read, delete) or a GET per row. The keys are split into request-size-bounded
+        batches (multiget_batches) that run up to parallelism at a time.
+        Returns a list with one {column_name: value} dict per key, in the order of row_keys ({} for keys that do not exist)
+
+        Parameters:
+            row_keys: list of str - row keys to fetch
+            column_family: str - optional column family to fetch
+            wire_format: str - "json" or "protobuf" (values are returned as bytes)
+            max_keys: int - keys per request
+            max_url_bytes: int - query string size per request (the gateway limits the request line)
+            parallelism: int - requests in flight at once
+        """
+        rows, missing = self.cached_rows(row_keys, column_family, wire_format)
+        batches = self.multiget_batches(missing, column_family, max_keys, max_url_bytes)
+        if parallelism > 1 and len(batches) > 1:
+            with ThreadPoolExecutor(max_workers=min(parallelism, len(batches)), thread_name_prefix="hbase-multiget") as executor:
+                results = list(executor.map(lambda batch: self.multiget_batch(batch, column_family, wire_format), batches))
+        else:
+            results = [self.multiget_batch(batch, column_family, wire_format) for batch in batches]
+        for result in results:
+            rows.update(result)
+        self.cache_rows(rows, missing, column_family, wire_format)
+        return [dict(rows.get(row_key, {})) for row_key in row_keys]
+
+    def delete_row(self, row_key, invalidate=True):
+        """
+        Delete a single row by key (over the pooled keep-alive session, so delete loops
+        do not open a connection per row)
+
+        Parameters:
+            row_key: str - row key to delete
+            invalidate: bool - drop the cached reads covering the row (bulk deletes do it once at the end instead)
+        """
+        url = self.url + "/" + self.table + "/" + requests.utils.quote(row_key, safe="")
+        try:
+            return(self.request("delete", "DELETE", url))
+        finally:
+            if invalidate:
+                self.invalidate(row_key)
+
+    def invalidate(self, row_prefix=None):
+        """
+        Drop the cached reads of this table that overlap row keys starting with row_prefix
+        (all of them without a prefix). Returns the number of cache entries dropped.
+        """
+        return self.cache.invalidate(self.table, row_prefix) if self.cache is not None else 0
+
+    def delete_rows(self, row_keys, parallelism=16, rate=None, on_progress=None):
+        """
+        Delete many rows by key with concurrent, throttled DELETEs (see HBaseBulkDeleter).
+        Returns a dict of stats (rows, deleted, failed, seconds, rows_per_sec, failed_keys)
+
+        Parameters:
+            row_keys: iterable of str - row keys to delete (consumed lazily)
+            parallelism: int - DELETE requests in flight (keep pool_size at least this large)
+            rate: float - maximum DELETE requests per second (None = unthrottled)
+            on_progress: callable - optional callback receiving the running stats every 1000 rows
+        """
+        deleter = HBaseBulkDeleter(lambda row_key: self.delete_row(row_key, False), parallelism, rate, on_progress=on_progress)
+        try:
+            return deleter.delete(row_keys)
+        finally:
+            self.invalidate()
+
+    def delete_prefix(self, row_prefix, parallelism=16, rate=None, on_progress=None, batch=10000, throttle=None):
+        """
+        Delete every row whose key starts with row_prefix. The keys come from a key-only range scan
+        and are deleted while the scan is still running, so neither the rows nor their keys are
+        collected first.
+        Returns a dict of stats (rows, deleted, failed, seconds, rows_per_sec, failed_keys)
+
+        Parameters:
+            row_prefix: str - prefix of the row keys to delete
+            parallelism: int - DELETE requests in flight (keep pool_size at least this large)
+            rate: float - maximum DELETE requests per second (None = unthrottled)
+            on_progress: callable - optional callback receiving the running stats every 1000 rows
+            batch: int - rows per scanner batch of the key scan
+            throttle: RequestThrottle - optional rate limit shared with other deletes (instead of rate)
+        """
+        spec = ScanSpec(batch).prefix(row_prefix).filter(key_only(), first_key_only())
+        deleter = HBaseBulkDeleter(lambda row_key: self.delete_row(row_key, False), parallelism, rate, on_progress=on_progress, throttle=throttle)
+        try:
+            with closing(self.iter_rows(spec)) as rows:
+                return deleter.delete(row_key for row_key, _ in rows)
+        finally:
+            self.invalidate(row_prefix)
+
+    def iter_cells(self, all_data, wire_format="json"):
+        """
+        Generator over the rows of scanner batches in either wire format,
+        yielding (row_key, [(column, value), ...]) with everything as raw bytes.
+        A scanner batch is limited in cells, not rows, so a row cut off at the end of one batch
+        and continued in the next is put back together.
+        The time spent decoding each batch is reported to the hooks as a "decode" event.
+        """
+        current_key, current = None, []
         for batch in all_data:
-            if batch:  # Check if batch is not empty
-                batch_json = json.loads(batch)
-                if "Row" in batch_json:
-                    for row in batch_json["Row"]:
-                        row_key = base64.b64decode(row["key"]).decode('utf-8')
-                        results[row_key] = {}
-                        
-                        for cell in row["Cell"]:
-                            # Decode column family:qualifier
-                            col_full = base64.b64decode(cell["column"]).decode('utf-8')
-                            # Get just the qualifier (after the colon)
-                            col_name = col_full.split(":", 1)[1] if ":" in col_full else col_full
-                            # Decode value
-                            value = base64.b64decode(cell["$"]).decode('utf-8')
-                            results[row_key][col_name] = value
-        
+            if not batch:
+                continue
+            st = time.perf_counter()
+            if wire_format == "protobuf":
+                rows = decode_cell_set(batch)
+            else:
+                rows = [(base64.b64decode(row["key"]), [(base64.b64decode(cell["column"]), base64.b64decode(cell["$"])) for cell in row["Cell"]])
+                        for row in json.loads(batch).get("Row", [])]
+            if self.hooks:
+                seconds = time.perf_counter() - st
+                self.record("decode", seconds, rows=len(rows), cells=sum(len(cells) for _, cells in rows), decode_seconds=seconds)
+            for key, cells in rows:
+                if key == current_key:
+                    current.extend(cells)
+                    continue
+                if current_key is not None:
+                    yield current_key, current
+                current_key, current = key, cells
+        if current_key is not None:
+            yield current_key, current
+
+    def decode_rows(self, all_data, wire_format="json", families=False):
+        """
+        Generator over (row_key, {column_name: value}) for scanner batches
+        (column names without the column family - with families "<family>:<qualifier>", for tables
+        whose families share qualifiers - values decoded as utf-8 text, with wire_format="protobuf"
+        values are left as raw bytes)
+        """
+        names = {}
+        for key, cells in self.iter_cells(all_data, wire_format):
+            row = {}
+            for column, value in cells:
+                col_name = names.get(column)
+                if col_name is None:
+                    # Get just the qualifier (after the colon)
+                    col_full = column.decode('utf-8')
+                    col_name = names[column] = col_full.split(":", 1)[1] if ":" in col_full and not families else col_full
+                row[col_name] = value if wire_format == "protobuf" else value.decode('utf-8')
+            yield key.decode('utf-8'), row
+
+    def parse_scan_results(self, all_data, wire_format="json", families=False):
+        """
+        Decode scanner batches into a dict of {row_key: {column_name: value}}
+        (column names as decode_rows gives them, values decoded as utf-8 text -
+        with wire_format="protobuf" values are left as raw bytes)
+        """
+        results = {}
+        for row_key, row in self.decode_rows(all_data, wire_format, families):
+            results.setdefault(row_key, {}).update(row)
         return results
 
-    def hbase_to_df(self, columns_of_interest, all_data, weekenddata_column_family, telemetry_column_family):
-        # add uuid to columns_of_interest
-        columns_of_interest = "uuid," + columns_of_interest
-        # add TrackID to columns_of_interest
-        columns_of_interest = "TrackID," + columns_of_interest
-        # initalize dict for columns of interest
-        data_dict = {}
-        for index, col in enumerate(columns_of_interest.replace(" ", "").split(',')):
-            data_dict[col] = []
-            
-        # loop over all batch returns
+    def hbase_to_df(self, columns_of_interest, all_data, weekenddata_column_family, telemetry_column_family, schema=None, wire_format="json"):
+        """
+        Decode telemetry rows written one row per sample (keys "<uuid>:<sample index>") into a DataFrame
+        with one typed NumPy column per channel, in sample index order.
+        The batches are only walked row by row; each column is then base64 decoded and parsed in one
+        vectorized pass (HbaseEncoder.b64decode_values / parse_values) and scattered into an array
+        allocated once the row count is known, so no Python object is created per cell value. Samples missing a cell are NaN in float columns and 0 / False / "" otherwise.
+        A value that is not a number (eg. a channel written as text) is NaN in a default float64 column;
+        channels given a numeric dtype in schema raise instead.
+
+        Parameters:
+            columns_of_interest: str - comma separated channels to decode (uuid and TrackID are always added)
+            all_data: iterable of str - scanner batches, as returned by read_full_table or iter_batches
+            weekenddata_column_family: str - column family whose cells are skipped
+            telemetry_column_family: str - column family of the telemetry channels (e.g., "telemetry")
+            schema: dict - optional {channel: dtype} (e.g., {"Gear": "int32", "TrackID": "int32"}); other
+                    channels are float64, uuid and TrackID str (the loader writes TrackID "unknown" without metadata)
+            wire_format: str - format the batches were read in ("json" or "protobuf")
+        """
+        columns = [col for col in ("TrackID,uuid," + columns_of_interest).replace(" ", "").split(',') if col]
+        dtypes = {col: np.dtype("float64") for col in columns}
+        dtypes.update({"uuid": np.dtype(object), "TrackID": np.dtype(object)})
+        dtypes.update((col, np.dtype(object if dtype in ("str", str) else dtype)) for col, dtype in (schema or {}).items() if col in dtypes)
+        telemetry_prefix = telemetry_column_family + ":"
+
+        # rows are gathered per column layout (the tuple of their columns - normally one layout for the
+        # whole scan) and transposed into columns with zip(), so the cells are never touched one by one
+        layouts = {}
+        sample_index = []
+        last_key = None
+        # decode time for the hooks, leaving out the waits for batches still being read
+        decode_seconds = 0.0
         for batch in all_data:
-            for row in json.loads(batch)["Row"]:
-                key = base64.b64decode(row["key"]).decode('utf-8')
-                for column in row["Cell"]:
-                    # filter weekenddata
-                    if base64.b64decode(column["column"]).decode('utf-8')[:len(weekenddata_column_family)] != weekenddata_column_family:
-                        column_name = base64.b64decode(column["column"]).decode('utf-8')[len(telemetry_column_family)+1:]
-                        value = base64.b64decode(column["$"]).decode('utf-8')
-                        data_dict[column_name].insert(int(key.split(":")[1]),value)
-
-        #df = pd.DataFrame(data_dict).sort_values("SessionTick", key=pd.to_numeric)
-        df = pd.DataFrame(data_dict)
-        #df["SessionTick"] = pd.to_numeric(df["SessionTick"])
-        #df = df.sort_values(["uuid", "SessionTick"], ascending=[True, True])
-        return(df)
\ No newline at end of file
+            if not batch:
+                continue
+            st = time.perf_counter()
+            if wire_format == "protobuf":
+                rows = decode_cell_set(batch)
+            else:
+                rows = ((row["key"], map(_CELL, row["Cell"])) for row in json.loads(batch).get("Row", []))
+            for key, cells in rows:
+                # a row split over two batches continues the same sample
+                if key != last_key:
+                    row_key = key if wire_format == "protobuf" else base64.b64decode(key)
+                    sample_index.append(int(row_key.split(b":")[1]))
+                    last_key = key
+                transposed = tuple(zip(*cells))
+                if not transposed:
+                    continue
+                layout, row_values = transposed
+                group = layouts.get(layout)
+                if group is None:
+                    group = layouts[layout] = ([], [])
+                group[0].append(len(sample_index) - 1)
+                group[1].append(row_values)
+            decode_seconds += time.perf_counter() - st
+
+        st = time.perf_counter()
+        values = {col: [] for col in columns}
+        ordinals = {col: [] for col in columns}
+        for layout, (group_ordinals, group_values) in layouts.items():
+            for column, column_values in zip(layout, zip(*group_values)):
+                # column family:qualifier -> channel, skipping weekend data and unwanted channels
+                col_full = (column if wire_format == "protobuf" else base64.b64decode(column)).decode('utf-8')
+                if col_full.startswith(weekenddata_column_family) or not col_full.startswith(telemetry_prefix):
+                    continue
+                col_name = col_full[len(telemetry_prefix):]
+                if col_name in values:
+                    values[col_name].extend(column_values)
+                    ordinals[col_name].extend(group_ordinals)
+
+        # position of every row in sample index order
+        count = len(sample_index)
+        position = np.empty(count, dtype=np.int64)
+        position[np.argsort(np.array(sample_index, dtype=np.int64), kind="stable")] = np.arange(count)
+        decode_values = join_values if wire_format == "protobuf" else b64decode_values
+
+        data = {}
+        for col in columns:
+            dtype = dtypes[col]
+            if dtype.kind == 'f':
+                array = np.full(count, np.nan, dtype=dtype)
+            elif dtype.kind == 'O':
+                array = np.full(count, "", dtype=object)
+            else:
+                array = np.zeros(count, dtype=dtype)
+            if values[col]:
+                decoded = decode_values(values[col])
+                try:
+                    parsed = parse_values(*decoded, dtype)
+                except Exception:
+                    if col in (schema or {}) or dtype.kind != 'f':
+                        raise
+                    parsed = np.array([_float_or_nan(value) for value in parse_values(*decoded, object)], dtype=dtype)
+                array[position[np.array(ordinals[col], dtype=np.int64)]] = parsed
+            data[col] = array
+        if self.hooks:
+            decode_seconds += time.perf_counter() - st
+            self.record("decode", decode_seconds, rows=count, cells=sum(len(column_values) for column_values in values.values()), decode_seconds=decode_seconds)
+        return pd.DataFrame(data)
+
+    def sample_blocks_to_arrays(self, all_data, telemetry_column_family, columns=None, wire_format="json"):
+        """
+        Decode rows written in the packed sample block layout (see HbaseEncoder.SampleBlockEncoder)
+        into NumPy arrays. Blocks are reassembled in sample order using their block_start cell.
+        Returns dict of {channel: numpy array of every sample}
+
+        Parameters:
+            all_data: iterable of str - scanner batches, as returned by read_full_table or iter_batches
+            telemetry_column_family: str - column family the blocks were written to (e.g., "telemetry")
+            columns: list of str - optional channels to decode, defaults to every channel in the schema
+            wire_format: str - format the batches were read in ("json" or "protobuf")
+        """
+        blocks = []
+        for key, row_cells in self.iter_cells(all_data, wire_format):
+            block = decode_sample_block(dict(row_cells), telemetry_column_family, columns)
+            if block is not None:
+                blocks.append(block)
+
+        blocks.sort(key=lambda block: block[0])
+        result = {}
+        for _, arrays in blocks:
+            for col, values in arrays.items():
+                result.setdefault(col, []).append(values)
+        return {col: np.concatenate(parts) for col, parts in result.items()}
+
+    def read_sample_blocks(self, uuid_value, columns=None, telemetry_column_family="telemetry", batch=None, wire_format="json"):
+        """
+        Read one session stored in the packed sample block layout straight into NumPy arrays.
+        Only the requested channels (plus the block bookkeeping cells) are fetched from the server.
+        Returns dict of {channel: numpy array of every sample}
+
+        Parameters:
+            uuid_value: str - session uuid (row keys are "<uuid>:<block>")
+            columns: list of str - optional channels to read, defaults to all of them
+            telemetry_column_family: str - column family the blocks were written to
+            batch: int - cells per scanner batch (None = sized by the batch sizer)
+            wire_format: str - "json" or "protobuf" (protobuf skips base64 for the sample arrays)
+        """
+        spec = ScanSpec(batch).prefix(str(uuid_value) + ":")
+        if columns is None:
+            spec.columns(telemetry_column_family)
+        else:
+            spec.columns(*[telemetry_column_family + ":" + col for col in ["block_start", "block_rows", "block_schema"] + list(columns)])
+
+        with closing(self.iter_batches(spec, wire_format)) as batches:
+            return self.sample_blocks_to_arrays(batches, telemetry_column_family, columns, wire_format)
+
+class AsyncHBaseRestTable():
+    '''
+    asyncio variant of HBaseRestTable: every call is a coroutine and up to `concurrency` requests
+    are in flight at once, so scans, multi-gets, inserts and deletes can overlap each other and
+    the caller's own decoding instead of waiting on one round trip at a time.
+    The requests run on the pooled keep-alive session of an HBaseRestTable in a thread pool of
+    `concurrency` workers (the project has no async HTTP dependency) - the event loop never blocks
+    on the network and the worker count is the concurrency limit.
+
+    Parameters
+        ----------
+        table : str
+            name of the HBase or Data Fabric (binary) table
+        concurrency : int
+            maximum number of requests in flight (also the connection pool size)
+        session : requests.Session
+            optional existing session to share its connection pool
+        cache : HBaseReadCache
+            optional read cache for get_row / multiget (and invalidated by inserts and deletes)
+        hooks : list
+            optional callables receiving one dict per REST call (see HBaseRest)
+        batch_sizer : ScanBatchSizer
+            optional sizer for the reads of scans without a batch of their own
+        compression, accept_encoding, compress_min_bytes :
+            request / response body compression (see HBaseRest)
+        gateways : GatewayPool
+            optional REST gateways to spread the requests over (see HBaseRest)
+    '''
+    def __init__(self, user, password, rest_node, rest_node_ip, rest_node_port, table, concurrency=8, session=None, cache=None, hooks=None, batch_sizer=None,
+                 compression=None, accept_encoding="gzip, deflate", compress_min_bytes=1024, gateways=None):
+        self.table = HBaseRestTable(user, password, rest_node, rest_node_ip, rest_node_port, table, pool_size=concurrency, session=session, cache=cache, hooks=hooks, batch_sizer=batch_sizer,
+                                    compression=compression, accept_encoding=accept_encoding, compress_min_bytes=compress_min_bytes, gateways=gateways)
+        self.concurrency = concurrency
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="hbase-rest")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+    async def call(self, fn, *args):
+        '''
+        Run a blocking HBaseRestTable method in the request pool
+        '''
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def create_scanner(self, filter):
+        return await self.call(self.table.create_scanner, filter)
+
+    async def read_batch(self, scanner, wire_format="json", cells=None):
+        return await self.call(self.table.read_batch, scanner, wire_format, cells)
+
+    async def delete_scanner(self, scanner):
+        return await self.call(self.table.delete_scanner, scanner)
+
+    async def insert(self, data, wire_format="json"):
+        return await self.call(self.table.insert, data, wire_format)
+
+    async def get_row(self, row_key, column_family=None, wire_format="json"):
+        return await self.call(self.table.get_row, row_key, column_family, wire_format)
+
+    async def delete_row(self, row_key):
+        return await self.call(self.table.delete_row, row_key)
+
+    async def scan(self, filter, wire_format="json"):
+        '''
+        Async generator over the raw batches of a scanner (JSON text, or CellSet bytes with wire_format="protobuf").
+        The next batch is requested before the current one is handed out, so reading overlaps
+        whatever the caller does with each batch. The scanner is deleted when the generator
+        finishes or is closed - a caller that stops early should `await batches.aclose()`.
+        Reads of a ScanSpec without a batch are sized as in HBaseRestTable.iter_batches.
+        A read failing with anything but 204 (scanner exhausted) raises, as in iter_batches.
+        '''
+        if isinstance(filter, ScanSpec) and filter.is_empty():
+            return
+        sizer = self.table.batch_sizer if isinstance(filter, ScanSpec) and filter.batch is None else None
+        scanner = await self.create_scanner(filter)
+
+        async def read():
+            cells = sizer.cells(self.table.table) if sizer is not None else None
+            st = time.perf_counter()
+            res = await self.read_batch(scanner, wire_format, cells)
+            return res, cells, time.perf_counter() - st
+
+        try:
+            pending = asyncio.ensure_future(read())
+            previous = None
+            try:
+                while True:
+                    res, cells, seconds = await pending
+                    if res.status_code == 204:
+                        break
+                    if res.status_code != 200:
+                        raise Exception(f"Failed to read scanner batch: HTTP {res.status_code}")
+                    if sizer is not None:
+                        if previous is not None:
+                            sizer.observe(self.table.table, *previous)
+                        previous = (cells, len(res.content), seconds)
+                    pending = asyncio.ensure_future(read())
+                    yield res.content if wire_format == "protobuf" else res.text
+            finally:
+                if not pending.done():
+                    pending.cancel()
+                    await asyncio.gather(pending, return_exceptions=True)
+        finally:
+            await self.delete_scanner(scanner)
+
+    async def scan_rows(self, filter, wire_format="json"):
+        '''
+        Read a whole scanner, returns dict of {row_key: {column_name: value}}
+        '''
+        all_data = [batch async for batch in self.scan(filter, wire_format)]
+        return self.table.parse_scan_results(all_data, wire_format)
+
+    async def multiget(self, row_keys, column_family=None, wire_format="json", max_keys=100, max_url_bytes=4096):
+        '''
+        Read many rows by key, many keys per multiget request with the requests running concurrently
+        (see HBaseRestTable.multiget).
+        Returns a list with one {column_name: value} dict per key, in the order of row_keys ({} for keys that do not exist)
+        '''
+        rows, missing = self.table.cached_rows(row_keys, column_family, wire_format)
+        batches = self.table.multiget_batches(missing, column_family, max_keys, max_url_bytes)
+        results = await asyncio.gather(*[self.call(self.table.multiget_batch, batch, column_family, wire_format) for batch in batches])
+        for result in results:
+            rows.update(result)
+        self.table.cache_rows(rows, missing, column_family, wire_format)
+        return [dict(rows.get(row_key, {})) for row_key in row_keys]
+
+    async def multiget_cells(self, row_keys, column_family=None, wire_format="json", max_keys=100, max_url_bytes=4096):
+        '''
+        Read many rows by key like multiget, but undecoded: returns [(row_key, [(column, value), ...]), ...]
+        in bytes (see HBaseRestTable.iter_cells), in the order of row_keys with the keys that do not exist left out
+        '''
+        batches = self.table.multiget_batches(row_keys, column_family, max_keys, max_url_bytes)
+        results = await asyncio.gather(*[self.call(self.table.read_multiget, batch, column_family, wire_format) for batch in batches])
+        rows = {key.decode('utf-8'): (key, cells) for key, cells in self.table.iter_cells([data for data in results if data is not None], wire_format)}
+        return [rows[row_key] for row_key in dict.fromkeys(row_keys) if row_key in rows]
+
+    async def get_rows(self, row_keys, column_family=None, wire_format="json"):
+        '''
+        Read many rows by key (multiget requests running concurrently).
+        Returns dict of {row_key: {column_name: value}} for the rows that exist
+        '''
+        rows = await self.multiget(row_keys, column_family, wire_format)
+        return {row_key: row for row_key, row in zip(row_keys, rows) if row}
+
+    async def insert_many(self, payloads, wire_format="json"):
+        '''
+        Send several payloads ({"Row":[...]} or CellSet) concurrently, returns the responses in order
+        '''
+        return await asyncio.gather(*[self.insert(data, wire_format) for data in payloads])
+
+    async def delete_rows(self, row_keys):
+        '''
+        Delete many rows by key concurrently, returns the keys that could not be deleted
+        '''
+        responses = await asyncio.gather(*[self.delete_row(row_key) for row_key in row_keys], return_exceptions=True)
+        return [row_key for row_key, res in zip(row_keys, responses)
+                if isinstance(res, Exception) or res.status_code not in (200, 204)]
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.table.close()
+
+class HBaseChunkedWriter():
+    '''
+    Streaming writer that sends rows to a table in bounded chunks instead of one giant PUT.
+    Row fragments are buffered until either max_rows or max_bytes is reached and then inserted
+    as their own {"Row":[...]} payload, so memory stays flat regardless of session length.
+    A chunk that fails is retried on its own (with exponential backoff) before giving up.
+    With in_flight > 1 up to that many chunk PUTs run concurrently while the next chunk is being
+    buffered; chunks still complete (and on_chunk fires) in the order they were added.
+    With wire_format="protobuf" the fragments are CellSet bytes (eg. TelemetryRowEncoder.iter_rows
+    with the same wire_format) and chunks are sent as application/x-protobuf.
+
+    Parameters
+        ----------
+        table : HBaseRestTable
+            table the rows are written to
+        max_rows : int
+            flush once this many rows are buffered
+        max_bytes : int
+            flush once the buffered payload reaches this many bytes
+        retries : int
+            attempts per chunk before an exception is raised
+        retry_delay : float
+            seconds to wait before the first retry (doubled on every further retry)
+        on_chunk : callable
+            optional callback receiving a dict of per-chunk stats
+            (chunk, rows, bytes, seconds, attempts, rows_per_sec, mb_per_sec, total_rows)
+        in_flight : int
+            maximum number of chunk inserts running at once (1 = send each chunk before buffering the next)
+        wire_format : str
+            "json" or "protobuf", must match the fragments passed to add()
+    '''
+    def __init__(self, table, max_rows=5000, max_bytes=16*1024*1024, retries=3, retry_delay=2, on_chunk=None, in_flight=1, wire_format="json"):
+        self.table = table
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.on_chunk = on_chunk
+        self.in_flight = in_flight
+        self.wire_format = wire_format
+        self.executor = None
+        self.sending = deque()
+        self.pending = []
+        self.pending_rows = 0
+        self.pending_bytes = 0
+        self.chunks_sent = 0
+        self.rows_sent = 0
+        self.bytes_sent = 0
+        self.seconds = 0.0
+
+    def add(self, fragment, row_count):
+        '''
+        Queue comma separated row definitions (as produced by TelemetryRowEncoder.iter_rows)
+        and flush whenever a limit is reached.
+        '''
+        if self.pending and self.pending_bytes + len(fragment) > self.max_bytes:
+            self.send()
+        self.pending.append(fragment)
+        self.pending_rows += row_count
+        self.pending_bytes += len(fragment)
+        if self.pending_rows >= self.max_rows or self.pending_bytes >= self.max_bytes:
+            self.send()
+
+    def write(self, fragments):
+        '''
+        Consume an iterable of (chunk_start, chunk_stop, fragment) tuples and flush the remainder.
+        Returns the total number of rows written.
+        '''
+        for chunk_start, chunk_stop, fragment in fragments:
+            self.add(fragment, chunk_stop - chunk_start)
+        self.flush()
+        return self.rows_sent
+
+    def flush(self):
+        '''
+        Send the buffered rows and wait until every chunk is written
+        '''
+        self.send()
+        while self.sending:
+            self.complete()
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+    def close(self):
+        '''
+        Stop writing without sending the buffered rows (eg. once the file failed): waits for the chunks
+        already running, so on_chunk still fires for those that complete, but does not raise their failures
+        '''
+        self.pending = []
+        self.pending_rows = 0
+        self.pending_bytes = 0
+        while self.sending:
+            try:
+                self.complete()
+            except Exception:
+                pass
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+    def send(self):
+        '''
+        Turn the buffered rows into a chunk and insert it - in the background when in_flight > 1,
+        after waiting for the oldest chunk if in_flight chunks are already running
+        '''
+        if not self.pending:
+            return
+        if self.wire_format == "protobuf":
+            payload = b''.join(self.pending)
+        else:
+            payload = '{"Row":[' + ', '.join(self.pending) + ']}'
+        rows = self.pending_rows
+        self.pending = []
+        self.pending_rows = 0
+        self.pending_bytes = 0
+
+        if self.in_flight <= 1:
+            self.account(rows, len(payload), *self.insert_chunk(payload, rows, self.chunks_sent + 1))
+            return
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.in_flight, thread_name_prefix="hbase-writer")
+        while len(self.sending) >= self.in_flight:
+            self.complete()
+        chunk = self.chunks_sent + len(self.sending) + 1
+        self.sending.append((rows, len(payload), self.executor.submit(self.insert_chunk, payload, rows, chunk)))
+
+    def complete(self):
+        '''
+        Wait for the oldest running chunk (an insert failure is raised here)
+        '''
+        rows, size, future = self.sending.popleft()
+        try:
+            elapsed, attempt = future.result()
+        except Exception:
+            for _, _, other in self.sending:
+                other.cancel()
+            self.sending.clear()
+            self.executor.shutdown(wait=True)
+            self.executor = None
+            raise
+        self.account(rows, size, elapsed, attempt)
+
+    def insert_chunk(self, payload, rows, chunk):
+        '''
+        Insert one chunk with retries, returns (seconds, attempts)
+        '''
+        st = time.time()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                res = self.table.insert(payload, self.wire_format, rows=rows)
+                if res.status_code == 200:
+                    break
+                error = f"HTTP {res.status_code}"
+            except Exception as e:
+                error = str(e)
+            if attempt >= self.retries:
+                raise Exception(f"Failed to insert chunk {chunk} ({rows} rows) after {attempt} attempts: {error}")
+            time.sleep(self.retry_delay * 2 ** (attempt - 1))
+        return time.time() - st, attempt
+
+    def account(self, rows, size, elapsed, attempt):
+        self.chunks_sent += 1
+        self.rows_sent += rows
+        self.bytes_sent += size
+        self.seconds += elapsed
+        if self.on_chunk:
+            self.on_chunk({
+                'chunk': self.chunks_sent,
+                'rows': rows,
+                'bytes': size,
+                'seconds': elapsed,
+                'attempts': attempt,
+                'total_rows': self.rows_sent,
+                'rows_per_sec': rows / elapsed if elapsed else float('inf'),
+                'mb_per_sec': size / (1024*1024) / elapsed if elapsed else float('inf')
+            })
+
+class ScanBatchSizer():
+    '''
+    Chooses the cell count of every scanner read (the gateway's ?c= parameter) from what earlier
+    reads of the same table returned, instead of one fixed batch for every scan: a fixed small
+    batch turns a big scan into thousands of round trips, a fixed large one into responses of
+    hundreds of MB. Bytes and seconds per cell are tracked per table (smoothed, from full batches
+    only) and each read asks for as many cells as fit both target_bytes and target_seconds.
+    The batch grows by at most 4x per batch and shrinks at once.
+    With a path the learned values are loaded at start and written by save(), so the next run
+    starts every table at the batch it ended with.
+
+    Parameters
+        ----------
+        target_bytes : int
+            response size to aim for
+        target_seconds : float
+            response time to aim for
+        initial_cells : int
+            batch of a table with nothing learned yet
+        min_cells, max_cells : int
+            bounds of every batch
+        path : str
+            optional JSON file holding the learned values between runs
+    '''
+    SMOOTHING = 0.3
+
+    def __init__(self, target_bytes=4*1024*1024, target_seconds=1.0, initial_cells=1000, min_cells=100, max_cells=100000, path=None):
+        self.target_bytes = target_bytes
+        self.target_seconds = target_seconds
+        self.initial_cells = initial_cells
+        self.min_cells = min_cells
+        self.max_cells = max_cells
+        self.path = path
+        self.tables = {}
+        self.dirty = False
+        self.saved = time.monotonic()
+        self.lock = threading.Lock()
+        # serializes save(), so concurrent saves never interleave their writes and replaces
+        self.save_lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self.tables = json.load(f)
+            except ValueError:
+                # unreadable state file - start over, it is rewritten on the next save()
+                self.tables = {}
+
+    def cells(self, table):
+        '''
+        Cells to ask for in the next read of table
+        '''
+        with self.lock:
+            state = self.tables.get(requests.utils.unquote(table))
+            return state["cells"] if state else self.initial_cells
+
+    def observe(self, table, cells, size, seconds):
+        '''
+        Learn from one full batch (cells asked for and returned, response bytes, seconds the read took).
+        Returns the table's next batch.
+        '''
+        if cells <= 0:
+            return self.cells(table)
+        bytes_per_cell = size / cells
+        seconds_per_cell = seconds / cells
+        with self.lock:
+            key = requests.utils.unquote(table)
+            state = self.tables.get(key)
+            if state is None:
+                state = self.tables[key] = {"cells": self.initial_cells, "bytes_per_cell": bytes_per_cell, "seconds_per_cell": seconds_per_cell, "batches": 0}
+            else:
+                state["bytes_per_cell"] += self.SMOOTHING * (bytes_per_cell - state["bytes_per_cell"])
+                state["seconds_per_cell"] += self.SMOOTHING * (seconds_per_cell - state["seconds_per_cell"])
+            target = min(self.target_bytes / max(state["bytes_per_cell"], 1e-9), self.target_seconds / max(state["seconds_per_cell"], 1e-12))
+            state["cells"] = int(max(self.min_cells, min(self.max_cells, target, state["cells"] * 4)))
+            state["batches"] += 1
+            self.dirty = True
+            return state["cells"]
+
+    def save(self, min_interval=0):
+        '''
+        Write the learned values to path (when anything changed since the last save, and at most
+        once per min_interval seconds - eg. from a long-running process saving as it goes).
+        Safe to call from several threads: the file is written to a unique temporary name and
+        swapped in, one save at a time.
+        '''
+        if not self.path:
+            return
+        with self.save_lock:
+            with self.lock:
+                if not self.dirty or time.monotonic() - self.saved < min_interval:
+                    return
+                data = json.dumps(self.tables, indent=1, sort_keys=True)
+                self.dirty = False
+                self.saved = time.monotonic()
+            fd, tmp = tempfile.mkstemp(prefix=os.path.basename(self.path) + ".", suffix=".tmp", dir=os.path.dirname(os.path.abspath(self.path)))
+            try:
+                with os.fdopen(fd, "w") as f:
+                    f.write(data)
+                os.replace(tmp, self.path)
+            except BaseException:
+                with self.lock:
+                    self.dirty = True
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+
+    def stats(self):
+        '''
+        {table: {cells, bytes_per_cell, seconds_per_cell, batches}}
+        '''
+        with self.lock:
+            return {table: dict(state) for table, state in self.tables.items()}
+
+class RequestThrottle():
+    '''
+    Thread-safe limit on how many requests per second are started, shared by every worker of a
+    bulk operation so the gateway sees a steady rate instead of bursts. Each acquire() books the
+    next free slot (1 / rate seconds apart) and sleeps until it comes up; up to `burst` requests
+    may start back to back after an idle period.
+
+    Parameters
+        ----------
+        rate : float
+            requests per second (None or 0 = unlimited)
+        burst : int
+            requests allowed to start at once after being idle
+    '''
+    def __init__(self, rate=None, burst=1):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.burst = max(1, burst)
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now - (self.burst - 1) * self.interval)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+class GatewayPool():
+    '''
+    Spreads requests over several HBase REST gateways (the REST server runs on several cluster
+    nodes, each its own JVM and throughput ceiling) - used through a GatewaySession. A call goes to
+    the healthy endpoint with the fewest calls in flight, at most max_in_flight per endpoint (callers
+    wait for a free slot). Scanner reads and deletes stay on the node that created the scanner.
+    An endpoint failing `failures` calls in a row (connection errors, HTTP 5xx) is ejected for
+    eject_seconds, doubled for each ejection in a row up to max_eject_seconds; afterwards it is tried
+    again and one more failure ejects it again. When every endpoint is ejected they are all used.
+    Thread safe; share one pool between the clients of a process.
+
+    Parameters
+        ----------
+        endpoints : list
+            gateways as "host:port" or "host" (then with port)
+        port : str
+            port of the endpoints listed without one
+        max_in_flight : int
+            calls in flight per endpoint
+        failures : int
+            consecutive failed calls that eject an endpoint
+        eject_seconds : float
+            first ejection period
+        max_eject_seconds : float
+            longest ejection period
+    '''
+    def __init__(self, endpoints, port=None, max_in_flight=8, failures=3, eject_seconds=10, max_eject_seconds=300):
+        names = [endpoint if ':' in endpoint or not port else f"{endpoint}:{port}" for endpoint in endpoints]
+        if not names:
+            raise Exception("GatewayPool needs at least one endpoint")
+        self.endpoints = OrderedDict((name.lower(), {
+            'name': name.lower(), 'in_flight': 0, 'requests': 0, 'errors': 0, 'failures': 0,
+            'ejections': 0, 'ejected_until': 0.0, 'ejected_row': 0
+        }) for name in names)
+        self.max_in_flight = max_in_flight
+        self.failures = failures
+        self.eject_seconds = eject_seconds
+        self.max_eject_seconds = max_eject_seconds
+        self.cond = threading.Condition()
+
+    def acquire(self, pinned=None, exclude=()):
+        '''
+        Endpoint for the next call (blocks while its endpoints are all at max_in_flight), counted in
+        flight until release(). pinned ("host:port") forces that endpoint - None when it is not in the pool.
+        exclude: endpoint names already tried by this call
+        '''
+        with self.cond:
+            while True:
+                if pinned is not None:
+                    endpoint = self.endpoints.get(pinned.lower())
+                    if endpoint is None:
+                        return None
+                    candidates = [endpoint]
+                else:
+                    now = time.monotonic()
+                    untried = [endpoint for endpoint in self.endpoints.values() if endpoint['name'] not in exclude]
+                    candidates = [endpoint for endpoint in untried if endpoint['ejected_until'] <= now] or untried or list(self.endpoints.values())
+                free = [endpoint for endpoint in candidates if endpoint['in_flight'] < self.max_in_flight]
+                if free:
+                    endpoint = min(free, key=itemgetter('in_flight', 'requests'))
+                    endpoint['in_flight'] += 1
+                    endpoint['requests'] += 1
+                    return endpoint
+                # woken by release(); the timeout picks up endpoints coming back from ejection
+                self.cond.wait(1.0)
+
+    def release(self, endpoint, ok):
+        '''
+        End of a call started with acquire(); ok=False counts it as a failure of the endpoint
+        '''
+        with self.cond:
+            endpoint['in_flight'] -= 1
+            if ok:
+                endpoint['failures'] = 0
+                endpoint['ejected_row'] = 0
+            else:
+                endpoint['errors'] += 1
+                endpoint['failures'] += 1
+                now = time.monotonic()
+                if endpoint['failures'] >= self.failures and endpoint['ejected_until'] <= now:
+                    endpoint['ejected_until'] = now + min(self.eject_seconds * 2 ** endpoint['ejected_row'], self.max_eject_seconds)
+                    endpoint['ejected_row'] += 1
+                    endpoint['ejections'] += 1
+            self.cond.notify()
+
+    def snapshot(self, reset=False):
+        '''
+        {endpoint: {requests, errors, ejections}} (eg. to send back from a worker process), optionally starting over
+        '''
+        with self.cond:
+            counts = {name: {field: endpoint[field] for field in ('requests', 'errors', 'ejections')}
+                      for name, endpoint in self.endpoints.items()}
+            if reset:
+                for endpoint in self.endpoints.values():
+                    endpoint.update(requests=0, errors=0, ejections=0)
+            return counts
+
+    def merge(self, snapshot):
+        '''
+        Add the counts of another pool's snapshot()
+        '''
+        with self.cond:
+            for name, counts in snapshot.items():
+                endpoint = self.endpoints.get(name)
+                if endpoint is not None:
+                    for field, value in counts.items():
+                        endpoint[field] += value
+
+    def report(self):
+        '''
+        One line per endpoint: calls, failed calls, ejections and whether it is ejected now
+        '''
+        now = time.monotonic()
+        with self.cond:
+            return "\n".join(
+                f"{name}: {endpoint['requests']} calls, {endpoint['errors']} failed, {endpoint['ejections']} ejections"
+                + (f" (ejected for {endpoint['ejected_until'] - now:.0f}s)" if endpoint['ejected_until'] > now else "")
+                for name, endpoint in self.endpoints.items())
+
+class GatewaySession(requests.Session):
+    '''
+    Keep-alive session sending every call through a GatewayPool: the host of each URL is replaced
+    by the endpoint the pool picks, except for scanner URLs (<table>/scanner/<id>, the Location a
+    gateway returned), which stay pinned to their node. A call that cannot connect is retried on
+    the other endpoints (not when its body is a stream that was already consumed, which is why
+    HBaseRest compresses request bodies in memory over a GatewaySession).
+    Works as a drop-in for requests.Session, eg. HBaseRest(session=...) or the daily jobs' client.
+
+    Parameters
+        ----------
+        gateways : GatewayPool
+            endpoints to spread the calls over
+        pool_size : int
+            connections kept open per endpoint
+    '''
+    def __init__(self, gateways, pool_size=10):
+        super().__init__()
+        self.gateways = gateways
+        adapter = HTTPAdapter(pool_connections=max(pool_size, len(gateways.endpoints)), pool_maxsize=pool_size, pool_block=True)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        pinned = parts.netloc if '/scanner/' in parts.path else None
+        retry = pinned is None and isinstance(request.body, (bytes, str, type(None)))
+        tried = set()
+        while True:
+            endpoint = self.gateways.acquire(pinned, tried)
+            if endpoint is None:
+                return super().send(request, **kwargs)
+            tried.add(endpoint['name'])
+            if pinned is None:
+                request.url = urlunsplit(parts._replace(netloc=endpoint['name']))
+            ok = False
+            try:
+                res = super().send(request, **kwargs)
+                ok = res.status_code < 500
+                return res
+            except requests.exceptions.ConnectionError:
+                if not retry or len(tried) == len(self.gateways.endpoints):
+                    raise
+            finally:
+                self.gateways.release(endpoint, ok)
+
+class HBaseBulkDeleter():
+    '''
+    Deletes many rows through the REST gateway without a sequential DELETE loop. The gateway
+    has no multi-row delete, so the row keys are consumed as a stream (eg. straight from a key-only
+    scanner) and their DELETEs go out concurrently - at most `parallelism` at a time, started no
+    faster than `rate` per second - with memory bounded by the requests in flight, not the row count.
+    A DELETE that fails with a connection error or a 429 / 5xx is retried (with exponential backoff);
+    keys that still fail are collected instead of stopping the run.
+    Size the session's connection pool to at least `parallelism`.
+
+    Parameters
+        ----------
+        delete_row : callable
+            function deleting one row by key and returning the response (eg. HBaseRestTable.delete_row)
+        parallelism : int
+            maximum number of DELETE requests in flight
+        rate : float
+            maximum DELETE requests started per second (None = as fast as parallelism allows)
+        retries : int
+            attempts per row before it counts as failed
+        retry_delay : float
+            seconds to wait before the first retry (doubled on every further retry)
+        on_progress : callable
+            optional callback receiving a dict of stats (rows, deleted, failed, seconds, rows_per_sec)
+            every progress_rows rows and once at the end
+        progress_rows : int
+            rows between two on_progress calls
+        throttle : RequestThrottle
+            optional throttle shared with other deleters (rate is then ignored), so deletes running
+            side by side stay under one combined rate
+    '''
+    def __init__(self, delete_row, parallelism=16, rate=None, retries=3, retry_delay=0.5, on_progress=None, progress_rows=1000, throttle=None):
+        self.delete_row = delete_row
+        self.parallelism = parallelism
+        self.throttle = throttle or RequestThrottle(rate, burst=parallelism)
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.on_progress = on_progress
+        self.progress_rows = progress_rows
+
+    def delete(self, row_keys):
+        '''
+        Delete every row in the iterable row_keys (consumed lazily).
+        Returns a dict of stats (rows, deleted, failed, seconds, rows_per_sec, failed_keys)
+        '''
+        st = time.time()
+        self.rows = self.deleted = 0
+        self.failed_keys = []
+        next_report = self.progress_rows
+        sending = deque()
+        with ThreadPoolExecutor(max_workers=self.parallelism, thread_name_prefix="hbase-delete") as executor:
+            try:
+                for row_key in row_keys:
+                    # Keep a few keys queued per worker so no worker waits on the key source
+                    while len(sending) >= 2 * self.parallelism:
+                        self.complete(*sending.popleft())
+                    sending.append((row_key, executor.submit(self.delete_one, row_key)))
+                    if self.rows >= next_report:
+                        self.report(st)
+                        next_report = self.rows - self.rows % self.progress_rows + self.progress_rows
+                while sending:
+                    self.complete(*sending.popleft())
+            finally:
+                for _, future in sending:
+                    future.cancel()
+        return dict(self.report(st), failed_keys=self.failed_keys)
+
+    def delete_one(self, row_key):
+        '''
+        Delete one row with retries, returns None or the error of the last attempt
+        '''
+        attempt = 0
+        while True:
+            attempt += 1
+            self.throttle.acquire()
+            try:
+                res = self.delete_row(row_key)
+                if res.status_code in (200, 204):
+                    return None
+                error = f"HTTP {res.status_code}"
+                retry = res.status_code == 429 or res.status_code >= 500
+            except Exception as e:
+                error = str(e)
+                retry = True
+            if not retry or attempt >= self.retries:
+                return error
+            time.sleep(self.retry_delay * 2 ** (attempt - 1))
+
+    def complete(self, row_key, future):
+        error = future.result()
+        self.rows += 1
+        if error is None:
+            self.deleted += 1
+        else:
+            self.failed_keys.append((row_key, error))
+
+    def report(self, st):
+        elapsed = time.time() - st
+        stats = {
+            'rows': self.rows,
+            'deleted': self.deleted,
+            'failed': len(self.failed_keys),
+            'seconds': elapsed,
+            'rows_per_sec': self.rows / elapsed if elapsed else float('inf')
+        }
+        if self.on_progress:
+            self.on_progress(stats)
+        return stats
+
+def rows_size(rows):
+    '''
+    Approximate memory of decoded rows {row_key: {column_name: value}} in bytes (string lengths
+    plus a flat allowance for the Python objects), as HBaseReadCache accounts them
+    '''
+    return sum(len(row_key) + 120 + sum(len(column) + len(value) + 120 for column, value in row.items())
+               for row_key, row in rows.items())
+
+class HBaseReadCache():
+    '''
+    Client-side cache for small, slow-changing reads (get_row, multiget, scan_table_by_prefix /
+    scan_table_by_range), so re-reading the same rows skips the round trips to the gateway.
+    Entries are keyed on table plus row key or scanner definition. They expire after the table's
+    TTL and the least recently used are evicted once the cached rows pass max_bytes.
+    Every entry remembers the row key range it covers, so writes invalidate only what they touch:
+    inserts and deletes through a table using the cache drop the overlapping entries. Writes by
+    other processes are only seen once entries expire - pick TTLs the readers can live with.
+    One cache can serve several tables (pass it to each as cache=). Thread safe.
+
+    Parameters
+        ----------
+        max_bytes : int
+            memory cap for the cached rows (approximate, see rows_size)
+        ttl : float
+            seconds an entry stays valid (0 = do not cache)
+        table_ttls : dict
+            {table: seconds} overriding ttl per table (eg. {"/ctc/bestlap-table": 600})
+    '''
+    def __init__(self, max_bytes=64*1024*1024, ttl=60, table_ttls=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.table_ttls = {requests.utils.unquote(table): seconds for table, seconds in (table_ttls or {}).items()}
+        # (table, key) -> (expires, size, start_row, end_row, value), least recently used first
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.lock = threading.Lock()
+
+    def table_ttl(self, table):
+        return self.table_ttls.get(requests.utils.unquote(table), self.ttl)
+
+    def get(self, table, key):
+        '''
+        Cached value for (table, key), MISS when it is not cached or has expired
+        '''
+        with self.lock:
+            entry = self.entries.get((table, key))
+            if entry is not None and entry[0] <= time.monotonic():
+                self.drop((table, key))
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return MISS
+            self.entries.move_to_end((table, key))
+            self.hits += 1
+            return entry[4]
+
+    def put(self, table, key, value, size, start_row=b"", end_row=b""):
+        '''
+        Cache value (about size bytes) holding the rows of [start_row, end_row) (b"" for an open end)
+        '''
+        ttl = self.table_ttl(table)
+        if not ttl or size > self.max_bytes:
+            return
+        with self.lock:
+            if (table, key) in self.entries:
+                self.drop((table, key))
+            self.entries[(table, key)] = (time.monotonic() + ttl, size, start_row, end_row, value)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self.drop(next(iter(self.entries)))
+                self.evictions += 1
+
+    def invalidate(self, table, row_prefix=None):
+        '''
+        Drop the entries of table whose row range overlaps row keys starting with row_prefix
+        (every entry of the table without a prefix). Returns the number of entries dropped.
+        '''
+        if row_prefix is not None:
+            start = row_prefix.encode('utf-8') if isinstance(row_prefix, str) else bytes(row_prefix)
+            end = prefix_end(start)
+        with self.lock:
+            stale = [
+                entry_key for entry_key, (_, _, entry_start, entry_end, _) in self.entries.items()
+                if entry_key[0] == table and (row_prefix is None or (
+                    (not end or entry_start < end) and (not entry_end or start < entry_end)))
+            ]
+            for entry_key in stale:
+                self.drop(entry_key)
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def drop(self, entry_key):
+        self.bytes -= self.entries.pop(entry_key)[1]
+
+    def stats(self):
+        '''
+        Counters: hits, misses, hit_ratio, entries, bytes, evictions, expirations, invalidations
+        '''
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'entries': len(self.entries),
+                'bytes': self.bytes,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
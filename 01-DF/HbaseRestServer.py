@@ -0,0 +1,749 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the HBase REST gateway, for testing and benchmarking the REST clients
+(HbaseRest.py, the daily jobs, df_load_table, df_frontend_table) without a Data Fabric cluster.
+
+Emulates the part of the REST API this project uses, backed by an in-process sorted store:
+  - scanners (PUT <table>/scanner, GET / DELETE the returned Location) with batch (cells per
+    batch, rows split across batches like the real gateway, overridden per read with ?c=), startRow / endRow, startTime /
+    endTime, <column> selection and the filters HbaseScan builds: PrefixFilter,
+    SingleColumnValueFilter, QualifierFilter, ColumnPrefixFilter, KeyOnlyFilter,
+    FirstKeyOnlyFilter, PageFilter and FilterList
+  - multi-row PUT / POST (JSON or protobuf CellSet), row GET, multiget and row DELETE
+  - <table>/regions, <table>/schema (GET, and PUT / POST / DELETE to create or drop a table),
+    the table list, /version/cluster and /status/cluster
+Responses are JSON or protobuf depending on the Accept header. Tables are created on their
+first insert. Every response can be delayed by a fixed latency, and request and response
+bodies can share a bandwidth limit, to approximate a remote gateway. Like the gateway's gzip
+filter, responses are compressed when the client accepts gzip / deflate (Accept-Encoding) and
+gzip / deflate request bodies (Content-Encoding, also chunked) are decompressed; the bandwidth
+limit and the stats count the bytes as sent.
+
+The clients build https:// URLs, so the server speaks TLS with a throwaway self-signed
+certificate (needs the openssl CLI; without it the server falls back to plain HTTP and the
+client's .url has to be pointed at http://).
+
+Usage:
+    python HbaseRestServer.py [--port 8080] [--latency-ms 0] [--bandwidth-mbps 0] [--split-keys 4,8,c] [--no-tls] [--no-compression]
+
+or in-process:
+    with HBaseRestServer(latency=0.002).start() as server:
+        table = HBaseRestTable('mapr', 'mapr', server.host, server.host, str(server.port), '/ctc/ctc-table')
+"""
+
+import os
+import ssl
+import json
+import time
+import base64
+import bisect
+import shutil
+import argparse
+import tempfile
+import itertools
+import threading
+import subprocess
+import zlib
+import xml.etree.ElementTree as ET
+from urllib.parse import quote, unquote, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from HbaseEncoder import encode_cell_set, decode_cell_set
+
+# response / request body encodings -> zlib wbits (HTTP deflate is the zlib format)
+CONTENT_ENCODINGS = {"gzip": 31, "deflate": 15}
+# responses smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = 256
+
+# Compare operators of the comparison filters (cell value / qualifier <op> comparator value)
+COMPARE_OPS = {
+    "LESS": lambda a, b: a < b,
+    "LESS_OR_EQUAL": lambda a, b: a <= b,
+    "EQUAL": lambda a, b: a == b,
+    "NOT_EQUAL": lambda a, b: a != b,
+    "GREATER_OR_EQUAL": lambda a, b: a >= b,
+    "GREATER": lambda a, b: a > b,
+    "NO_OP": lambda a, b: False,
+}
+
+# Filters that change the cells of a row instead of selecting rows - applied after the others
+CELL_TRANSFORMS = ("KeyOnlyFilter", "FirstKeyOnlyFilter")
+
+
+def _b64(value):
+    return base64.b64encode(value).decode('ascii')
+
+
+def _unb64(value):
+    return base64.b64decode(value) if value else b''
+
+
+class StoreTable():
+    '''
+    One table of the SortedStore: row keys kept sorted (bisect) next to a dict of
+    {row_key: {column: (timestamp, value)}}, everything as bytes. Only the latest version
+    of a cell is kept. Safe to use from several request threads.
+
+    Parameters
+        ----------
+        name : str
+            table name as it appears in the URL (eg. "/ctc/ctc-table")
+        families : iterable of str
+            column families (more are added as cells are written)
+        split_keys : iterable of str/bytes
+            region boundaries reported by <table>/regions
+    '''
+    def __init__(self, name, families=(), split_keys=()):
+        self.name = name
+        self.families = set(families)
+        self.split_keys = sorted(key.encode('utf-8') if isinstance(key, str) else key for key in split_keys)
+        self.keys = []
+        self.rows = {}
+        self.lock = threading.Lock()
+
+    def put(self, rows):
+        '''
+        Write rows given as (key, [(column, value), ...]) (bytes), returns the number of rows
+        '''
+        timestamp = int(time.time() * 1000)
+        count = 0
+        with self.lock:
+            for key, cells in rows:
+                row = self.rows.get(key)
+                if row is None:
+                    row = self.rows[key] = {}
+                    bisect.insort(self.keys, key)
+                for column, value in cells:
+                    self.families.add(column.split(b':', 1)[0].decode('utf-8'))
+                    row[column] = (timestamp, value)
+                count += 1
+        return count
+
+    def delete(self, key, columns=None):
+        '''
+        Delete a row, or only the given columns / families of it
+        '''
+        with self.lock:
+            row = self.rows.get(key)
+            if row is None:
+                return
+            if columns:
+                for column in list(row):
+                    if column_selected(column, columns):
+                        del row[column]
+            if not columns or not row:
+                del self.rows[key]
+                del self.keys[bisect.bisect_left(self.keys, key)]
+
+    def get(self, key):
+        '''
+        Cells of a row as {column: (timestamp, value)} (a copy), None if it does not exist
+        '''
+        with self.lock:
+            row = self.rows.get(key)
+            return dict(row) if row is not None else None
+
+    def next_rows(self, start_row, after, end_row, limit):
+        '''
+        Up to limit (key, cells) rows from start_row (inclusive), or after the key after, up to
+        end_row (exclusive, empty for the end of the table)
+        '''
+        with self.lock:
+            pos = bisect.bisect_left(self.keys, start_row) if after is None else bisect.bisect_right(self.keys, after)
+            keys = self.keys[pos:pos + limit]
+            if end_row:
+                keys = keys[:bisect.bisect_left(keys, end_row)]
+            return [(key, dict(self.rows[key])) for key in keys]
+
+    def regions(self):
+        edges = [b''] + self.split_keys + [b'']
+        return list(zip(edges[:-1], edges[1:]))
+
+
+class SortedStore():
+    '''
+    In-process key-value store behind HBaseRestServer: a dict of StoreTable by name.
+    Seed it directly for benchmarks, eg. store.put("/ctc/ctc-table", [(b"341:0", [(b"telemetry:Speed", b"12.5")])])
+
+    Parameters
+        ----------
+        split_keys : iterable of str/bytes
+            region boundaries of tables created without their own
+    '''
+    def __init__(self, split_keys=()):
+        self.split_keys = list(split_keys)
+        self.tables = {}
+        self.lock = threading.Lock()
+
+    def create_table(self, name, families=(), split_keys=None):
+        with self.lock:
+            if name not in self.tables:
+                self.tables[name] = StoreTable(name, families, self.split_keys if split_keys is None else split_keys)
+            else:
+                self.tables[name].families.update(families)
+            return self.tables[name]
+
+    def drop_table(self, name):
+        with self.lock:
+            return self.tables.pop(name, None) is not None
+
+    def table(self, name):
+        return self.tables.get(name)
+
+    def put(self, name, rows):
+        table = self.table(name) or self.create_table(name)
+        return table.put(rows)
+
+
+def column_selected(column, columns):
+    '''
+    True if column (b"family:qualifier") is one of columns (b"family" or b"family:qualifier")
+    '''
+    return column in columns or column.split(b':', 1)[0] in columns
+
+
+def compile_filter(model):
+    '''
+    Turn the JSON model of a scanner filter into a function (key, cells) -> cells or None,
+    cells being a list of (column, timestamp, value) and None dropping the row.
+    PageFilter is not a row function: it is returned as ("page", rows) and applied by the scanner.
+    Raises ValueError for filters the stand-in does not implement.
+    '''
+    kind = model.get("type")
+    if kind == "FilterList":
+        members = sorted(model.get("filters", []), key=lambda member: member.get("type") in CELL_TRANSFORMS)
+        compiled = [compile_filter(member) for member in members]
+        functions = [member for member in compiled if callable(member)]
+        if model.get("op", "MUST_PASS_ALL") == "MUST_PASS_ONE":
+            def match_one(key, cells):
+                for function in functions:
+                    selected = function(key, cells)
+                    if selected is not None:
+                        return selected
+                return None if functions else cells
+            return match_one
+
+        def match_all(key, cells):
+            for function in functions:
+                cells = function(key, cells)
+                if cells is None:
+                    return None
+            return cells
+        return match_all
+    if kind == "PageFilter":
+        return ("page", int(model["value"]))
+    if kind == "PrefixFilter":
+        prefix = _unb64(model.get("value"))
+        return lambda key, cells: cells if key.startswith(prefix) else None
+    if kind == "KeyOnlyFilter":
+        return lambda key, cells: [(column, timestamp, b'') for column, timestamp, _ in cells]
+    if kind == "FirstKeyOnlyFilter":
+        return lambda key, cells: cells[:1]
+    if kind == "ColumnPrefixFilter":
+        prefix = _unb64(model.get("value"))
+
+        def column_prefix(key, cells):
+            cells = [cell for cell in cells if cell[0].split(b':', 1)[-1].startswith(prefix)]
+            return cells or None
+        return column_prefix
+    if kind == "QualifierFilter":
+        compare = comparator(model)
+
+        def qualifier(key, cells):
+            cells = [cell for cell in cells if compare(cell[0].split(b':', 1)[-1])]
+            return cells or None
+        return qualifier
+    if kind == "SingleColumnValueFilter":
+        column = _unb64(model.get("family")) + b':' + _unb64(model.get("qualifier"))
+        compare = comparator(model)
+        if_missing = model.get("ifMissing", False)
+
+        def single_column_value(key, cells):
+            for name, _, value in cells:
+                if name == column:
+                    return cells if compare(value) else None
+            return None if if_missing else cells
+        return single_column_value
+    raise ValueError(f"Unsupported filter type {kind}")
+
+
+def comparator(model):
+    '''
+    Function value -> bool for the op / comparator of a comparison filter
+    '''
+    op = COMPARE_OPS.get(model.get("op", "EQUAL"))
+    spec = model.get("comparator", {})
+    if op is None:
+        raise ValueError(f"Unsupported compare op {model.get('op')}")
+    expected = _unb64(spec.get("value"))
+    if spec.get("type") == "BinaryComparator":
+        return lambda value: op(value, expected)
+    if spec.get("type") == "BinaryPrefixComparator":
+        return lambda value: op(value[:len(expected)], expected)
+    raise ValueError(f"Unsupported comparator {spec.get('type')}")
+
+
+class Scanner():
+    '''
+    Server side of a REST scanner: walks the sorted keys of a table from startRow to endRow,
+    applying the column selection, time range and filters, and hands out batches of at most
+    `batch` cells. A row with more cells than fit is continued in the next batch, as the real
+    gateway does. The position is the last row key returned, so rows written or deleted while
+    the scan is open do not disturb it.
+
+    Parameters
+        ----------
+        table : StoreTable
+            table to scan
+        spec : str
+            <Scanner> XML as sent by create_scanner (eg. str(HbaseScan.ScanSpec))
+    '''
+    def __init__(self, table, spec):
+        self.table = table
+        root = ET.fromstring(spec)
+        self.batch = max(1, int(root.get("batch", 100)))
+        self.start_row = _unb64(root.get("startRow"))
+        self.end_row = _unb64(root.get("endRow"))
+        self.start_time = int(root.get("startTime", 0))
+        self.end_time = int(root.get("endTime", 0)) or None
+        self.columns = [_unb64(column.text) for column in root.findall("column")]
+        self.row_filter = None
+        self.page = None
+        text = root.findtext("filter")
+        if text:
+            model = json.loads(text)
+            members = model.get("filters", []) if model.get("type") == "FilterList" and model.get("op", "MUST_PASS_ALL") == "MUST_PASS_ALL" else [model]
+            pages = [member for member in members if member.get("type") == "PageFilter"]
+            if pages:
+                # PageFilter limits the whole scan here (the real gateway applies it per region)
+                self.page = min(int(member["value"]) for member in pages)
+                model = dict(model, filters=[member for member in members if member.get("type") != "PageFilter"]) if model.get("type") == "FilterList" else None
+            self.row_filter = compile_filter(model) if model else None
+        self.last_key = None
+        self.pending = None
+        self.rows_returned = 0
+        self.lock = threading.Lock()
+
+    def select(self, key, cells):
+        '''
+        Cells of one row after column selection, time range and filters, None if the row is skipped
+        '''
+        selected = [
+            (column, timestamp, value)
+            for column, (timestamp, value) in sorted(cells.items())
+            if (not self.columns or column_selected(column, self.columns))
+            and timestamp >= self.start_time and (self.end_time is None or timestamp < self.end_time)
+        ]
+        if not selected:
+            return None
+        if self.row_filter is not None:
+            selected = self.row_filter(key, selected)
+        return selected or None
+
+    def next_batch(self, cells=None):
+        '''
+        Next batch as a list of (key, cells), None once the scan is exhausted.
+        cells overrides the scanner's batch for this read (the ?c= parameter of the gateway).
+        '''
+        with self.lock:
+            batch = []
+            room = cells or self.batch
+            while room > 0:
+                if self.pending is None:
+                    if self.page is not None and self.rows_returned >= self.page:
+                        break
+                    self.pending = self.next_row()
+                    if self.pending is None:
+                        break
+                    self.rows_returned += 1
+                key, cells = self.pending
+                batch.append((key, cells[:room]))
+                self.pending = (key, cells[room:]) if len(cells) > room else None
+                room -= len(batch[-1][1])
+            return batch or None
+
+    def next_row(self):
+        while True:
+            rows = self.table.next_rows(self.start_row, self.last_key, self.end_row, 256)
+            if not rows:
+                return None
+            for key, cells in rows:
+                self.last_key = key
+                selected = self.select(key, cells)
+                if selected:
+                    return key, selected
+
+
+class Link():
+    '''
+    Shared bandwidth limit: every transfer books its share of the link, so concurrent
+    requests slow each other down like they would on a real network
+    '''
+    def __init__(self, bytes_per_sec=None):
+        self.interval = 1.0 / bytes_per_sec if bytes_per_sec else 0.0
+        self.free_at = 0.0
+        self.lock = threading.Lock()
+
+    def transfer(self, size):
+        if not self.interval or not size:
+            return
+        with self.lock:
+            now = time.monotonic()
+            done = self.free_at = max(self.free_at, now) + size * self.interval
+        time.sleep(done - now)
+
+
+class RestHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients keep their connections open between requests
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_PUT(self):
+        self.dispatch("PUT")
+
+    def do_POST(self):
+        self.dispatch("PUT")
+
+    def do_DELETE(self):
+        self.dispatch("DELETE")
+
+    def dispatch(self, method):
+        server = self.server.rest
+        # the request line as sent (self.path has a leading // collapsed, which would lose "//ctc/...")
+        path, _, query = self.raw_requestline.decode('iso-8859-1').split()[1].partition('?')
+        body = self.read_body()
+        server.link.transfer(len(body))
+        size_in = len(body)
+        try:
+            body = self.decode_body(body)
+            op, code, payload, headers = self.route(server, method, path, query, body)
+        except (ValueError, KeyError, ET.ParseError, zlib.error) as e:
+            op, code, payload, headers = "error", 400, str(e).encode('utf-8'), {'Content-Type': 'text/plain'}
+        encoding = self.response_encoding() if server.compression and len(payload) >= COMPRESS_MIN_BYTES else None
+        if encoding:
+            compressor = zlib.compressobj(6, zlib.DEFLATED, CONTENT_ENCODINGS[encoding])
+            payload = compressor.compress(payload) + compressor.flush()
+            headers = dict(headers, **{'Content-Encoding': encoding})
+        if server.latency:
+            time.sleep(server.latency)
+        server.link.transfer(len(payload))
+        server.count(op, size_in, len(payload))
+        self.send_response(code)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def read_body(self):
+        '''
+        Request body as sent (clients streaming a compressed body use chunked transfer encoding)
+        '''
+        if self.headers.get('Transfer-Encoding', '').lower() != 'chunked':
+            return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        chunks = []
+        while True:
+            size = int(self.rfile.readline().split(b';')[0], 16)
+            if not size:
+                while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+                    pass
+                return b''.join(chunks)
+            chunks.append(self.rfile.read(size))
+            self.rfile.readline()
+
+    def decode_body(self, body):
+        encoding = self.headers.get('Content-Encoding', 'identity').lower()
+        if encoding == 'identity' or not body:
+            return body
+        if encoding not in CONTENT_ENCODINGS:
+            raise ValueError(f"unsupported Content-Encoding {encoding}")
+        return zlib.decompress(body, CONTENT_ENCODINGS[encoding])
+
+    def response_encoding(self):
+        '''
+        gzip or deflate when the client's Accept-Encoding allows it (gzip preferred), None otherwise
+        '''
+        accepted = set()
+        for item in self.headers.get('Accept-Encoding', '').split(','):
+            name, _, params = item.strip().lower().partition(';')
+            if params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+                accepted.add(name.strip())
+        return next((encoding for encoding in CONTENT_ENCODINGS if encoding in accepted), None)
+
+    def route(self, server, method, path, query, body):
+        '''
+        Returns (operation, status code, body, headers)
+        '''
+        segments = [unquote(segment) for segment in path.split('/')[1:]]
+        if segments in ([], ['']):
+            return "meta", 200, self.json({"table": [{"name": name} for name in sorted(server.store.tables)]}), self.json_headers()
+        if segments[0] in ("version", "status", "namespaces") and len(segments) <= 2:
+            return "meta", 200, self.json(server.cluster_info(segments)), self.json_headers()
+        name, rest = server.split_table(segments)
+        table = server.store.table(name)
+        action = rest[0] if rest else ""
+
+        if action == "schema":
+            if method == "PUT":
+                families = [column["name"] for column in json.loads(body or b'{}').get("ColumnSchema", [])]
+                server.store.create_table(name, families)
+                return "schema", 201, b'', {}
+            if method == "DELETE":
+                return "schema", 200 if server.store.drop_table(name) else 404, b'', {}
+            if table is None:
+                return "schema", 404, b'', {}
+            return "schema", 200, self.json({"name": name, "ColumnSchema": [{"name": family} for family in sorted(table.families)]}), self.json_headers()
+        if action == "regions" and method == "GET":
+            if table is None:
+                return "regions", 404, b'', {}
+            return "regions", 200, self.json({"name": name, "Region": [
+                {"id": i, "name": f"{name},{_b64(start)},{i}", "startKey": _b64(start), "endKey": _b64(end), "location": f"{server.host}:{server.port}"}
+                for i, (start, end) in enumerate(table.regions())
+            ]}), self.json_headers()
+        if action == "scanner":
+            return self.scanner(server, method, name, table, rest[1] if len(rest) > 1 else None, query, body)
+        if action == "multiget" and method == "GET":
+            if table is None:
+                return "multiget", 404, b'', {}
+            rows = []
+            for spec in parse_qs(query).get("row", []):
+                key, _, columns = spec.partition('/')
+                row = self.read_row(table, key.encode('utf-8'), columns)
+                if row:
+                    rows.append(row)
+            return ("multiget",) + self.rows_response(rows)
+        if method == "PUT":
+            rows = self.parse_rows(body)
+            table = table or server.store.create_table(name)
+            table.put(rows)
+            return "insert", 200, b'', {}
+        if table is None or not action:
+            return "row", 404, b'', {}
+        key = action.encode('utf-8')
+        if method == "DELETE":
+            table.delete(key, [column.encode('utf-8') for column in rest[1].split(',')] if len(rest) > 1 else None)
+            return "delete", 200, b'', {}
+        row = self.read_row(table, key, rest[1] if len(rest) > 1 else "")
+        return ("get",) + (self.rows_response([row]) if row else (404, b'', {}))
+
+    def scanner(self, server, method, name, table, scanner_id, query, body):
+        if scanner_id is None:
+            if method != "PUT":
+                return "scanner", 405, b'', {}
+            if table is None:
+                return "scanner_create", 404, b'', {}
+            scanner_id = server.open_scanner(Scanner(table, body.decode('utf-8')))
+            location = f"{server.scheme}://{self.headers.get('Host', f'{server.host}:{server.port}')}/{quote(name, safe='')}/scanner/{scanner_id}"
+            return "scanner_create", 201, b'', {'Location': location}
+        scanner = server.scanners.get(scanner_id)
+        if scanner is None:
+            return "scanner_read", 404, b'', {}
+        if method == "DELETE":
+            server.scanners.pop(scanner_id, None)
+            return "scanner_delete", 200, b'', {}
+        batch = scanner.next_batch(int(parse_qs(query).get("c", ["0"])[0]))
+        if batch is None:
+            return "scanner_read", 204, b'', {}
+        return ("scanner_read",) + self.rows_response(batch)
+
+    @staticmethod
+    def read_row(table, key, columns):
+        cells = table.get(key)
+        if cells is None:
+            return None
+        wanted = [column.encode('utf-8') for column in columns.split(',') if column]
+        selected = [(column, timestamp, value) for column, (timestamp, value) in sorted(cells.items()) if not wanted or column_selected(column, wanted)]
+        return (key, selected) if selected else None
+
+    def parse_rows(self, body):
+        '''
+        Rows of an insert body as (key, [(column, value)]), JSON {"Row":[...]} or protobuf CellSet
+        '''
+        if 'protobuf' in self.headers.get('Content-Type', ''):
+            return decode_cell_set(body)
+        return [
+            (_unb64(row["key"]), [(_unb64(cell["column"]), _unb64(cell["$"])) for cell in row["Cell"]])
+            for row in json.loads(body)["Row"]
+        ]
+
+    def rows_response(self, rows):
+        '''
+        (status code, body, headers) for rows of (key, [(column, timestamp, value)]) in the Accept format
+        '''
+        if 'protobuf' in self.headers.get('Accept', ''):
+            payload = encode_cell_set((key, [(column, value) for column, _, value in cells]) for key, cells in rows)
+            return 200, payload, {'Content-Type': 'application/x-protobuf'}
+        return 200, self.json({"Row": [
+            {"key": _b64(key), "Cell": [{"column": _b64(column), "timestamp": timestamp, "$": _b64(value)} for column, timestamp, value in cells]}
+            for key, cells in rows
+        ]}), self.json_headers()
+
+    @staticmethod
+    def json(document):
+        return json.dumps(document, separators=(',', ':')).encode('utf-8')
+
+    @staticmethod
+    def json_headers():
+        return {'Content-Type': 'application/json'}
+
+
+class HBaseRestServer():
+    '''
+    Local HBase REST gateway stand-in (see the module docstring for what it emulates).
+    start() serves from a background thread, serve_forever() from the calling one; the server
+    is also a context manager that stops it on exit.
+    The request counters (stats) are kept per operation: scanner_create, scanner_read,
+    scanner_delete, insert, get, multiget, delete, regions, schema, meta.
+
+    Parameters
+        ----------
+        host : str
+            interface to listen on
+        port : int
+            port to listen on (0 = any free port, see .port)
+        store : SortedStore
+            optional store to serve (eg. pre-loaded with rows), a new empty one otherwise
+        latency : float
+            seconds added to every response
+        bandwidth : float
+            bytes per second shared by all request and response bodies (None = unlimited)
+        tls : bool
+            serve https with a throwaway self-signed certificate (plain http when openssl is missing)
+        compression : bool
+            compress responses of COMPRESS_MIN_BYTES or more for clients that accept it
+    '''
+    def __init__(self, host='127.0.0.1', port=0, store=None, latency=0.0, bandwidth=None, tls=True, compression=True):
+        self.store = store if store is not None else SortedStore()
+        self.latency = latency
+        self.compression = compression
+        self.link = Link(bandwidth)
+        self.scanners = {}
+        self.scanner_ids = itertools.count(1)
+        self.stats = {}
+        self.stats_lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), RestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.rest = self
+        self.host, self.port = self.httpd.server_address[:2]
+        self.workdir = tempfile.mkdtemp() if tls else None
+        context = self_signed_context(self.workdir) if tls else None
+        if context:
+            self.httpd.socket = context.wrap_socket(self.httpd.socket, server_side=True)
+        self.scheme = 'https' if context else 'http'
+        self.thread = None
+
+    @property
+    def url(self):
+        return f"{self.scheme}://{self.host}:{self.port}"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True, name="hbase-rest-server")
+        self.thread.start()
+        return self
+
+    def serve_forever(self):
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self.stop()
+
+    def stop(self):
+        if self.thread is not None:
+            self.httpd.shutdown()
+            self.thread = None
+        self.httpd.server_close()
+        if self.workdir:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+            self.workdir = None
+
+    def open_scanner(self, scanner):
+        scanner_id = str(next(self.scanner_ids))
+        self.scanners[scanner_id] = scanner
+        return scanner_id
+
+    def split_table(self, segments):
+        '''
+        (table name, remaining path segments) of a request path. Table names are either one
+        URL-encoded segment ("%2Fctc%2Fctc-table") or a raw path ("/ctc/ctc-table", giving a
+        leading empty segment) - those are matched against the existing tables first.
+        '''
+        if segments[0] or len(segments) == 1:
+            return segments[0], segments[1:]
+        parts = segments[1:]
+        for i in range(len(parts), 0, -1):
+            name = '/' + '/'.join(parts[:i])
+            if name in self.store.tables:
+                return name, parts[i:]
+        tail = 2 if len(parts) > 2 and parts[-2] == "scanner" else 1
+        tail = min(tail, len(parts) - 1)
+        return '/' + '/'.join(parts[:len(parts) - tail]), parts[len(parts) - tail:]
+
+    def cluster_info(self, segments):
+        if segments[0] == "version":
+            return {"Version": "stand-in", "Server": "HbaseRestServer.py"}
+        if segments[0] == "namespaces":
+            return {"Namespace": ["default"]}
+        return {"regions": sum(len(table.regions()) for table in self.store.tables.values()),
+                "requests": sum(counts["requests"] for counts in self.stats.values()),
+                "LiveNodes": [{"name": f"{self.host}:{self.port}"}], "DeadNodes": []}
+
+    def count(self, op, bytes_in, bytes_out):
+        with self.stats_lock:
+            counts = self.stats.setdefault(op, {"requests": 0, "bytes_in": 0, "bytes_out": 0})
+            counts["requests"] += 1
+            counts["bytes_in"] += bytes_in
+            counts["bytes_out"] += bytes_out
+
+
+def self_signed_context(workdir):
+    """Server TLS context with a fresh self-signed certificate, None if openssl is not available"""
+    openssl = shutil.which('openssl')
+    if not openssl:
+        return None
+    cert, key = os.path.join(workdir, 'cert.pem'), os.path.join(workdir, 'key.pem')
+    result = subprocess.run([openssl, 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                             '-subj', '/CN=localhost', '-keyout', key, '-out', cert],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if result.returncode != 0:
+        return None
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    return context
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the HBase REST gateway")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency-ms', type=float, default=0, help="delay added to every response")
+    parser.add_argument('--bandwidth-mbps', type=float, default=0, help="link speed shared by all requests (0 = unlimited)")
+    parser.add_argument('--split-keys', default='', help="comma separated region boundaries of every table (eg. 4,8,c)")
+    parser.add_argument('--no-tls', action='store_true', help="serve plain http")
+    parser.add_argument('--no-compression', action='store_true', help="never compress responses")
+    args = parser.parse_args()
+
+    store = SortedStore([key for key in args.split_keys.split(',') if key])
+    server = HBaseRestServer(args.host, args.port, store, args.latency_ms / 1000,
+                             args.bandwidth_mbps * 1000 * 1000 / 8 or None, not args.no_tls, not args.no_compression)
+    print(f"HBase REST stand-in listening on {server.url} (latency {args.latency_ms:g} ms, "
+          f"bandwidth {f'{args.bandwidth_mbps:g} Mbit/s' if args.bandwidth_mbps else 'unlimited'})")
+    if server.scheme == 'http' and not args.no_tls:
+        print("openssl not found - serving plain http, point the clients' .url at http://")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
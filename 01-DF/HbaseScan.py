@@ -0,0 +1,242 @@
+import copy
+import json
+import base64
+
+# FilterList operators
+MUST_PASS_ALL = "MUST_PASS_ALL"
+MUST_PASS_ONE = "MUST_PASS_ONE"
+
+# scanner batch sent for a ScanSpec without one (the reads of such a spec are normally sized by the client)
+DEFAULT_BATCH = 100
+
+
+def _raw(value):
+    return value.encode('utf-8') if isinstance(value, str) else bytes(value)
+
+
+def _b64(value):
+    return base64.b64encode(_raw(value)).decode('ascii')
+
+
+def _millis(value):
+    # datetime or epoch milliseconds -> epoch milliseconds
+    return int(value.timestamp() * 1000) if hasattr(value, 'timestamp') else int(value)
+
+
+def prefix_end(prefix):
+    '''
+    Smallest row key sorting after every key that starts with prefix, ie. the exclusive end row
+    that turns a prefix into a range scan (b"" when there is none, a prefix of only 0xff bytes)
+    '''
+    prefix = _raw(prefix).rstrip(b'\xff')
+    if not prefix:
+        return b''
+    return prefix[:-1] + bytes([prefix[-1] + 1])
+
+
+class Filter():
+    '''
+    One server-side filter in the JSON model the HBase REST gateway reads from a scanner's <filter>.
+    Filters combine with & (FilterList MUST_PASS_ALL) and | (FilterList MUST_PASS_ONE).
+    Build them with the functions below rather than directly.
+
+    Parameters
+        ----------
+        type : str
+            HBase filter class name (eg. "PrefixFilter")
+        fields : dict
+            remaining fields of the filter model
+    '''
+    def __init__(self, type, **fields):
+        self.model = dict(type=type, **fields)
+
+    def __and__(self, other):
+        return filter_list(self, other, op=MUST_PASS_ALL)
+
+    def __or__(self, other):
+        return filter_list(self, other, op=MUST_PASS_ONE)
+
+    def __eq__(self, other):
+        return isinstance(other, Filter) and self.model == other.model
+
+    def __repr__(self):
+        return f"Filter({self.to_json()})"
+
+    def to_json(self):
+        return json.dumps(self.model, separators=(',', ':'))
+
+
+def _comparator(value, comparator="BinaryComparator"):
+    return {"type": comparator, "value": _b64(value)}
+
+
+def filter_list(*filters, op=MUST_PASS_ALL):
+    '''
+    FilterList over filters (nested lists with the same operator are flattened)
+    '''
+    members = []
+    for member in filters:
+        if member.model["type"] == "FilterList" and member.model["op"] == op:
+            members.extend(member.model["filters"])
+        else:
+            members.append(member.model)
+    return Filter("FilterList", op=op, filters=members)
+
+
+def prefix_filter(prefix):
+    '''
+    Rows whose key starts with prefix - prefer ScanSpec.prefix, which bounds the scan instead
+    '''
+    return Filter("PrefixFilter", value=_b64(prefix))
+
+
+def key_only():
+    '''
+    Return the cells without their values (for scans that only need row keys or column names)
+    '''
+    return Filter("KeyOnlyFilter")
+
+
+def first_key_only():
+    '''
+    Return only the first cell of every row (combine with key_only() to list row keys)
+    '''
+    return Filter("FirstKeyOnlyFilter")
+
+
+def column_prefix(prefix):
+    '''
+    Cells whose column qualifier starts with prefix
+    '''
+    return Filter("ColumnPrefixFilter", value=_b64(prefix))
+
+
+def page(rows):
+    '''
+    Stop after rows rows - applied per region server, so a scan can still return up to rows per region
+    '''
+    return Filter("PageFilter", value=str(int(rows)))
+
+
+def qualifier(value, op="EQUAL", comparator="BinaryComparator"):
+    '''
+    Cells whose column qualifier compares to value with op (EQUAL, NOT_EQUAL, LESS, GREATER_OR_EQUAL, ...)
+    '''
+    return Filter("QualifierFilter", op=op, comparator=_comparator(value, comparator))
+
+
+def column_value(family, column, value, op="EQUAL", if_missing=True, latest_version=True):
+    '''
+    Rows whose family:column cell compares to value with op. With if_missing rows that do not have
+    the column are dropped too (HBase keeps them by default).
+    '''
+    return Filter("SingleColumnValueFilter", op=op, family=_b64(family), qualifier=_b64(column),
+                  comparator=_comparator(value), ifMissing=if_missing, latestVersion=latest_version)
+
+
+class ScanSpec():
+    '''
+    Scanner definition for the HBase REST gateway, built up call by call and rendered as the
+    <Scanner> XML create_scanner takes (str(spec) / to_xml()).
+    Row bounds go out as startRow / endRow, so the region servers outside the range are never
+    touched - prefix() turns a row key prefix into such a bounded range scan instead of a
+    PrefixFilter the servers evaluate against every row of the table.
+    The setters return the spec, eg. ScanSpec(1000).prefix("341:").columns("lap").filter(key_only())
+
+    Parameters
+        ----------
+        batch : int
+            maximum number of cells per scanner batch. None leaves it to the client: HBaseRestTable
+            sizes every read with its ScanBatchSizer (DEFAULT_BATCH cells for a client without one)
+    '''
+    def __init__(self, batch=None):
+        self.batch = batch
+        self.start_row = b''
+        self.end_row = b''
+        self.column_names = []
+        self.filters = []
+        self.start_time = None
+        self.end_time = None
+        self.max_versions = None
+
+    def rows(self, start_row=None, end_row=None):
+        '''
+        Limit the scan to row keys in [start_row, end_row) - narrowed with any bounds already set
+        '''
+        if start_row:
+            self.start_row = max(self.start_row, _raw(start_row))
+        if end_row:
+            end_row = _raw(end_row)
+            self.end_row = min(self.end_row, end_row) if self.end_row else end_row
+        return self
+
+    def prefix(self, prefix):
+        '''
+        Limit the scan to row keys starting with prefix, as a bounded range scan
+        '''
+        return self.rows(prefix, prefix_end(prefix))
+
+    def columns(self, *columns):
+        '''
+        Only return these columns: "family" for a whole column family or "family:qualifier"
+        '''
+        self.column_names.extend(columns)
+        return self
+
+    def filter(self, *filters):
+        '''
+        Add server-side filters (all of them must pass)
+        '''
+        self.filters.extend(filters)
+        return self
+
+    def time_range(self, start_time=None, end_time=None):
+        '''
+        Only return cells written in [start_time, end_time) (datetime or epoch milliseconds)
+        '''
+        if start_time is not None:
+            self.start_time = _millis(start_time)
+        if end_time is not None:
+            self.end_time = _millis(end_time)
+        return self
+
+    def versions(self, max_versions):
+        self.max_versions = max_versions
+        return self
+
+    def is_empty(self):
+        '''
+        True when the row bounds exclude every key, so the scan can be skipped
+        '''
+        return bool(self.end_row) and self.start_row >= self.end_row
+
+    def with_rows(self, start_row=None, end_row=None):
+        '''
+        Copy of the spec narrowed to [start_row, end_row) (eg. one region of a region-parallel scan)
+        '''
+        return copy.deepcopy(self).rows(start_row, end_row)
+
+    def to_xml(self):
+        attributes = f' batch="{DEFAULT_BATCH if self.batch is None else self.batch}"'
+        if self.start_row:
+            attributes += f' startRow="{_b64(self.start_row)}"'
+        if self.end_row:
+            attributes += f' endRow="{_b64(self.end_row)}"'
+        if self.start_time is not None:
+            attributes += f' startTime="{self.start_time}"'
+        if self.end_time is not None:
+            attributes += f' endTime="{self.end_time}"'
+        if self.max_versions is not None:
+            attributes += f' maxVersions="{self.max_versions}"'
+        body = ''
+        if self.filters:
+            combined = self.filters[0] if len(self.filters) == 1 else filter_list(*self.filters)
+            body += f'<filter>{combined.to_json()}</filter>'
+        body += ''.join(f'<column>{_b64(column)}</column>' for column in self.column_names)
+        return f'<Scanner{attributes}>{body}</Scanner>'
+
+    def __str__(self):
+        return self.to_xml()
+
+    def __repr__(self):
+        return f"ScanSpec({self.to_xml()})"
@@ -0,0 +1,174 @@
+import mmap
+import hashlib
+import struct
+import numpy as np
+
+# irsdk_header: ver, status, tickRate, sessionInfoUpdate, sessionInfoLen, sessionInfoOffset,
+# numVars, varHeaderOffset, numBuf, bufLen, pad[2], followed by 4 x irsdk_varBuf
+_HEADER = struct.Struct('<10i8x')
+_VAR_BUF = struct.Struct('<2i8x')
+_VAR_BUF_COUNT = 4
+# irsdk_diskSubHeader: sessionStartDate, sessionStartTime, sessionEndTime, sessionLapCount, sessionRecordCount
+_DISK_HEADER = struct.Struct('<qddii')
+_DISK_HEADER_OFFSET = _HEADER.size + _VAR_BUF.size * _VAR_BUF_COUNT
+# irsdk_varHeader: type, offset, count, countAsTime, pad[3], name[32], desc[64], unit[32]
+_VAR_HEADER = struct.Struct('<3i?3x32s64s32s')
+
+# irsdk_VarType -> numpy dtype (char, bool, int, bitfield, float, double)
+VAR_TYPES = {0: 'S1', 1: '?', 2: '<i4', 3: '<u4', 4: '<f4', 5: '<f8'}
+
+# bytes at the start of every .ibt file holding the header and disk sub-header
+HEADER_SIZE = _DISK_HEADER_OFFSET + _DISK_HEADER.size
+
+
+def _cstr(raw):
+    return raw.split(b'\x00', 1)[0].decode('latin-1')
+
+
+def required_ranges(header, file_size=None):
+    '''
+    Byte ranges of an .ibt file the reader actually touches, given the first HEADER_SIZE bytes:
+    header, var headers, session info and the sample records (anything else is never read).
+    Returns a sorted list of non-overlapping (offset, length) tuples.
+
+    Parameters
+        ----------
+        header : bytes-like
+            at least the first HEADER_SIZE bytes of the file
+        file_size : int
+            optional total size, ranges are clipped to it
+    '''
+    (_, _, _, _, session_info_len, session_info_offset, num_vars, var_header_offset, _, buf_len) = _HEADER.unpack_from(header, 0)
+    data_offset = _VAR_BUF.unpack_from(header, _HEADER.size)[1]
+    record_count = _DISK_HEADER.unpack_from(header, _DISK_HEADER_OFFSET)[4]
+    ranges = sorted([
+        (0, HEADER_SIZE),
+        (var_header_offset, num_vars * _VAR_HEADER.size),
+        (session_info_offset, session_info_len),
+        (data_offset, record_count * buf_len)
+    ])
+
+    merged = []
+    for offset, length in ranges:
+        end = offset + length
+        if file_size is not None:
+            end = min(end, file_size)
+        if end <= offset:
+            continue
+        if merged and offset <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([offset, end])
+    return [(start, end - start) for start, end in merged]
+
+
+class IbtReader():
+    '''
+    Zero-copy reader for iRacing .ibt telemetry files.
+    The file is memory-mapped and the var headers are turned into a NumPy structured dtype
+    laid over the sample buffer, so every channel is a strided view into the mapping:
+    extracting any number of channels is a single pass with no per-sample Python objects.
+
+    Parameters
+        ----------
+        source : str or bytes-like
+            path of the .ibt file, or a buffer already holding its contents
+    '''
+    def __init__(self, source):
+        if isinstance(source, str) or hasattr(source, '__fspath__'):
+            with open(source, 'rb') as f:
+                self._buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._buf = source
+
+        fields = _HEADER.unpack_from(self._buf, 0)
+        (self.version, self.status, self.tick_rate, self.session_info_update, self.session_info_len,
+         self.session_info_offset, self.num_vars, self.var_header_offset, self.num_buf, self.buf_len) = fields
+        self.var_bufs = [
+            _VAR_BUF.unpack_from(self._buf, _HEADER.size + i * _VAR_BUF.size)
+            for i in range(_VAR_BUF_COUNT)
+        ]
+        (self.session_start_date, self.session_start_time, self.session_end_time,
+         self.session_lap_count, self.session_record_count) = _DISK_HEADER.unpack_from(self._buf, _DISK_HEADER_OFFSET)
+
+        # var headers -> structured dtype describing one sample record
+        self.var_headers = {}
+        names, formats, offsets = [], [], []
+        for i in range(self.num_vars):
+            var_type, offset, count, count_as_time, name, desc, unit = _VAR_HEADER.unpack_from(
+                self._buf, self.var_header_offset + i * _VAR_HEADER.size)
+            name = _cstr(name)
+            if name in self.var_headers:
+                continue
+            self.var_headers[name] = {
+                'type': var_type, 'offset': offset, 'count': count, 'count_as_time': count_as_time,
+                'desc': _cstr(desc), 'unit': _cstr(unit)
+            }
+            names.append(name)
+            formats.append(VAR_TYPES[var_type] if count == 1 else (VAR_TYPES[var_type], (count,)))
+            offsets.append(offset)
+        self.record_dtype = np.dtype({'names': names, 'formats': formats, 'offsets': offsets, 'itemsize': self.buf_len})
+
+        # sample records start at the first var buffer; never read past the end of a truncated file
+        data_offset = self.var_bufs[0][1]
+        available = max(0, (len(self._buf) - data_offset) // self.buf_len) if self.buf_len else 0
+        self.record_count = min(self.session_record_count, available)
+        self.records = np.frombuffer(self._buf, dtype=self.record_dtype, count=self.record_count, offset=data_offset)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __contains__(self, name):
+        return name in self.var_headers
+
+    def __len__(self):
+        return self.record_count
+
+    def channel(self, name):
+        '''
+        All samples of one channel as a zero-copy strided view (2-D for array channels)
+        '''
+        return self.records[name]
+
+    def channels(self, names):
+        '''
+        Dict of {name: view} for every requested channel present in the file
+        (check missing_channels() for the ones that are not)
+        '''
+        return {name: self.records[name] for name in names if name in self.var_headers}
+
+    def missing_channels(self, names):
+        return [name for name in names if name not in self.var_headers]
+
+    def content_hash(self):
+        '''
+        SHA-256 hex digest over the parts of the file the reader uses (header, var headers, session info,
+        sample records) - the same whether the file was read from disk or streamed into memory
+        '''
+        digest = hashlib.sha256()
+        view = memoryview(self._buf)
+        try:
+            for offset, length in required_ranges(view[:HEADER_SIZE], len(view)):
+                digest.update(view[offset:offset + length])
+        finally:
+            view.release()
+        return digest.hexdigest()
+
+    @property
+    def session_info(self):
+        '''
+        Raw session-info YAML block (what irsdk exposes as
+        _shared_mem[session_info_offset:session_info_offset + session_info_len])
+        '''
+        return bytes(self._buf[self.session_info_offset:self.session_info_offset + self.session_info_len])
+
+    def close(self):
+        '''
+        Release the reader's references to the mapping. Channel views handed out earlier stay
+        valid - the mapping itself is unmapped once the last view is garbage collected.
+        '''
+        self.records = None
+        self._buf = None
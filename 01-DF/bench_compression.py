@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark: CPU vs. bytes of compressed HBase REST bodies
+
+Builds a synthetic telemetry frame (default 20k samples x 55 channels) and encodes it
+as an insert payload in both wire formats, then:
+  - compresses each payload with gzip / deflate at a few levels (streamed like the
+    client does, HbaseRest.compressed_chunks) and decompresses it again, printing the
+    size, the CPU time both ways and the link speed below which compression pays off
+    (the bytes saved take longer to send than the compression costs)
+  - inserts the JSON payload into a local HbaseRestServer with a bandwidth limit and
+    scans it back, uncompressed and compressed in both directions, printing the wall
+    times and the bytes on the wire from the client's HistogramSink
+
+Usage:
+    python bench_compression.py [rows] [columns] [bandwidth_mbps]
+"""
+
+import sys
+import time
+import zlib
+import urllib3
+from bench_protobuf import synthetic_frame
+from HbaseEncoder import TelemetryRowEncoder
+from HbaseMetrics import HistogramSink, format_bytes
+from HbaseRest import HBaseRestTable, CONTENT_ENCODINGS, compressed_chunks
+from HbaseRestServer import HBaseRestServer
+from HbaseScan import ScanSpec
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+ROWS = 20000
+COLUMNS = 55
+BANDWIDTH_MBPS = 100
+COLUMN_FAMILY = 'telemetry'
+TABLE = '/ctc/ctc-table'
+SCAN_BATCH = 5000
+SETTINGS = [("gzip", 1), ("gzip", 6), ("deflate", 6)]
+
+
+def codec_table(label, payload):
+    size = len(payload)
+    print(f"\n{label}: {format_bytes(size)}")
+    for encoding, level in SETTINGS:
+        stats = {}
+        compressed = b"".join(compressed_chunks(payload, encoding, level, stats=stats))
+        st = time.perf_counter()
+        assert zlib.decompress(compressed, CONTENT_ENCODINGS[encoding]) == (payload.encode('utf-8') if isinstance(payload, str) else payload)
+        decompress_seconds = time.perf_counter() - st
+        cpu_seconds = stats['seconds'] + decompress_seconds
+        saved = size - len(compressed)
+        # compression wins on links slower than saved bytes / CPU seconds
+        break_even = saved * 8 / cpu_seconds / 1e6 if cpu_seconds else float('inf')
+        print(f"  {f'{encoding} -{level}':<10} {format_bytes(len(compressed)):>9} ({len(compressed) / size:4.0%})"
+              f"   compress {stats['seconds']:6.3f} s ({size / stats['seconds'] / 1e6:5.0f} MB/s)"
+              f"   decompress {decompress_seconds:6.3f} s   pays off below {break_even:6.0f} Mbit/s")
+
+
+def transfer(server, payload, rows, compression, accept_encoding):
+    sink = HistogramSink()
+    table = HBaseRestTable('mapr', 'mapr', server.host, server.host, str(server.port), TABLE, hooks=[sink],
+                           compression=compression, accept_encoding=accept_encoding)
+    table.url = server.url
+    st = time.perf_counter()
+    res = table.insert(payload, rows=rows)
+    assert res.status_code == 200, res.status_code
+    insert_seconds = time.perf_counter() - st
+    st = time.perf_counter()
+    scanned = sum(1 for _ in table.iter_rows(ScanSpec(SCAN_BATCH)))
+    scan_seconds = time.perf_counter() - st
+    assert scanned == rows, scanned
+    table.close()
+    ops = sink.summary()
+    insert, reads = ops['insert'], ops['scanner_read']
+    label = f"requests {compression or 'identity'}, responses {accept_encoding}"
+    print(f"  {label:<44} insert {insert_seconds:6.2f} s ({format_bytes(insert['request_bytes']):>9} sent,"
+          f" compress {insert['compress_seconds']:5.2f} s)   scan {scan_seconds:6.2f} s"
+          f" ({format_bytes(reads['response_bytes']):>9} received)")
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else ROWS
+    columns = int(sys.argv[2]) if len(sys.argv) > 2 else COLUMNS
+    bandwidth_mbps = float(sys.argv[3]) if len(sys.argv) > 3 else BANDWIDTH_MBPS
+    print(f"Building synthetic frame: {rows} rows x {columns} columns")
+    df = synthetic_frame(rows, columns)
+    encoder = TelemetryRowEncoder(COLUMN_FAMILY, list(df.columns), "bench:", [('uuid', 'bench'), ('TrackID', 341)])
+    json_payload = encoder.encode_payload(df)
+    codec_table("JSON insert payload", json_payload)
+    codec_table("Protobuf insert payload", encoder.encode_payload(df, wire_format="protobuf"))
+
+    print(f"\nInsert and scan back over a {bandwidth_mbps:g} Mbit/s link (local HbaseRestServer)")
+    for compression, accept_encoding in [(None, "identity"), ("gzip", "gzip, deflate")]:
+        with HBaseRestServer(bandwidth=bandwidth_mbps * 1e6 / 8).start() as server:
+            transfer(server, json_payload, rows, compression, accept_encoding)
+
+
+if __name__ == '__main__':
+    main()
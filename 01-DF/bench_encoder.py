@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-row HBase payload encoding vs. TelemetryRowEncoder
+
+Builds a synthetic telemetry frame (default 200k samples x 55 channels, mixed
+int/float like an IBT extract), encodes it with the original df.iterrows()
+loop from df_load_table.py and with the vectorized encoder, checks the two
+payloads are byte-identical and prints the timings.
+
+Usage:
+    python bench_encoder.py [rows] [columns]
+"""
+
+import sys
+import time
+import uuid
+import base64
+import numpy as np
+import pandas as pd
+from HbaseEncoder import TelemetryRowEncoder
+
+ROWS = 200000
+COLUMNS = 55
+COLUMN_FAMILY = 'telemetry'
+
+
+def synthetic_frame(rows, columns):
+    rng = np.random.default_rng(42)
+    data = {}
+    for i in range(columns):
+        if i % 8 == 1:
+            data[f'int_{i}'] = rng.integers(0, 20000, rows)
+        else:
+            # float32 channels widened to float64, like irsdk get_all values
+            data[f'float_{i}'] = (rng.standard_normal(rows) * 10 ** (i % 6)).astype(np.float32).astype(np.float64)
+    return pd.DataFrame(data)
+
+
+def legacy_encode(df, uuid_value, track_id, source_file):
+    # verbatim copy of the original per-row loop in df_load_table.py
+    hbase_rows = []
+    for index, row in df.iterrows():
+        hbase_row = '{"key":"' + base64.b64encode((str(uuid_value) + ":" + str(index)).encode('utf-8')).decode('utf-8') + '","Cell":['
+        hbase_row = hbase_row + '{"column":"' + base64.b64encode((COLUMN_FAMILY + ":" + "uuid").encode('utf-8')).decode('utf-8') + '","$":"' + base64.b64encode((str(uuid_value)).encode('utf-8')).decode('utf-8') + '"},'
+        hbase_row = hbase_row + '{"column":"' + base64.b64encode((COLUMN_FAMILY + ":" + "TrackID").encode('utf-8')).decode('utf-8') + '","$":"' + base64.b64encode((str(track_id)).encode('utf-8')).decode('utf-8') + '"},'
+        hbase_row = hbase_row + '{"column":"' + base64.b64encode((COLUMN_FAMILY + ":" + "source_file").encode('utf-8')).decode('utf-8') + '","$":"' + base64.b64encode((str(source_file)).encode('utf-8')).decode('utf-8') + '"},'
+        for col_name, value in row.items():
+            hbase_row = hbase_row + '{"column":"' + base64.b64encode((COLUMN_FAMILY + ":" + str(col_name)).encode('utf-8')).decode('utf-8') + '","$":"' + base64.b64encode((str(value)).encode('utf-8')).decode('utf-8') + '"},'
+        hbase_row = hbase_row[:-1] + ']}'
+        hbase_rows.append(hbase_row)
+    return '{"Row":' + str(hbase_rows).replace("'{", "{").replace("}'", "}") + '}'
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else ROWS
+    columns = int(sys.argv[2]) if len(sys.argv) > 2 else COLUMNS
+    print(f"Building synthetic frame: {rows} rows x {columns} columns")
+    df = synthetic_frame(rows, columns)
+    uuid_value = uuid.uuid4()
+    track_id = 341
+    source_file = 'telemetry/session 2024-01-01 12-00-00.ibt'
+
+    st = time.time()
+    encoder = TelemetryRowEncoder(COLUMN_FAMILY, list(df.columns), str(uuid_value) + ":",
+                                  [("uuid", uuid_value), ("TrackID", track_id), ("source_file", source_file)])
+    new_payload = encoder.encode_payload(df)
+    new_time = time.time() - st
+    print(f"Vectorized encoder: {new_time:.2f} seconds ({len(new_payload) / (1024*1024):.1f} MB)")
+
+    st = time.time()
+    old_payload = legacy_encode(df, uuid_value, track_id, source_file)
+    old_time = time.time() - st
+    print(f"Per-row encoder:    {old_time:.2f} seconds ({len(old_payload) / (1024*1024):.1f} MB)")
+
+    identical = old_payload == new_payload
+    print(f"Byte-identical: {identical}")
+    print(f"Speedup: {old_time / new_time:.1f}x")
+    if not identical:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
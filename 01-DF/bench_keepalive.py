@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark: connection-per-request vs. pooled keep-alive session for HBase REST calls
+
+Starts a local stand-in for the REST gateway (HTTPS with a throwaway self-signed
+certificate when the openssl CLI is available, plain HTTP otherwise) and runs the
+delete loop of delete_rows_by_prefix twice over the same row keys:
+  - the original pattern, module-level requests.delete() per row (new TCP + TLS
+    handshake every call)
+  - HBaseRestTable.delete_row() over its pooled keep-alive session
+plus the pooled run split over several threads sharing one client. Prints the time,
+requests/s and the number of connections the server accepted for each run.
+
+connect_delay_ms adds a fixed delay to every new connection on the server side, to
+approximate the network round trips of a handshake to a remote gateway.
+
+Usage:
+    python bench_keepalive.py [requests] [connect_delay_ms] [threads]
+"""
+
+import sys
+import time
+import shutil
+import tempfile
+import threading
+import requests
+import urllib3
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ThreadPoolExecutor
+from HbaseRest import HBaseRestTable
+from HbaseRestServer import self_signed_context
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+REQUESTS = 10000
+CONNECT_DELAY_MS = 0
+THREADS = 4
+TABLE = 'ctc/bestlap-table'
+
+
+class GatewayHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so the server keeps connections open between requests
+    protocol_version = 'HTTP/1.1'
+    connections = 0
+    lock = threading.Lock()
+    connect_delay = 0
+
+    def setup(self):
+        super().setup()
+        with GatewayHandler.lock:
+            GatewayHandler.connections += 1
+        if GatewayHandler.connect_delay:
+            time.sleep(GatewayHandler.connect_delay)
+
+    def do_DELETE(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def start_gateway(context):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), GatewayHandler)
+    server.daemon_threads = True
+    if context:
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run(label, fn, keys):
+    GatewayHandler.connections = 0
+    st = time.time()
+    failed = fn(keys)
+    elapsed = time.time() - st
+    print(f"{label:<34} {elapsed:8.2f} s  {len(keys) / elapsed:9.0f} req/s  {GatewayHandler.connections:6d} connections"
+          + (f"  ({failed} failed)" if failed else ""))
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else REQUESTS
+    GatewayHandler.connect_delay = (float(sys.argv[2]) if len(sys.argv) > 2 else CONNECT_DELAY_MS) / 1000
+    threads = int(sys.argv[3]) if len(sys.argv) > 3 else THREADS
+
+    workdir = tempfile.mkdtemp()
+    try:
+        context = self_signed_context(workdir)
+        server = start_gateway(context)
+        scheme = 'https' if context else 'http'
+        port = server.server_address[1]
+        print(f"Gateway stand-in: {scheme}://127.0.0.1:{port} (connect delay {GatewayHandler.connect_delay * 1000:.0f} ms)")
+        if not context:
+            print("openssl not found - measuring without TLS, so the savings are understated")
+
+        table = HBaseRestTable('mapr', 'mapr', '127.0.0.1', '127.0.0.1', str(port), TABLE, pool_size=threads)
+        table.url = f"{scheme}://127.0.0.1:{port}"
+        keys = [f"341:bestlap:{i:06d}" for i in range(count)]
+        print(f"Deleting {count} rows one request at a time\n")
+
+        def per_request(keys):
+            # the original delete_rows_by_prefix loop
+            failed = 0
+            for row_key in keys:
+                encoded_key = row_key.replace('/', '%2F').replace(':', '%3A')
+                response = requests.delete(f"{table.url}/{TABLE}/{encoded_key}", auth=('mapr', 'mapr'), verify=False)
+                failed += response.status_code not in [200, 204]
+            return failed
+
+        def pooled(keys):
+            return sum(table.delete_row(row_key).status_code not in [200, 204] for row_key in keys)
+
+        def pooled_threads(keys):
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                return sum(executor.map(pooled, [keys[i::threads] for i in range(threads)]))
+
+        baseline = run("requests.delete per row", per_request, keys)
+        keepalive = run("pooled session", pooled, keys)
+        shared = run(f"pooled session, {threads} threads", pooled_threads, keys)
+        print(f"\nSpeedup: {baseline / keepalive:.1f}x keep-alive, {baseline / shared:.1f}x keep-alive + {threads} threads")
+
+        table.close()
+        server.shutdown()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark: JSON vs. protobuf wire format for HBase REST payloads
+
+Builds a synthetic telemetry frame (default 50k samples x 55 channels), encodes it
+as an insert payload in both wire formats and decodes the payloads the way a scanner
+read does (HBaseRestTable.parse_scan_results / sample_blocks_to_arrays), for the
+one-row-per-sample layout and for the packed sample block layout. Checks both
+formats decode to the same cells and prints payload sizes and timings.
+
+No cluster is needed: the payloads are decoded locally exactly as they would be
+after coming back from the gateway.
+
+Usage:
+    python bench_protobuf.py [rows] [columns]
+"""
+
+import sys
+import time
+import numpy as np
+import pandas as pd
+from HbaseEncoder import TelemetryRowEncoder, SampleBlockEncoder
+from HbaseRest import HBaseRestTable
+
+ROWS = 50000
+COLUMNS = 55
+COLUMN_FAMILY = 'telemetry'
+
+
+def synthetic_frame(rows, columns):
+    rng = np.random.default_rng(42)
+    data = {}
+    for i in range(columns):
+        if i % 8 == 1:
+            data[f'int_{i}'] = rng.integers(0, 20000, rows)
+        else:
+            data[f'float_{i}'] = (rng.standard_normal(rows) * 10 ** (i % 6)).astype(np.float32)
+    return pd.DataFrame(data)
+
+
+def timed(fn, *args, **kwargs):
+    st = time.time()
+    result = fn(*args, **kwargs)
+    return result, time.time() - st
+
+
+def report(label, json_seconds, protobuf_seconds):
+    print(f"  {label:<22} json {json_seconds:7.2f} s   protobuf {protobuf_seconds:7.2f} s   ({json_seconds / max(protobuf_seconds, 1e-9):.1f}x)")
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else ROWS
+    columns = int(sys.argv[2]) if len(sys.argv) > 2 else COLUMNS
+    print(f"Building synthetic frame: {rows} rows x {columns} columns")
+    df = synthetic_frame(rows, columns)
+    # the table object is only used for decoding, nothing is sent
+    table = HBaseRestTable('mapr', 'mapr', 'localhost', '127.0.0.1', '8080', '/ctc/ctc-table')
+    constant_cells = [('uuid', 'bench'), ('TrackID', 341)]
+
+    print("\nOne row per sample")
+    encoder = TelemetryRowEncoder(COLUMN_FAMILY, list(df.columns), "bench:", constant_cells)
+    json_payload, json_encode = timed(encoder.encode_payload, df)
+    pb_payload, pb_encode = timed(encoder.encode_payload, df, wire_format="protobuf")
+    print(f"  payload                json {len(json_payload) / (1024*1024):7.1f} MB  protobuf {len(pb_payload) / (1024*1024):7.1f} MB   ({len(pb_payload) / len(json_payload):.0%})")
+    report("encode", json_encode, pb_encode)
+    json_rows, json_decode = timed(table.parse_scan_results, [json_payload])
+    pb_rows, pb_decode = timed(table.parse_scan_results, [pb_payload], "protobuf")
+    report("decode", json_decode, pb_decode)
+    assert len(json_rows) == len(pb_rows) == rows
+    for row_key in list(json_rows)[::max(1, rows // 100)]:
+        assert {col: value.encode('utf-8') for col, value in json_rows[row_key].items()} == pb_rows[row_key], row_key
+
+    print("\nPacked sample blocks")
+    encoder = SampleBlockEncoder(COLUMN_FAMILY, list(df.columns), "bench:", constant_cells)
+    json_payload, json_encode = timed(encoder.encode_payload, df)
+    pb_payload, pb_encode = timed(encoder.encode_payload, df, wire_format="protobuf")
+    print(f"  payload                json {len(json_payload) / (1024*1024):7.1f} MB  protobuf {len(pb_payload) / (1024*1024):7.1f} MB   ({len(pb_payload) / len(json_payload):.0%})")
+    report("encode", json_encode, pb_encode)
+    json_arrays, json_decode = timed(table.sample_blocks_to_arrays, [json_payload], COLUMN_FAMILY)
+    pb_arrays, pb_decode = timed(table.sample_blocks_to_arrays, [pb_payload], COLUMN_FAMILY, None, "protobuf")
+    report("decode", json_decode, pb_decode)
+    assert all(np.array_equal(json_arrays[col], pb_arrays[col]) for col in df.columns)
+
+    print("\nBoth wire formats decode to identical cells")
+
+
+if __name__ == '__main__':
+    main()
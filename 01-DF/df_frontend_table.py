@@ -1,15 +1,16 @@
 import streamlit as st
 import pandas as pd
-import requests
 import urllib3
-import base64
 import time
 import json
+import atexit
 import numpy as np
 from datetime import datetime
 import sys
 import pydeck as pdk
 import plotly.graph_objects as go
+from HbaseScan import ScanSpec
+from HbaseRest import HBaseRestTable, HBaseReadCache, ScanBatchSizer, GatewayPool
 
 # ============================================================================
 # CONFIGURATION - Edit these values
@@ -20,13 +21,25 @@ HBASE_PASSWORD = 'mapr123'
 HBASE_REST_NODE_IP = '10.1.84.212'
 HBASE_REST_NODE = 'ezdf-core3.ezmeral.demo.local'
 HBASE_REST_PORT = '8080'
+HBASE_REST_NODES = [HBASE_REST_NODE]  # REST gateways to spread the requests over (scanner reads stay on the node that opened the scanner)
+HBASE_MAX_IN_FLIGHT_PER_NODE = 8  # Requests in flight per gateway when there are several
+HBASE_POOL_SIZE = 10  # Keep-alive connections kept open to the REST gateway
+HBASE_WIRE_FORMAT = 'json'  # Scanner reads as 'json' (base64 cells) or 'protobuf' (raw bytes, no base64 / JSON parse)
 
 # Tables
 BESTLAP_TABLE_PATH = "/ctc/bestlap-table"
 LEADERBOARD_TABLE_PATH = "/ctc/leaderboard-table"
 
-# Scanner Configuration
-SCANNER_BATCH_SIZE = 100000
+# Scanner Configuration (cells per scanner read are learned per table from earlier reads)
+SCAN_TARGET_BYTES = 8 * 1024 * 1024  # Size a scanner read should return
+SCAN_TARGET_SECONDS = 1.0  # Time a scanner read should take
+SCAN_BATCH_STATE = './scan_batch_sizes.json'  # Learned batch size per table, kept between runs (None = relearned every run)
+SCAN_BATCH_SAVE_SECONDS = 300  # Learned batch sizes are written at most this often (and when the dashboard stops)
+
+# Read Cache Configuration (scans are kept across Streamlit reruns instead of hitting the gateway every time)
+HBASE_CACHE_MB = 256  # Memory cap for cached scan results
+HBASE_CACHE_TTL = 60  # Seconds a cached scan stays valid
+HBASE_CACHE_TABLE_TTLS = {BESTLAP_TABLE_PATH: 600, LEADERBOARD_TABLE_PATH: 600}  # Per table (rewritten by the daily jobs only)
 
 # Replay Configuration
 ROWS_PER_SECOND = 60  # Speed of telemetry replay
@@ -67,106 +80,74 @@ except AttributeError:
         pass
 
 
-class HBaseRest:
-    def __init__(self, user, password, rest_node, rest_node_ip, rest_node_port):
-        self.user = user
-        self.password = password
-        self.host = rest_node
-        self.ip = rest_node_ip
-        self.port = rest_node_port
-        self.url = f"https://{rest_node}:{rest_node_port}"
-    
-    def create_scanner(self, table, filter_xml):
-        """Create a scanner for the specified table"""
-        url = f"{self.url}/{table}/scanner"
-        headers = {'Accept': 'application/xml', 'Content-Type': 'text/xml'}
-        
-        response = requests.put(
-            url, 
-            data=filter_xml, 
-            auth=(self.user, self.password), 
-            headers=headers, 
-            verify=False
-        )
-        
-        if response.status_code == 201:
-            return response.headers.get("Location")
-        else:
-            raise Exception(f"Failed to create scanner: {response.status_code}")
-
-    def read_scanner(self, scanner_url):
-        """Read data from the scanner"""
-        response = requests.get(
-            scanner_url, 
-            auth=(self.user, self.password), 
-            headers={'Accept': 'application/json'}, 
-            verify=False
-        )
-        
-        if response.status_code == 200:
-            return response.json()
-        elif response.status_code == 204:
-            return None
-        else:
-            raise Exception(f"Failed to read scanner: {response.status_code}")
-
-    def delete_scanner(self, scanner_url):
-        """Delete the scanner"""
-        requests.delete(
-            scanner_url, 
-            auth=(self.user, self.password), 
-            headers={'Accept': 'application/json'}, 
-            verify=False
+def read_cache():
+    """The dashboard's HBaseReadCache"""
+    return HBaseReadCache(HBASE_CACHE_MB * 1024 * 1024, HBASE_CACHE_TTL, HBASE_CACHE_TABLE_TTLS)
+
+
+def scan_batch_sizer():
+    """The dashboard's ScanBatchSizer (learned batch sizes loaded from / saved to SCAN_BATCH_STATE, also on shutdown)"""
+    sizer = ScanBatchSizer(SCAN_TARGET_BYTES, SCAN_TARGET_SECONDS, path=SCAN_BATCH_STATE)
+    atexit.register(sizer.save)
+    return sizer
+
+
+def hbase_tables():
+    """
+    The dashboard's HBaseRestTable per table, sharing one keep-alive session (spread over
+    HBASE_REST_NODES when there are several), the read cache and the batch sizer
+    """
+    gateways = GatewayPool(HBASE_REST_NODES, HBASE_REST_PORT, HBASE_MAX_IN_FLIGHT_PER_NODE) if len(HBASE_REST_NODES) > 1 else None
+    session = HBaseRestTable.create_session(HBASE_POOL_SIZE, gateways)
+    return {
+        table_path: HBaseRestTable(
+            HBASE_USER,
+            HBASE_PASSWORD,
+            HBASE_REST_NODE,
+            HBASE_REST_NODE_IP,
+            HBASE_REST_PORT,
+            table_path,
+            session=session,
+            cache=read_cache(),
+            batch_sizer=scan_batch_sizer()
         )
-    
-    def scan_table(self, table_path, scanner_filter):
-        """Scan table and return all rows"""
-        scanner_url = self.create_scanner(table_path, scanner_filter)
-        
-        all_rows = []
-        while True:
-            data = self.read_scanner(scanner_url)
-            if data is None or 'Row' not in data:
-                break
-            all_rows.extend(data['Row'])
-        
-        self.delete_scanner(scanner_url)
-        return all_rows
+        for table_path in (BESTLAP_TABLE_PATH, LEADERBOARD_TABLE_PATH)
+    }
 
 
-def decode_row(row):
-    """Decode HBase row to dictionary"""
-    row_dict = {}
-    row_dict['_row_key'] = base64.b64decode(row['key']).decode('utf-8')
-    
-    for cell in row.get('Cell', []):
-        column = base64.b64decode(cell['column']).decode('utf-8')
-        value = base64.b64decode(cell['$']).decode('utf-8', errors='replace')
-        row_dict[column] = value
-    
-    return row_dict
+# One cache, batch sizer and set of tables per dashboard process, kept across reruns (st.experimental_singleton on older Streamlit)
+read_cache = (getattr(st, 'cache_resource', None) or st.experimental_singleton)(read_cache)
+scan_batch_sizer = (getattr(st, 'cache_resource', None) or st.experimental_singleton)(scan_batch_sizer)
+hbase_tables = (getattr(st, 'cache_resource', None) or st.experimental_singleton)(hbase_tables)
+
 
+def scan_rows(table, scanner_filter):
+    """
+    Scan a table into row dictionaries ({'_row_key': key, '<family>:<qualifier>': value}),
+    from the read cache when the same scan ran within its TTL
+    """
+    rows = table.scan_cached(scanner_filter, HBASE_WIRE_FORMAT, families=True)
+    try:
+        table.batch_sizer.save(SCAN_BATCH_SAVE_SECONDS)
+    except OSError:
+        # the learned sizes are an optimization, never fail a page over them (retried on the next save)
+        pass
+    return [
+        {'_row_key': row_key, **{column: value.decode('utf-8', errors='replace') if isinstance(value, bytes) else value for column, value in row.items()}}
+        for row_key, row in rows.items()
+    ]
 
-def get_available_tracks(hbase_client):
+
+def get_available_tracks(tables):
     """Get list of available tracks from bestlap table"""
-    table_path = BESTLAP_TABLE_PATH.replace('/', '%2F')
-    
-    # Scan for bestlap_summary:track_id column only
-    track_col = base64.b64encode(b'bestlap_summary:track_id').decode()
-    track_name_col = base64.b64encode(b'bestlap_summary:track_name').decode()
+    # Scan for the bestlap_summary:track_id / track_name columns only
+    scanner_filter = ScanSpec().columns('bestlap_summary:track_id', 'bestlap_summary:track_name')
     
-    scanner_filter = f'''<Scanner batch="{SCANNER_BATCH_SIZE}">
-        <filter/>
-        <column>{track_col}</column>
-        <column>{track_name_col}</column>
-    </Scanner>'''
-    
-    rows = hbase_client.scan_table(table_path, scanner_filter)
+    rows = scan_rows(tables[BESTLAP_TABLE_PATH], scanner_filter)
     
     # Extract unique tracks
     tracks = {}
-    for row in rows:
-        decoded = decode_row(row)
+    for decoded in rows:
         track_id = decoded.get('bestlap_summary:track_id', 'unknown')
         track_name = decoded.get('bestlap_summary:track_name', f'Track {track_id}')
         
@@ -176,22 +157,13 @@ def get_available_tracks(hbase_client):
     return tracks
 
 
-def fetch_best_lap_data(hbase_client, track_id):
+def fetch_best_lap_data(tables, track_id):
     """Fetch best lap telemetry for a specific track"""
-    table_path = BESTLAP_TABLE_PATH.replace('/', '%2F')
-    
-    # Scan with prefix filter for this track
-    prefix = f"{track_id}:"
-    prefix_b64 = base64.b64encode(prefix.encode()).decode()
-    
-    scanner_filter = f'''<Scanner batch="{SCANNER_BATCH_SIZE}">
-        <filter>{{"type":"PrefixFilter","value":"{prefix_b64}"}}</filter>
-    </Scanner>'''
-    
-    rows = hbase_client.scan_table(table_path, scanner_filter)
+    # Scan only the row range of this track (row key prefix <track_id>:)
+    scanner_filter = ScanSpec().prefix(f"{track_id}:")
     
     # Decode all rows
-    decoded_rows = [decode_row(row) for row in rows]
+    decoded_rows = scan_rows(tables[BESTLAP_TABLE_PATH], scanner_filter)
     
     # Convert to DataFrame
     df = pd.DataFrame(decoded_rows)
@@ -199,25 +171,16 @@ def fetch_best_lap_data(hbase_client, track_id):
     return df
 
 
-def fetch_leaderboard(hbase_client, track_id):
+def fetch_leaderboard(tables, track_id):
     """Fetch leaderboard for a specific track"""
-    table_path = LEADERBOARD_TABLE_PATH.replace('/', '%2F')
-    
-    # Scan with prefix filter for this track
-    prefix = f"{track_id}:"
-    prefix_b64 = base64.b64encode(prefix.encode()).decode()
-    
-    scanner_filter = f'''<Scanner batch="{SCANNER_BATCH_SIZE}">
-        <filter>{{"type":"PrefixFilter","value":"{prefix_b64}"}}</filter>
-    </Scanner>'''
+    # Scan only the row range of this track (row key prefix <track_id>:)
+    scanner_filter = ScanSpec().prefix(f"{track_id}:")
     
-    rows = hbase_client.scan_table(table_path, scanner_filter)
+    rows = scan_rows(tables[LEADERBOARD_TABLE_PATH], scanner_filter)
     
-    # Decode and extract leaderboard data
+    # Extract leaderboard data
     leaderboard = []
-    for row in rows:
-        decoded = decode_row(row)
-        
+    for decoded in rows:
         # Extract rank from row key (format: trackid:rank:uuid)
         row_key = decoded['_row_key']
         rank = int(row_key.split(':')[1])
@@ -252,19 +215,20 @@ def fastest_lap_dashboard():
     
     st.title("Fastest Lap Telemetry Viewer")
     
-    # Initialize HBase client
-    hbase_client = HBaseRest(
-        HBASE_USER,
-        HBASE_PASSWORD,
-        HBASE_REST_NODE,
-        HBASE_REST_NODE_IP,
-        HBASE_REST_PORT
-    )
+    # HBase tables (shared by every session of the dashboard)
+    tables = hbase_tables()
+    
+    # Drop the cached scans, eg. right after the daily jobs rewrote the tables
+    if st.sidebar.button("Refresh Data"):
+        read_cache().clear()
+    
+    cache_stats = read_cache().stats()
+    st.sidebar.caption(f"Read cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses ({cache_stats['hit_ratio']:.0%}), {cache_stats['bytes'] / (1024*1024):.1f} MB")
     
     # Get available tracks
     with st.spinner("Loading available tracks..."):
         try:
-            tracks = get_available_tracks(hbase_client)
+            tracks = get_available_tracks(tables)
             
             if not tracks:
                 st.error("No tracks found in database. Please run bestlap_compute.py first.")
@@ -301,7 +265,7 @@ def fastest_lap_dashboard():
     # Fetch leaderboard
     with st.spinner("Loading leaderboard..."):
         try:
-            leaderboard_df = fetch_leaderboard(hbase_client, track_id)
+            leaderboard_df = fetch_leaderboard(tables, track_id)
         except Exception as e:
             st.warning(f"Could not load leaderboard: {e}")
             leaderboard_df = pd.DataFrame()
@@ -309,7 +273,7 @@ def fastest_lap_dashboard():
     # Fetch best lap data
     with st.spinner("Loading best lap telemetry..."):
         try:
-            df = fetch_best_lap_data(hbase_client, track_id)
+            df = fetch_best_lap_data(tables, track_id)
             
             if df.empty:
                 st.error(f"No best lap data found for track {track_id}")
@@ -1,4 +1,4 @@
-### this version deletes the table and recreates if new best laps are found!
+### this version clears the rows of every track with a new best lap (bulk prefix delete) before rewriting it!
 #!/usr/bin/env python3
 """
 Best Lap Computation Job
@@ -14,12 +14,16 @@ Usage:
 
 import sys
 import base64
+import asyncio
 import json
-import requests
 import urllib3
-import subprocess
 from datetime import datetime
 from collections import defaultdict
+from contextlib import closing
+from HbaseRest import HBaseRest, RequestThrottle, ScanBatchSizer, GatewayPool, GatewaySession
+from HbaseMetrics import HistogramSink, JsonLinesSink
+from HbaseScan import ScanSpec, column_value, page
+from HbaseJobs import open_tables, close_tables, decode_rows, iter_scan_parallel, scan_rows, load_lap_index, list_sessions, iter_session_rows, delete_rows_by_prefix
 
 # Disable SSL warnings
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -33,13 +37,43 @@ HBASE_PASSWORD = 'mapr123'
 HBASE_REST_NODE_IP = '10.1.84.212'
 HBASE_REST_NODE = 'ezdf-core3.ezmeral.demo.local'
 HBASE_REST_PORT = '8080'
+HBASE_REST_NODES = [HBASE_REST_NODE]  # REST gateways to spread the requests over (scanner reads stay on the node that opened the scanner)
+HBASE_MAX_IN_FLIGHT_PER_NODE = 8  # Requests in flight per gateway when there are several
+HBASE_POOL_SIZE = 20  # Keep-alive connections kept open to the REST gateway, shared by every table of the job (covers the SCAN_PARALLELISM region scanners)
+HBASE_WIRE_FORMAT = 'json'  # Scanner reads as 'json' (base64 cells) or 'protobuf' (raw bytes, no base64 / JSON parse)
+HBASE_CALL_LOG = None  # JSON-lines file getting one record per HBase REST call (None = off)
+HBASE_COMPRESSION = None  # 'gzip' / 'deflate' compresses insert bodies of HBASE_COMPRESS_MIN_BYTES or more (for slow links; costs CPU)
+HBASE_COMPRESS_MIN_BYTES = 1024
+HBASE_ACCEPT_ENCODING = 'gzip, deflate'  # Response encodings the gateway may use ('identity' = uncompressed responses)
 
 # Tables
 MAIN_TABLE_PATH = '/ctc/ctc-table'
 BESTLAP_TABLE_PATH = '/ctc/bestlap-table'
+LAP_INDEX_TABLE_PATH = '/ctc/lap-index-table'
+
+# Lap index (written by df_load_table) - the sessions it covers are not scanned
+USE_LAP_INDEX = True
+LAP_INDEX_BACKFILL = False  # Also list every session of the main table (a scan of all regions) and scan the ones the index does not cover (loaded before it existed)
+LAP_INDEX_COLUMN_FAMILY = 'lap'
+METADATA_COLUMN_FAMILY = 'metadata'
 
 # Scanning
-SCANNER_BATCH_SIZE = 100000  # Increased for better performance
+SCAN_TARGET_BYTES = 8 * 1024 * 1024  # Scanner reads are sized to return about this many bytes...
+SCAN_TARGET_SECONDS = 1.0  # ...and to take about this long (learned per table from earlier reads)
+SCAN_BATCH_STATE = './scan_batch_sizes.json'  # Learned batch size per table, kept between runs (None = relearned every run)
+SCAN_PARALLELISM = 8  # Region scanners reading the main table at once on a full scan
+SCAN_SPLIT_KEYS = [f'{i:x}' for i in range(1, 16)]  # Extra range boundaries (row keys start with a hex session uuid)
+MAX_CONCURRENT_REQUESTS = 8  # HBase requests kept in flight while fetching and writing best laps
+MULTIGET_BATCH_KEYS = 100  # Row keys per multiget request when the exact rows are known
+MULTIGET_MAX_URL_BYTES = 4096  # Query string size per multiget request (the gateway limits the request line)
+DELETE_PARALLELISM = 16  # Row DELETEs in flight per track when clearing old rows (keep HBASE_POOL_SIZE at least DELETE_TRACKS_AT_ONCE times this)
+DELETE_TRACKS_AT_ONCE = 1  # Tracks cleared at the same time (each runs DELETE_PARALLELISM DELETEs and holds one of the MAX_CONCURRENT_REQUESTS workers)
+DELETE_RATE_LIMIT = 10000  # Row DELETEs started per second across the whole job (None = unthrottled)
+DELETE_SCAN_BATCH = 10000  # Row keys per scanner batch while listing the rows to delete
+
+# Bookkeeping cells of the packed sample block layout (df_load_table LOADER_LAYOUT=blocks),
+# read with the channels so block rows can be expanded into samples
+BLOCK_COLUMNS = ['telemetry:block_start', 'telemetry:block_rows', 'telemetry:block_schema']
 
 # Column Selection for First Pass (finding best laps)
 MINIMAL_COLUMNS = [
@@ -49,7 +83,7 @@ MINIMAL_COLUMNS = [
     'telemetry:uuid',
     'telemetry:TrackID',
     'telemetry:SessionTick'
-]
+] + BLOCK_COLUMNS
 
 # Data Validation
 MIN_LAP_TIME = 30  # Minimum realistic lap time in seconds
@@ -57,245 +91,49 @@ MAX_LAP_TIME = 600  # Maximum realistic lap time in seconds
 MIN_DATA_POINTS = 100  # Minimum telemetry points for a valid lap
 
 # ============================================================================
-# HBase REST Client
+# HBase REST Tables
 # ============================================================================
 
-class HBaseRestClient:
-    def __init__(self, user, password, rest_node, rest_node_ip, rest_port):
-        self.user = user
-        self.password = password
-        self.url = f"https://{rest_node}:{rest_port}"
-    
-    def create_scanner(self, table_path, scanner_filter):
-        """Create a scanner for the table"""
-        url = f"{self.url}/{table_path}/scanner"
-        headers = {'Accept': 'application/xml', 'Content-Type': 'text/xml'}
-        
-        response = requests.put(
-            url, 
-            data=scanner_filter, 
-            auth=(self.user, self.password), 
-            headers=headers, 
-            verify=False
-        )
-        
-        if response.status_code == 201:
-            return response.headers.get("Location")
-        else:
-            raise Exception(f"Failed to create scanner: {response.status_code} - {response.text}")
-    
-    def read_scanner(self, scanner_url):
-        """Read batch from scanner"""
-        response = requests.get(
-            scanner_url, 
-            auth=(self.user, self.password), 
-            headers={'Accept': 'application/json'}, 
-            verify=False
-        )
-        
-        if response.status_code == 200:
-            return response.json()
-        elif response.status_code == 204:
-            # No more data
-            return None
-        else:
-            raise Exception(f"Failed to read scanner: {response.status_code}")
-    
-    def delete_scanner(self, scanner_url):
-        """Delete scanner"""
-        requests.delete(
-            scanner_url, 
-            auth=(self.user, self.password), 
-            headers={'Accept': 'application/json'}, 
-            verify=False
-        )
-    
-    def scan_full_table(self, table_path, scanner_filter):
-        """Scan entire table and return all rows"""
-        print(f"Creating scanner for table: {table_path}")
-        scanner_url = self.create_scanner(table_path, scanner_filter)
-        print(f"Scanner created: {scanner_url}")
-        
-        all_rows = []
-        batch_count = 0
-        
-        while True:
-            batch_count += 1
-            data = self.read_scanner(scanner_url)
-            
-            if data is None or 'Row' not in data:
-                break
-            
-            rows = data['Row']
-            all_rows.extend(rows)
-            print(f"  Batch {batch_count}: Read {len(rows)} rows (total: {len(all_rows)})")
-        
-        self.delete_scanner(scanner_url)
-        print(f"Scanner deleted. Total rows read: {len(all_rows)}")
-        
-        return all_rows
-    
-    def scan_with_uuid_filter(self, table_path, uuid_value):
-        """
-        Scan table for all rows with a specific UUID
-        This gets the full telemetry data for a specific session
-        """
-        print(f"  Scanning for UUID: {uuid_value}")
-        
-        # Create filter for this UUID
-        uuid_col = base64.b64encode(b'telemetry:uuid').decode()
-        uuid_val = base64.b64encode(uuid_value.encode()).decode()
-        
-        scanner_filter = f'''<Scanner batch="{SCANNER_BATCH_SIZE}">
-            <filter>
-                {{
-                    "type": "SingleColumnValueFilter",
-                    "op": "EQUAL",
-                    "family": "{base64.b64encode(b'telemetry').decode()}",
-                    "qualifier": "{base64.b64encode(b'uuid').decode()}",
-                    "comparator": {{
-                        "type": "BinaryComparator",
-                        "value": "{uuid_val}"
-                    }}
-                }}
-            </filter>
-        </Scanner>'''
-        
-        rows = self.scan_full_table(table_path, scanner_filter)
-        print(f"  Found {len(rows)} rows for UUID {uuid_value}")
-        
-        return rows
-    
-    def insert_rows(self, table_path, rows_json):
-        """Insert rows into table"""
-        url = f"{self.url}/{table_path}/dummyrowkey"
-        headers = {'Accept': 'application/json', 'Content-Type': 'application/json'}
-        
-        response = requests.put(
-            url, 
-            data=rows_json, 
-            auth=(self.user, self.password), 
-            headers=headers, 
-            verify=False
-        )
-        
-        if response.status_code == 200:
-            return True
-        else:
-            raise Exception(f"Failed to insert rows: {response.status_code} - {response.text}")
-    
-    def recreate_table_for_track(self, table_path_raw, track_id):
-        """
-        Fast table recreation using MapR CLI instead of slow row-by-row deletion.
-        Only recreates if we're updating data for a track.
-        
-        WARNING: This deletes ALL data in the table, not just one track's data.
-        Only use when you have a single track or want to refresh everything.
-        """
-        print(f"  Using MapR CLI to quickly recreate table (much faster than row-by-row delete)")
-        
-        try:
-            # Delete the table
-            print(f"  Deleting table: {table_path_raw}")
-            result = subprocess.run(
-                ['maprcli', 'table', 'delete', '-path', table_path_raw],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-            
-            if result.returncode != 0:
-                # Table might not exist, which is fine
-                print(f"  Table delete result: {result.stderr.strip()}")
-            else:
-                print(f"  Table deleted successfully")
-            
-            # Recreate the table
-            print(f"  Creating table: {table_path_raw}")
-            result = subprocess.run(
-                ['maprcli', 'table', 'create', '-path', table_path_raw, '-tabletype', 'binary'],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-            
-            if result.returncode != 0:
-                raise Exception(f"Failed to create table: {result.stderr}")
-            
-            print(f"  Table created successfully")
-            
-            # Create column families
-            for cf in ['telemetry', 'metadata', 'bestlap_summary']:
-                print(f"  Creating column family: {cf}")
-                result = subprocess.run(
-                    ['maprcli', 'table', 'cf', 'create', '-path', table_path_raw, '-cfname', cf],
-                    capture_output=True,
-                    text=True,
-                    timeout=30
-                )
-                
-                if result.returncode != 0:
-                    raise Exception(f"Failed to create column family {cf}: {result.stderr}")
-            
-            print(f"  ✓ Table recreated successfully with all column families")
-            return True
-            
-        except subprocess.TimeoutExpired:
-            raise Exception("MapR CLI command timed out")
-        except FileNotFoundError:
-            raise Exception("maprcli command not found - ensure MapR CLI is installed and in PATH")
-        except Exception as e:
-            raise Exception(f"Error recreating table: {e}")
-    
-    def delete_rows_by_prefix(self, table_path, row_key_prefix):
-        """Delete all rows with a given prefix (to overwrite old best lap)"""
-        print(f"  Deleting old best lap data with prefix: {row_key_prefix}")
-        
-        # Scan for rows with this prefix
-        prefix_b64 = base64.b64encode(row_key_prefix.encode()).decode()
-        scanner_filter = f'<Scanner batch="{SCANNER_BATCH_SIZE}"><filter>{{"type":"PrefixFilter","value":"{prefix_b64}"}}</filter></Scanner>'
-        
-        rows_to_delete = self.scan_full_table(table_path, scanner_filter)
-        
-        if not rows_to_delete:
-            print(f"  No existing data to delete")
-            return
-        
-        print(f"  Deleting {len(rows_to_delete)} old rows...")
-        
-        # Delete each row individually
-        for row in rows_to_delete:
-            row_key = base64.b64decode(row['key']).decode('utf-8')
-            encoded_key = row_key.replace('/', '%2F').replace(':', '%3A')
-            url = f"{self.url}/{table_path}/{encoded_key}"
-            
-            response = requests.delete(
-                url,
-                auth=(self.user, self.password),
-                verify=False
-            )
-            
-            if response.status_code not in [200, 204]:
-                print(f"  Warning: Failed to delete row {row_key}: {response.status_code}")
-        
-        print(f"  Successfully deleted old best lap data")
+def uuid_filter(uuid_value):
+    """Scanner definition matching every row whose telemetry:uuid is uuid_value (full table value filter, rows without the column are dropped)"""
+    return ScanSpec().filter(column_value('telemetry', 'uuid', uuid_value))
+
+
+async def scan_decoded(table, scanner_filter, label=''):
+    """Scan a table, splitting the batches into rows while the next batch is read, and decode the rows"""
+    cell_rows = []
+    batch_count = 0
+    async for batch in table.scan(scanner_filter, HBASE_WIRE_FORMAT):
+        batch_count += 1
+        rows = list(table.table.iter_cells([batch], HBASE_WIRE_FORMAT))
+        if rows and cell_rows and rows[0][0] == cell_rows[-1][0]:
+            # a row cut off at the end of the previous batch continues in this one
+            # (put back together before decoding, a sample block needs all of its cells)
+            key, cells = cell_rows.pop()
+            cell_rows.append((key, list(cells) + list(rows.pop(0)[1])))
+        cell_rows.extend(rows)
+        print(f"  {label}Batch {batch_count}: Read {len(rows)} rows (total: {len(cell_rows)})")
+    return list(decode_rows(cell_rows))
+
+
+async def multiget_decoded(table, row_keys, label=''):
+    """
+    Read and decode rows whose keys are known, MULTIGET_BATCH_KEYS keys per request with the requests
+    running concurrently - no scanner round trips. Rows come back in the order of row_keys
+    (keys that do not exist are left out).
+    """
+    rows = await table.multiget_cells(row_keys, None, HBASE_WIRE_FORMAT, MULTIGET_BATCH_KEYS, MULTIGET_MAX_URL_BYTES)
+    print(f"  {label}Read {len(rows)} of {len(row_keys)} rows in {len(table.table.multiget_batches(row_keys, None, MULTIGET_BATCH_KEYS, MULTIGET_MAX_URL_BYTES))} multiget requests")
+    return list(decode_rows(rows))
 
 
 # ============================================================================
 # Data Processing Functions
 # ============================================================================
 
-def decode_row(row):
-    """Decode a row from HBase format to dictionary"""
-    row_dict = {}
-    row_dict['_row_key'] = base64.b64decode(row['key']).decode('utf-8')
-    
-    for cell in row.get('Cell', []):
-        column = base64.b64decode(cell['column']).decode('utf-8')
-        value = base64.b64decode(cell['$']).decode('utf-8', errors='replace')
-        row_dict[column] = value
-    
-    return row_dict
+def sample_index(row):
+    """Sample index from a telemetry row key (<uuid>:<index>)"""
+    return int(parse_numeric(row['_row_key'].rsplit(':', 1)[-1], default=-1))
 
 
 def parse_numeric(value, default=0):
@@ -314,16 +152,25 @@ def group_by_track_and_uuid(rows):
     print("\nGrouping data by track and UUID...")
     
     grouped = defaultdict(lambda: defaultdict(list))
+    metadata_rows = {}
     
-    for row in rows:
-        decoded = decode_row(row)
-        
+    for decoded in rows:
+        if 'telemetry:TrackID' not in decoded and 'telemetry:uuid' not in decoded:
+            # a metadata row (<uuid>:0) not sharing its key with a sample (sessions stored as sample blocks)
+            metadata_rows[decoded['_row_key'].split(':', 1)[0]] = decoded
+            continue
         # Extract track ID and UUID
         track_id = decoded.get('telemetry:TrackID', 'unknown')
         uuid = decoded.get('telemetry:uuid', 'unknown')
         
         grouped[track_id][uuid].append(decoded)
     
+    # each metadata row goes first in its session, where the metadata is looked up
+    for uuids in grouped.values():
+        for uuid, session_rows in uuids.items():
+            if uuid in metadata_rows:
+                session_rows.insert(0, metadata_rows[uuid])
+    
     print(f"Found {len(grouped)} unique tracks:")
     for track_id, uuids in grouped.items():
         print(f"  Track '{track_id}': {len(uuids)} sessions")
@@ -484,31 +331,21 @@ def create_bestlap_rows(track_id, uuid, lap_num, lap_time, lap_rows, metadata):
     return hbase_rows
 
 
-# ============================================================================
-# Main Processing
-# ============================================================================
+def merge_best_laps(best_laps, other_laps):
+    """Keep the faster of two best laps per track"""
+    for track_id, lap_info in other_laps.items():
+        if track_id not in best_laps or lap_info['lap_time'] < best_laps[track_id]['lap_time']:
+            best_laps[track_id] = lap_info
+    return best_laps
 
-def main():
-    print("="*70)
-    print("BEST LAP COMPUTATION JOB (OPTIMIZED)")
-    print("="*70)
-    print(f"Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print()
-    
-    # Initialize HBase client
-    print("Initializing HBase REST client...")
-    client = HBaseRestClient(
-        HBASE_USER,
-        HBASE_PASSWORD,
-        HBASE_REST_NODE,
-        HBASE_REST_NODE_IP,
-        HBASE_REST_PORT
-    )
-    
-    # Encode table paths
-    main_table = MAIN_TABLE_PATH.replace('/', '%2F')
-    bestlap_table = BESTLAP_TABLE_PATH.replace('/', '%2F')
-    
+
+def find_best_laps_by_scan(main_table, sessions=None):
+    """
+    Find the best lap per track by scanning the main table (used when the lap index is unavailable,
+    and for the sessions the lap index does not cover)
+    sessions limits the scan to those session uuids (row key prefix scans) instead of the whole table
+    Returns: ({track_id: {uuid, lap_num, lap_time, row_count}}, rows_scanned)
+    """
     # Define scanner filter with minimal columns for first pass
     print("\n" + "="*70)
     print("OPTIMIZATION: Two-Pass Approach")
@@ -516,28 +353,30 @@ def main():
     print("  Pass 2: Get full telemetry only for best laps (TARGETED)")
     print("="*70)
     
-    # Build column filter for minimal scan
-    column_filters = ''.join([
-        f'<column>{base64.b64encode(col.encode()).decode()}</column>'
-        for col in MINIMAL_COLUMNS
-    ])
-    
-    scanner_filter = f'<Scanner batch="{SCANNER_BATCH_SIZE}"><filter/>{column_filters}</Scanner>'
+    # Only the minimal columns are sent back by the region servers
+    scan_spec = ScanSpec().columns(*MINIMAL_COLUMNS)
     
-    # Step 1: Scan main table with minimal columns
+    # Steps 1-2: Scan main table with minimal columns and group the rows as they arrive
     print("\n" + "="*70)
-    print("STEP 1: Fast scan with minimal columns")
+    print("STEPS 1-2: Fast scan with minimal columns, grouped by track and session")
     print("="*70)
     print(f"Scanning only these columns: {', '.join(MINIMAL_COLUMNS)}")
     
     try:
-        all_rows = client.scan_full_table(main_table, scanner_filter)
+        # rows are decoded and grouped batch by batch as the scan streams in
+        if sessions is None:
+            scanned_rows = iter_scan_parallel(main_table, scan_spec, SCAN_PARALLELISM, SCAN_SPLIT_KEYS, HBASE_WIRE_FORMAT)
+        else:
+            scanned_rows = iter_session_rows(main_table, sessions, MINIMAL_COLUMNS, HBASE_WIRE_FORMAT)
+        with closing(scanned_rows):
+            grouped_data = group_by_track_and_uuid(scanned_rows)
+        rows_scanned = sum(len(rows) for track_sessions in grouped_data.values() for rows in track_sessions.values())
         
-        if not all_rows:
+        if not rows_scanned:
             print("No data found in main table. Exiting.")
-            return
+            return None, 0
         
-        print(f"\n✓ Successfully read {len(all_rows)} rows from main table")
+        print(f"\n✓ Successfully read {rows_scanned} rows from main table")
     
     except Exception as e:
         print(f"\n✗ Error scanning main table: {e}")
@@ -545,13 +384,6 @@ def main():
         traceback.print_exc()
         sys.exit(1)
     
-    # Step 2: Group by track and UUID
-    print("\n" + "="*70)
-    print("STEP 2: Organizing data by track and session")
-    print("="*70)
-    
-    grouped_data = group_by_track_and_uuid(all_rows)
-    
     # Step 3: Find best lap for each track (using minimal data)
     print("\n" + "="*70)
     print("STEP 3: Finding fastest lap for each track")
@@ -573,62 +405,249 @@ def main():
     
     print(f"\n✓ Found best laps for {len(best_laps_minimal)} tracks")
     
+    return best_laps_minimal, rows_scanned
+
+
+def find_best_laps_from_index(index_rows):
+    """
+    Find the best lap per track from lap index entries
+    (same validation as the table scan: enough data points and a realistic lap time)
+    Returns: {track_id: {uuid, lap_num, lap_time, row_count, first_sample, last_sample}}
+    (plus block_samples for sessions stored in the packed sample block layout)
+    """
+    prefix = LAP_INDEX_COLUMN_FAMILY + ':'
+    best_laps = {}
+    for row in index_rows:
+        track_id = row.get(prefix + 'track_id', 'unknown')
+        lap_time = parse_numeric(row.get(prefix + 'lap_time'), default=None)
+        sample_count = int(parse_numeric(row.get(prefix + 'sample_count'), default=0))
+        if lap_time is None or not (MIN_LAP_TIME < lap_time < MAX_LAP_TIME) or sample_count < MIN_DATA_POINTS:
+            continue
+        if track_id not in best_laps or lap_time < best_laps[track_id]['lap_time']:
+            best_laps[track_id] = {
+                'uuid': row.get(prefix + 'uuid'),
+                'lap_num': int(parse_numeric(row.get(prefix + 'lap_number'))),
+                'lap_time': lap_time,
+                'row_count': sample_count,
+                'first_sample': int(parse_numeric(row.get(prefix + 'first_sample'))),
+                'last_sample': int(parse_numeric(row.get(prefix + 'last_sample')))
+            }
+            if row.get(prefix + 'storage_layout') == 'blocks':
+                best_laps[track_id]['block_samples'] = int(parse_numeric(row.get(prefix + 'block_samples')))
+    
+    print(f"Read {len(index_rows)} lap index entries")
+    for track_id, lap_info in best_laps.items():
+        print(f"  ✓ Best lap for track '{track_id}': UUID {lap_info['uuid']}, Lap {lap_info['lap_num']}, Time {lap_info['lap_time']:.3f}s")
+    print(f"\n✓ Found best laps for {len(best_laps)} tracks")
+    return best_laps
+
+
+# ============================================================================
+# Main Processing
+# ============================================================================
+
+async def fetch_best_lap(main_table, track_id, lap_info):
+    """Fetch and decode the full telemetry of one best lap, None if it could not be read"""
+    print(f"\nFetching full data for track: {track_id}")
+    print(f"  UUID: {lap_info['uuid']}")
+    print(f"  Lap: {lap_info['lap_num']}")
+    print(f"  Time: {lap_info['lap_time']:.3f}s")
+    
+    try:
+        # When the lap index told us where the lap is, read exactly its sample rows (<uuid>:<index>),
+        # or the sample blocks holding them (<uuid>:<block>), plus the session metadata row (<uuid>:0)
+        # by key; otherwise get ALL rows for this UUID (full telemetry) with a full table value filter
+        if 'block_samples' in lap_info:
+            first_block = lap_info['first_sample'] // lap_info['block_samples']
+            last_block = lap_info['last_sample'] // lap_info['block_samples']
+            row_keys = [f"{lap_info['uuid']}:0"] + [f"{lap_info['uuid']}:{block:06d}" for block in range(first_block, last_block + 1)]
+            decoded_rows = await multiget_decoded(main_table, row_keys, label=f"[{track_id}] ")
+        elif 'first_sample' in lap_info:
+            row_keys = [f"{lap_info['uuid']}:0"] + [
+                f"{lap_info['uuid']}:{index}" for index in range(max(lap_info['first_sample'], 1), lap_info['last_sample'] + 1)
+            ]
+            decoded_rows = await multiget_decoded(main_table, row_keys, label=f"[{track_id}] ")
+        else:
+            decoded_rows = await scan_decoded(main_table, uuid_filter(lap_info['uuid']), label=f"[{track_id}] ")
+        
+        if not decoded_rows:
+            print(f"  ✗ No data found for UUID {lap_info['uuid']}")
+            return None
+        
+        # Filter to just the best lap number
+        lap_rows = [
+            row for row in decoded_rows
+            if parse_numeric(row.get('telemetry:Lap'), default=None) == lap_info['lap_num']
+            and ('first_sample' not in lap_info or lap_info['first_sample'] <= sample_index(row) <= lap_info['last_sample'])
+        ]
+        
+        if not lap_rows:
+            print(f"  ✗ No rows found for lap {lap_info['lap_num']} (track '{track_id}')")
+            return None
+        
+        # Extract metadata (look through all rows for this UUID)
+        metadata = {}
+        for row in decoded_rows:
+            metadata_cols = {k: v for k, v in row.items() if k.startswith('metadata:')}
+            if metadata_cols:
+                metadata = metadata_cols
+                break
+        if not metadata:
+            # the value filter skips a metadata row without a telemetry:uuid cell (sessions stored as sample blocks)
+            for row in await multiget_decoded(main_table, [f"{lap_info['uuid']}:0"], label=f"[{track_id}] "):
+                metadata = {k: v for k, v in row.items() if k.startswith('metadata:')}
+        
+        print(f"  ✓ Retrieved {len(lap_rows)} telemetry rows for track '{track_id}'")
+        
+        return {
+            'uuid': lap_info['uuid'],
+            'lap_num': lap_info['lap_num'],
+            'lap_time': lap_info['lap_time'],
+            'lap_rows': lap_rows,
+            'metadata': metadata
+        }
+    
+    except Exception as e:
+        print(f"  ✗ Error fetching full data for track '{track_id}': {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+
+async def fetch_best_laps(main_table, best_laps_minimal):
+    """Fetch the full telemetry of every best lap concurrently, returns {track_id: lap data}"""
+    track_ids = list(best_laps_minimal)
+    results = await asyncio.gather(*[fetch_best_lap(main_table, track_id, best_laps_minimal[track_id]) for track_id in track_ids])
+    return {track_id: lap_data for track_id, lap_data in zip(track_ids, results) if lap_data is not None}
+
+
+async def write_best_lap(bestlap_table, track_id, lap_data, delete_throttle, delete_slots):
+    """Replace the rows of one track's best lap in the best lap table"""
+    print(f"\nInserting data for track: {track_id}")
+    
+    try:
+        # Delete the old best lap of this track (its rows share the track prefix)
+        async with delete_slots:
+            await bestlap_table.call(
+                delete_rows_by_prefix, bestlap_table.table, f"{track_id}:", "best lap",
+                DELETE_PARALLELISM, DELETE_SCAN_BATCH, delete_throttle
+            )
+        
+        # Create new best lap rows
+        hbase_rows = create_bestlap_rows(
+            track_id,
+            lap_data['uuid'],
+            lap_data['lap_num'],
+            lap_data['lap_time'],
+            lap_data['lap_rows'],
+            lap_data['metadata']
+        )
+        
+        # Convert to JSON format for HBase REST API
+        rows_json = json.dumps({'Row': hbase_rows})
+        
+        # Insert into best lap table
+        print(f"  Inserting {len(hbase_rows)} rows into best lap table for track '{track_id}'...")
+        response = await bestlap_table.insert(rows_json)
+        if response.status_code != 200:
+            raise Exception(f"Failed to insert rows: {response.status_code} - {response.text}")
+        
+        print(f"  ✓ Successfully wrote best lap for track '{track_id}'")
+    
+    except Exception as e:
+        print(f"  ✗ Error writing best lap for track '{track_id}': {e}")
+        import traceback
+        traceback.print_exc()
+
+
+async def write_best_laps(bestlap_table, best_laps_full, tracks_to_update):
+    """Replace the best laps of every updated track concurrently"""
+    # One rate limit for every bulk delete of the job, however many tracks are cleared at once
+    delete_throttle = RequestThrottle(DELETE_RATE_LIMIT, burst=DELETE_PARALLELISM)
+    # and only DELETE_TRACKS_AT_ONCE of them at a time, so their DELETE threads stay within the connection pool
+    delete_slots = asyncio.Semaphore(DELETE_TRACKS_AT_ONCE)
+    await asyncio.gather(*[
+        write_best_lap(bestlap_table, track_id, lap_data, delete_throttle, delete_slots)
+        for track_id, lap_data in best_laps_full.items() if track_id in tracks_to_update
+    ])
+
+
+def main():
+    print("="*70)
+    print("BEST LAP COMPUTATION JOB (OPTIMIZED)")
+    print("="*70)
+    print(f"Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print()
+    
+    # Initialize HBase tables (one keep-alive session for all of them, so scanner batches,
+    # inserts and row deletes reuse open connections instead of doing a TCP/TLS handshake each;
+    # every REST call is measured for the breakdown at the end)
+    print("Initializing HBase REST client...")
+    hbase_calls = HistogramSink()
+    # Cells per scanner read, learned per table (ScanSpecs without a batch of their own)
+    batch_sizer = ScanBatchSizer(SCAN_TARGET_BYTES, SCAN_TARGET_SECONDS, path=SCAN_BATCH_STATE)
+    # One keep-alive session for every table, spread over several gateways when there are
+    # (an unhealthy one is ejected for a while)
+    gateways = GatewayPool(HBASE_REST_NODES, HBASE_REST_PORT, HBASE_MAX_IN_FLIGHT_PER_NODE) if len(HBASE_REST_NODES) > 1 else None
+    session = HBaseRest.create_session(HBASE_POOL_SIZE, gateways)
+    main_table, bestlap_table, lap_index_table = open_tables(
+        [MAIN_TABLE_PATH, BESTLAP_TABLE_PATH, LAP_INDEX_TABLE_PATH],
+        HBASE_USER,
+        HBASE_PASSWORD,
+        HBASE_REST_NODE,
+        HBASE_REST_NODE_IP,
+        HBASE_REST_PORT,
+        concurrency=MAX_CONCURRENT_REQUESTS,
+        session=session,
+        hooks=[hbase_calls] + ([JsonLinesSink(HBASE_CALL_LOG)] if HBASE_CALL_LOG else []),
+        batch_sizer=batch_sizer,
+        compression=HBASE_COMPRESSION,
+        accept_encoding=HBASE_ACCEPT_ENCODING,
+        compress_min_bytes=HBASE_COMPRESS_MIN_BYTES
+    )
+    
+    best_laps_minimal = None
+    rows_scanned = 0
+    
+    # Prefer the lap index written by df_load_table - no main table scan needed
+    if USE_LAP_INDEX:
+        print("\n" + "="*70)
+        print("STEPS 1-3: Finding fastest lap for each track from the lap index")
+        print("="*70)
+        index_rows, indexed = load_lap_index(lap_index_table.table, LAP_INDEX_COLUMN_FAMILY, HBASE_WIRE_FORMAT)
+        if indexed:
+            best_laps_minimal = find_best_laps_from_index(index_rows)
+            rows_scanned = len(index_rows)
+            print(f"Lap index covers {len(indexed)} sessions")
+        else:
+            print("Lap index is empty or unavailable - falling back to a main table scan")
+        # sessions loaded before the lap index existed (or with it switched off) are not covered by it:
+        # the backfill mode lists the sessions of the main table and scans those by row key prefix
+        if indexed and LAP_INDEX_BACKFILL:
+            sessions = list_sessions(main_table.table, METADATA_COLUMN_FAMILY, SCAN_PARALLELISM, SCAN_SPLIT_KEYS, HBASE_WIRE_FORMAT)
+            if sessions is None:
+                best_laps_minimal = None
+            else:
+                unindexed = sorted(sessions - indexed)
+                print(f"\n{len(unindexed)} of {len(sessions)} sessions have no lap index entries - scanning them")
+                if unindexed:
+                    scanned_laps, scanned_rows = find_best_laps_by_scan(main_table.table, sessions=unindexed)
+                    merge_best_laps(best_laps_minimal, scanned_laps or {})
+                    rows_scanned += scanned_rows
+    
+    if best_laps_minimal is None:
+        best_laps_minimal, rows_scanned = find_best_laps_by_scan(main_table.table)
+        if best_laps_minimal is None:
+            close_tables(main_table, bestlap_table, lap_index_table)
+            return
+    
     # Step 4: Get full telemetry data for best laps only
     print("\n" + "="*70)
     print("STEP 4: Fetching full telemetry for best laps")
     print("="*70)
     
-    best_laps_full = {}
-    
-    for track_id, lap_info in best_laps_minimal.items():
-        print(f"\nFetching full data for track: {track_id}")
-        print(f"  UUID: {lap_info['uuid']}")
-        print(f"  Lap: {lap_info['lap_num']}")
-        print(f"  Time: {lap_info['lap_time']:.3f}s")
-        
-        try:
-            # Get ALL rows for this UUID (full telemetry)
-            full_session_rows = client.scan_with_uuid_filter(main_table, lap_info['uuid'])
-            
-            if not full_session_rows:
-                print(f"  ✗ No data found for UUID {lap_info['uuid']}")
-                continue
-            
-            # Decode rows and extract the specific lap
-            decoded_rows = [decode_row(row) for row in full_session_rows]
-            
-            # Filter to just the best lap number
-            lap_rows = [
-                row for row in decoded_rows
-                if parse_numeric(row.get('telemetry:Lap')) == lap_info['lap_num']
-            ]
-            
-            if not lap_rows:
-                print(f"  ✗ No rows found for lap {lap_info['lap_num']}")
-                continue
-            
-            # Extract metadata (look through all rows for this UUID)
-            metadata = {}
-            for row in decoded_rows:
-                metadata_cols = {k: v for k, v in row.items() if k.startswith('metadata:')}
-                if metadata_cols:
-                    metadata = metadata_cols
-                    break
-            
-            print(f"  ✓ Retrieved {len(lap_rows)} telemetry rows")
-            
-            best_laps_full[track_id] = {
-                'uuid': lap_info['uuid'],
-                'lap_num': lap_info['lap_num'],
-                'lap_time': lap_info['lap_time'],
-                'lap_rows': lap_rows,
-                'metadata': metadata
-            }
-        
-        except Exception as e:
-            print(f"  ✗ Error fetching full data for track '{track_id}': {e}")
-            import traceback
-            traceback.print_exc()
+    # All tracks are fetched concurrently, and each scan decodes a batch while reading the next
+    best_laps_full = asyncio.run(fetch_best_laps(main_table, best_laps_minimal))
     
     print(f"\n✓ Retrieved full telemetry for {len(best_laps_full)} tracks")
     
@@ -646,16 +665,14 @@ def main():
         print(f"  Best lap: {lap_data['lap_time']:.3f}s by {lap_data['metadata'].get('metadata:DriverInfo_Username', 'Unknown')}")
         
         try:
-            # Check if this lap is already in the table
-            row_prefix = f"{track_id}:"
-            prefix_b64 = base64.b64encode(row_prefix.encode()).decode()
-            check_filter = f'<Scanner batch="1"><filter>{{"type":"PrefixFilter","value":"{prefix_b64}"}}</filter><column>{base64.b64encode(b"bestlap_summary:uuid").decode()}</column><column>{base64.b64encode(b"bestlap_summary:lap_time").decode()}</column></Scanner>'
+            # Check if this lap is already in the table (the summary is on the first row of the track)
+            check_filter = ScanSpec(100).prefix(f"{track_id}:").columns("bestlap_summary:uuid", "bestlap_summary:lap_time").filter(page(1))
             
-            existing_rows = client.scan_full_table(bestlap_table, check_filter)
+            existing_rows = scan_rows(bestlap_table.table, check_filter, HBASE_WIRE_FORMAT)
             
             # If we have existing data, check if it's the same
             if existing_rows:
-                existing_row = decode_row(existing_rows[0])
+                existing_row = existing_rows[0]
                 existing_uuid = existing_row.get('bestlap_summary:uuid', '')
                 existing_lap_time = existing_row.get('bestlap_summary:lap_time', '')
                 
@@ -675,72 +692,41 @@ def main():
             any_changes = True
             tracks_to_update.append(track_id)
     
-    # If any changes detected, recreate the entire table (much faster than row-by-row delete)
+    # Only the rows of the changed tracks are replaced (write_best_lap clears each track's prefix first)
     if any_changes:
         print(f"\n{'='*70}")
-        print(f"DETECTED CHANGES - Recreating table for fast update")
+        print(f"DETECTED CHANGES - Replacing best laps of the changed tracks")
         print(f"  Tracks to update: {', '.join(tracks_to_update)}")
         print(f"{'='*70}")
-        
-        try:
-            client.recreate_table_for_track(BESTLAP_TABLE_PATH, None)
-        except Exception as e:
-            print(f"\n⚠️ Warning: Could not recreate table via MapR CLI: {e}")
-            print(f"Falling back to row-by-row deletion (this will be slow)...")
     else:
         print(f"\n{'='*70}")
         print(f"NO CHANGES DETECTED - All best laps are up to date!")
         print(f"{'='*70}")
     
-    # Now insert data for tracks that need updating
-    for track_id, lap_data in best_laps_full.items():
-        if track_id not in tracks_to_update:
-            continue
-        
-        print(f"\nInserting data for track: {track_id}")
-        
-        try:
-            # If table recreation failed, delete old rows manually
-            if any_changes and track_id in tracks_to_update:
-                # Table was just recreated, so no need to delete
-                # But if recreation failed, we need to delete manually
-                pass
-            
-            # Create new best lap rows
-            hbase_rows = create_bestlap_rows(
-                track_id,
-                lap_data['uuid'],
-                lap_data['lap_num'],
-                lap_data['lap_time'],
-                lap_data['lap_rows'],
-                lap_data['metadata']
-            )
-            
-            # Convert to JSON format for HBase REST API
-            rows_json = json.dumps({'Row': hbase_rows})
-            
-            # Insert into best lap table
-            print(f"  Inserting {len(hbase_rows)} rows into best lap table...")
-            client.insert_rows(bestlap_table, rows_json)
-            
-            print(f"  ✓ Successfully wrote best lap for track '{track_id}'")
-        
-        except Exception as e:
-            print(f"  ✗ Error writing best lap for track '{track_id}': {e}")
-            import traceback
-            traceback.print_exc()
+    # Now insert data for tracks that need updating (all tracks concurrently)
+    asyncio.run(write_best_laps(bestlap_table, best_laps_full, tracks_to_update))
+    close_tables(main_table, bestlap_table, lap_index_table)
     
     # Summary
     print("\n" + "="*70)
     print("JOB COMPLETE")
     print("="*70)
     print(f"Finished at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"Processed {len(all_rows)} rows in minimal scan")
+    print(f"Processed {rows_scanned} rows in minimal scan")
     print(f"Found best laps for {len(best_laps_full)} tracks")
     print("\nBest laps summary:")
     for track_id, lap_data in best_laps_full.items():
         print(f"  {track_id}: {lap_data['lap_time']:.3f}s - {lap_data['metadata'].get('metadata:DriverInfo_Username', 'Unknown')} ({len(lap_data['lap_rows'])} data points)")
     print()
+    print("HBase REST calls:")
+    print(hbase_calls.report())
+    if isinstance(session, GatewaySession):
+        print("HBase REST gateways:")
+        print(session.gateways.report())
+    batch_sizer.save()
+    for table, state in batch_sizer.stats().items():
+        print(f"Scanner batch for {table}: {state['cells']} cells (~{state['bytes_per_cell'] * state['cells'] / (1024*1024):.1f} MB per read)")
+    print()
 
 
 if __name__ == '__main__':
@@ -13,12 +13,17 @@ Usage:
 """
 
 import sys
+import asyncio
 import base64
 import json
-import requests
 import urllib3
 from datetime import datetime
 from collections import defaultdict
+from contextlib import closing
+from HbaseRest import HBaseRest, RequestThrottle, ScanBatchSizer, GatewayPool, GatewaySession
+from HbaseMetrics import HistogramSink, JsonLinesSink
+from HbaseScan import ScanSpec
+from HbaseJobs import open_tables, close_tables, iter_scan_parallel, load_lap_index, list_sessions, iter_session_rows, delete_rows_by_prefix
 
 # Disable SSL warnings
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -32,17 +37,45 @@ HBASE_PASSWORD = 'mapr123'
 HBASE_REST_NODE_IP = '10.1.84.212'
 HBASE_REST_NODE = 'ezdf-core3.ezmeral.demo.local'
 HBASE_REST_PORT = '8080'
+HBASE_REST_NODES = [HBASE_REST_NODE]  # REST gateways to spread the requests over (scanner reads stay on the node that opened the scanner)
+HBASE_MAX_IN_FLIGHT_PER_NODE = 8  # Requests in flight per gateway when there are several
+HBASE_POOL_SIZE = 20  # Keep-alive connections kept open to the REST gateway, shared by every table of the job (covers the SCAN_PARALLELISM region scanners)
+HBASE_WIRE_FORMAT = 'json'  # Scanner reads as 'json' (base64 cells) or 'protobuf' (raw bytes, no base64 / JSON parse)
+HBASE_CALL_LOG = None  # JSON-lines file getting one record per HBase REST call (None = off)
+HBASE_COMPRESSION = None  # 'gzip' / 'deflate' compresses insert bodies of HBASE_COMPRESS_MIN_BYTES or more (for slow links; costs CPU)
+HBASE_COMPRESS_MIN_BYTES = 1024
+HBASE_ACCEPT_ENCODING = 'gzip, deflate'  # Response encodings the gateway may use ('identity' = uncompressed responses)
 
 # Tables
 MAIN_TABLE_PATH = '/ctc/ctc-table'
 LEADERBOARD_TABLE_PATH = '/ctc/leaderboard-table'
+LAP_INDEX_TABLE_PATH = '/ctc/lap-index-table'
+
+# Lap index (written by df_load_table) - the sessions it covers are not scanned
+USE_LAP_INDEX = True
+LAP_INDEX_BACKFILL = False  # Also list every session of the main table (a scan of all regions) and scan the ones the index does not cover (loaded before it existed)
+LAP_INDEX_COLUMN_FAMILY = 'lap'
+METADATA_COLUMN_FAMILY = 'metadata'
 
 # Scanning
-SCANNER_BATCH_SIZE = 100000
+SCAN_TARGET_BYTES = 8 * 1024 * 1024  # Scanner reads are sized to return about this many bytes...
+SCAN_TARGET_SECONDS = 1.0  # ...and to take about this long (learned per table from earlier reads)
+SCAN_BATCH_STATE = './scan_batch_sizes.json'  # Learned batch size per table, kept between runs (None = relearned every run)
+SCAN_PARALLELISM = 8  # Region scanners reading the main table at once on a full scan
+SCAN_SPLIT_KEYS = [f'{i:x}' for i in range(1, 16)]  # Extra range boundaries (row keys start with a hex session uuid)
+MAX_CONCURRENT_REQUESTS = 8  # HBase requests kept in flight while rewriting the leaderboards
+DELETE_PARALLELISM = 16  # Row DELETEs in flight per track when clearing old rows (keep HBASE_POOL_SIZE at least DELETE_TRACKS_AT_ONCE times this)
+DELETE_TRACKS_AT_ONCE = 1  # Tracks cleared at the same time (each runs DELETE_PARALLELISM DELETEs and holds one of the MAX_CONCURRENT_REQUESTS workers)
+DELETE_RATE_LIMIT = 10000  # Row DELETEs started per second across the whole job (None = unthrottled)
+DELETE_SCAN_BATCH = 10000  # Row keys per scanner batch while listing the rows to delete
 
 # Leaderboard Configuration
 TOP_N_LAPS = 10  # Number of top laps to keep per track
 
+# Bookkeeping cells of the packed sample block layout (df_load_table LOADER_LAYOUT=blocks),
+# read with the channels so block rows can be expanded into samples
+BLOCK_COLUMNS = ['telemetry:block_start', 'telemetry:block_rows', 'telemetry:block_schema']
+
 # Column Selection for Scanning
 MINIMAL_COLUMNS = [
     'telemetry:Lap',
@@ -57,158 +90,17 @@ MINIMAL_COLUMNS = [
     'metadata:DriverInfo_Drivers_CarNumber',
     'metadata:WeekendInfo_TrackDisplayName',
     'metadata:WeekendInfo_WeekendOptions_Date'
-]
+] + BLOCK_COLUMNS
 
 # Data Validation
 MIN_LAP_TIME = 30  # Minimum realistic lap time in seconds
 MAX_LAP_TIME = 600  # Maximum realistic lap time in seconds
 MIN_DATA_POINTS = 100  # Minimum telemetry points for a valid lap
 
-# ============================================================================
-# HBase REST Client
-# ============================================================================
-
-class HBaseRestClient:
-    def __init__(self, user, password, rest_node, rest_node_ip, rest_port):
-        self.user = user
-        self.password = password
-        self.url = f"https://{rest_node}:{rest_port}"
-    
-    def create_scanner(self, table_path, scanner_filter):
-        """Create a scanner for the table"""
-        url = f"{self.url}/{table_path}/scanner"
-        headers = {'Accept': 'application/xml', 'Content-Type': 'text/xml'}
-        
-        response = requests.put(
-            url, 
-            data=scanner_filter, 
-            auth=(self.user, self.password), 
-            headers=headers, 
-            verify=False
-        )
-        
-        if response.status_code == 201:
-            return response.headers.get("Location")
-        else:
-            raise Exception(f"Failed to create scanner: {response.status_code} - {response.text}")
-    
-    def read_scanner(self, scanner_url):
-        """Read batch from scanner"""
-        response = requests.get(
-            scanner_url, 
-            auth=(self.user, self.password), 
-            headers={'Accept': 'application/json'}, 
-            verify=False
-        )
-        
-        if response.status_code == 200:
-            return response.json()
-        elif response.status_code == 204:
-            return None
-        else:
-            raise Exception(f"Failed to read scanner: {response.status_code}")
-    
-    def delete_scanner(self, scanner_url):
-        """Delete scanner"""
-        requests.delete(
-            scanner_url, 
-            auth=(self.user, self.password), 
-            headers={'Accept': 'application/json'}, 
-            verify=False
-        )
-    
-    def scan_full_table(self, table_path, scanner_filter):
-        """Scan entire table and return all rows"""
-        print(f"Creating scanner for table: {table_path}")
-        scanner_url = self.create_scanner(table_path, scanner_filter)
-        print(f"Scanner created: {scanner_url}")
-        
-        all_rows = []
-        batch_count = 0
-        
-        while True:
-            batch_count += 1
-            data = self.read_scanner(scanner_url)
-            
-            if data is None or 'Row' not in data:
-                break
-            
-            rows = data['Row']
-            all_rows.extend(rows)
-            print(f"  Batch {batch_count}: Read {len(rows)} rows (total: {len(all_rows)})")
-        
-        self.delete_scanner(scanner_url)
-        print(f"Scanner deleted. Total rows read: {len(all_rows)}")
-        
-        return all_rows
-    
-    def insert_rows(self, table_path, rows_json):
-        """Insert rows into table"""
-        url = f"{self.url}/{table_path}/dummyrowkey"
-        headers = {'Accept': 'application/json', 'Content-Type': 'application/json'}
-        
-        response = requests.put(
-            url, 
-            data=rows_json, 
-            auth=(self.user, self.password), 
-            headers=headers, 
-            verify=False
-        )
-        
-        if response.status_code == 200:
-            return True
-        else:
-            raise Exception(f"Failed to insert rows: {response.status_code} - {response.text}")
-    
-    def delete_rows_by_prefix(self, table_path, row_key_prefix):
-        """Delete all rows with a given prefix"""
-        print(f"  Deleting old leaderboard data with prefix: {row_key_prefix}")
-        
-        prefix_b64 = base64.b64encode(row_key_prefix.encode()).decode()
-        scanner_filter = f'<Scanner batch="{SCANNER_BATCH_SIZE}"><filter>{{"type":"PrefixFilter","value":"{prefix_b64}"}}</filter></Scanner>'
-        
-        rows_to_delete = self.scan_full_table(table_path, scanner_filter)
-        
-        if not rows_to_delete:
-            print(f"  No existing leaderboard to delete")
-            return
-        
-        print(f"  Deleting {len(rows_to_delete)} old leaderboard entries...")
-        
-        for row in rows_to_delete:
-            row_key = base64.b64decode(row['key']).decode('utf-8')
-            encoded_key = row_key.replace('/', '%2F').replace(':', '%3A')
-            url = f"{self.url}/{table_path}/{encoded_key}"
-            
-            response = requests.delete(
-                url,
-                auth=(self.user, self.password),
-                verify=False
-            )
-            
-            if response.status_code not in [200, 204]:
-                print(f"  Warning: Failed to delete row {row_key}: {response.status_code}")
-        
-        print(f"  Successfully deleted old leaderboard")
-
-
 # ============================================================================
 # Data Processing Functions
 # ============================================================================
 
-def decode_row(row):
-    """Decode a row from HBase format to dictionary"""
-    row_dict = {}
-    row_dict['_row_key'] = base64.b64decode(row['key']).decode('utf-8')
-    
-    for cell in row.get('Cell', []):
-        column = base64.b64decode(cell['column']).decode('utf-8')
-        value = base64.b64decode(cell['$']).decode('utf-8', errors='replace')
-        row_dict[column] = value
-    
-    return row_dict
-
-
 def parse_numeric(value, default=0):
     """Safely parse numeric value"""
     try:
@@ -225,15 +117,24 @@ def group_by_track_and_uuid(rows):
     print("\nGrouping data by track and UUID...")
     
     grouped = defaultdict(lambda: defaultdict(list))
+    metadata_rows = {}
     
-    for row in rows:
-        decoded = decode_row(row)
-        
+    for decoded in rows:
+        if 'telemetry:TrackID' not in decoded and 'telemetry:uuid' not in decoded:
+            # a metadata row (<uuid>:0) not sharing its key with a sample (sessions stored as sample blocks)
+            metadata_rows[decoded['_row_key'].split(':', 1)[0]] = decoded
+            continue
         track_id = decoded.get('telemetry:TrackID', 'unknown')
         uuid = decoded.get('telemetry:uuid', 'unknown')
         
         grouped[track_id][uuid].append(decoded)
     
+    # each metadata row goes first in its session, where the metadata is looked up
+    for uuids in grouped.values():
+        for uuid, session_rows in uuids.items():
+            if uuid in metadata_rows:
+                session_rows.insert(0, metadata_rows[uuid])
+    
     print(f"Found {len(grouped)} unique tracks:")
     for track_id, uuids in grouped.items():
         print(f"  Track '{track_id}': {len(uuids)} sessions")
@@ -385,10 +286,133 @@ def create_leaderboard_rows(track_id, top_laps):
     return hbase_rows
 
 
+def find_valid_laps_by_scan(main_table, sessions=None):
+    """
+    Find all valid laps per track by scanning the main table (used when the lap index is unavailable,
+    and for the sessions the lap index does not cover)
+    sessions limits the scan to those session uuids (row key prefix scans) instead of the whole table
+    Returns: {track_id: [(uuid, lap_num, lap_time, metadata), ...]}, or None if the table is empty
+    """
+    # Only the minimal columns are sent back by the region servers
+    scan_spec = ScanSpec().columns(*MINIMAL_COLUMNS)
+    
+    # Steps 1-2: Scan main table with minimal columns and group the rows as they arrive
+    print("\n" + "="*70)
+    print("STEPS 1-2: Scanning main table with minimal columns, grouped by track and session")
+    print("="*70)
+    
+    try:
+        # rows are decoded and grouped batch by batch as the scan streams in
+        if sessions is None:
+            scanned_rows = iter_scan_parallel(main_table, scan_spec, SCAN_PARALLELISM, SCAN_SPLIT_KEYS, HBASE_WIRE_FORMAT)
+        else:
+            scanned_rows = iter_session_rows(main_table, sessions, MINIMAL_COLUMNS, HBASE_WIRE_FORMAT)
+        with closing(scanned_rows):
+            grouped_data = group_by_track_and_uuid(scanned_rows)
+        rows_scanned = sum(len(rows) for track_sessions in grouped_data.values() for rows in track_sessions.values())
+        
+        if not rows_scanned:
+            print("No data found in main table. Exiting.")
+            return None
+        
+        print(f"\n✓ Successfully read {rows_scanned} rows from main table")
+    
+    except Exception as e:
+        print(f"\n✗ Error scanning main table: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+    
+    track_laps = {}
+    for track_id, sessions_data in grouped_data.items():
+        if track_id == 'unknown':
+            print(f"\n  Skipping track: {track_id} (invalid data)")
+            continue
+        
+        # Get all valid laps for this track
+        track_laps[track_id] = find_all_valid_laps(track_id, sessions_data)
+    
+    return track_laps
+
+
+def find_valid_laps_from_index(index_rows):
+    """
+    Find all valid laps per track from lap index entries
+    (same validation as the table scan: enough data points and a realistic lap time)
+    Returns: {track_id: [(uuid, lap_num, lap_time, metadata), ...]}
+    """
+    prefix = LAP_INDEX_COLUMN_FAMILY + ':'
+    track_laps = defaultdict(list)
+    for row in index_rows:
+        track_id = row.get(prefix + 'track_id', 'unknown')
+        lap_time = parse_numeric(row.get(prefix + 'lap_time'), default=None)
+        sample_count = int(parse_numeric(row.get(prefix + 'sample_count'), default=0))
+        if track_id == 'unknown' or lap_time is None or not (MIN_LAP_TIME < lap_time < MAX_LAP_TIME) or sample_count < MIN_DATA_POINTS:
+            continue
+        # same keys the table scan collects, so create_leaderboard_rows works on either source
+        metadata = {
+            'metadata:DriverInfo_Username': row.get(prefix + 'driver_name', 'Unknown'),
+            'metadata:DriverInfo_Drivers_CarScreenName': row.get(prefix + 'car_model', 'Unknown'),
+            'metadata:DriverInfo_Drivers_CarNumber': row.get(prefix + 'car_number', 'Unknown'),
+            'metadata:WeekendInfo_TrackDisplayName': row.get(prefix + 'track_name', 'Unknown'),
+            'metadata:WeekendInfo_WeekendOptions_Date': row.get(prefix + 'date_recorded', 'Unknown'),
+            'telemetry:source_file': row.get(prefix + 'source_file', 'Unknown')
+        }
+        track_laps[track_id].append((row.get(prefix + 'uuid'), int(parse_numeric(row.get(prefix + 'lap_number'))), lap_time, metadata))
+    
+    print(f"Read {len(index_rows)} lap index entries for {len(track_laps)} tracks")
+    return dict(track_laps)
+
+
 # ============================================================================
 # Main Processing
 # ============================================================================
 
+async def write_leaderboard(leaderboard_table, track_id, top_laps, delete_throttle, delete_slots):
+    """Replace the leaderboard rows of one track"""
+    print(f"\nProcessing leaderboard for track: {track_id}")
+    
+    try:
+        # Delete old leaderboard for this track
+        row_prefix = f"{track_id}:"
+        async with delete_slots:
+            await leaderboard_table.call(
+                delete_rows_by_prefix, leaderboard_table.table, row_prefix, "leaderboard",
+                DELETE_PARALLELISM, DELETE_SCAN_BATCH, delete_throttle
+            )
+        
+        # Create new leaderboard rows
+        hbase_rows = create_leaderboard_rows(track_id, top_laps)
+        
+        # Convert to JSON
+        rows_json = json.dumps({'Row': hbase_rows})
+        
+        # Insert into leaderboard table
+        print(f"  Inserting {len(hbase_rows)} leaderboard entries for track '{track_id}'...")
+        response = await leaderboard_table.insert(rows_json)
+        if response.status_code != 200:
+            raise Exception(f"Failed to insert rows: {response.status_code} - {response.text}")
+        
+        print(f"  ✓ Successfully wrote leaderboard for track '{track_id}'")
+    
+    except Exception as e:
+        print(f"  ✗ Error writing leaderboard for track '{track_id}': {e}")
+        import traceback
+        traceback.print_exc()
+
+
+async def write_leaderboards(leaderboard_table, track_leaderboards):
+    """Replace the leaderboards of all tracks concurrently"""
+    # One rate limit for every bulk delete of the job, however many tracks are cleared at once
+    delete_throttle = RequestThrottle(DELETE_RATE_LIMIT, burst=DELETE_PARALLELISM)
+    # and only DELETE_TRACKS_AT_ONCE of them at a time, so their DELETE threads stay within the connection pool
+    delete_slots = asyncio.Semaphore(DELETE_TRACKS_AT_ONCE)
+    await asyncio.gather(*[
+        write_leaderboard(leaderboard_table, track_id, top_laps, delete_throttle, delete_slots)
+        for track_id, top_laps in track_leaderboards.items()
+    ])
+
+
 def main():
     print("="*70)
     print("LEADERBOARD COMPUTATION JOB")
@@ -397,70 +421,73 @@ def main():
     print(f"Finding top {TOP_N_LAPS} fastest laps per track")
     print()
     
-    # Initialize HBase client
+    # Initialize HBase tables (one keep-alive session for all of them, so scanner batches,
+    # inserts and row deletes reuse open connections instead of doing a TCP/TLS handshake each;
+    # every REST call is measured for the breakdown at the end)
     print("Initializing HBase REST client...")
-    client = HBaseRestClient(
+    hbase_calls = HistogramSink()
+    # Cells per scanner read, learned per table (ScanSpecs without a batch of their own)
+    batch_sizer = ScanBatchSizer(SCAN_TARGET_BYTES, SCAN_TARGET_SECONDS, path=SCAN_BATCH_STATE)
+    # One keep-alive session for every table, spread over several gateways when there are
+    # (an unhealthy one is ejected for a while)
+    gateways = GatewayPool(HBASE_REST_NODES, HBASE_REST_PORT, HBASE_MAX_IN_FLIGHT_PER_NODE) if len(HBASE_REST_NODES) > 1 else None
+    session = HBaseRest.create_session(HBASE_POOL_SIZE, gateways)
+    main_table, leaderboard_table, lap_index_table = open_tables(
+        [MAIN_TABLE_PATH, LEADERBOARD_TABLE_PATH, LAP_INDEX_TABLE_PATH],
         HBASE_USER,
         HBASE_PASSWORD,
         HBASE_REST_NODE,
         HBASE_REST_NODE_IP,
-        HBASE_REST_PORT
+        HBASE_REST_PORT,
+        concurrency=MAX_CONCURRENT_REQUESTS,
+        session=session,
+        hooks=[hbase_calls] + ([JsonLinesSink(HBASE_CALL_LOG)] if HBASE_CALL_LOG else []),
+        batch_sizer=batch_sizer,
+        compression=HBASE_COMPRESSION,
+        accept_encoding=HBASE_ACCEPT_ENCODING,
+        compress_min_bytes=HBASE_COMPRESS_MIN_BYTES
     )
     
-    # Encode table paths
-    main_table = MAIN_TABLE_PATH.replace('/', '%2F')
-    leaderboard_table = LEADERBOARD_TABLE_PATH.replace('/', '%2F')
-    
-    # Build column filter
-    column_filters = ''.join([
-        f'<column>{base64.b64encode(col.encode()).decode()}</column>'
-        for col in MINIMAL_COLUMNS
-    ])
-    
-    scanner_filter = f'<Scanner batch="{SCANNER_BATCH_SIZE}"><filter/>{column_filters}</Scanner>'
-    
-    # Step 1: Scan main table with minimal columns
-    print("\n" + "="*70)
-    print("STEP 1: Scanning main table with minimal columns")
-    print("="*70)
-    
-    try:
-        all_rows = client.scan_full_table(main_table, scanner_filter)
-        
-        if not all_rows:
-            print("No data found in main table. Exiting.")
+    track_laps = None
+    
+    # Prefer the lap index written by df_load_table - no main table scan needed
+    if USE_LAP_INDEX:
+        print("\n" + "="*70)
+        print("STEPS 1-2: Reading valid laps from the lap index")
+        print("="*70)
+        index_rows, indexed = load_lap_index(lap_index_table.table, LAP_INDEX_COLUMN_FAMILY, HBASE_WIRE_FORMAT)
+        if indexed:
+            track_laps = find_valid_laps_from_index(index_rows)
+            print(f"Lap index covers {len(indexed)} sessions")
+        else:
+            print("Lap index is empty or unavailable - falling back to a main table scan")
+        # sessions loaded before the lap index existed (or with it switched off) are not covered by it:
+        # the backfill mode lists the sessions of the main table and scans those by row key prefix
+        if indexed and LAP_INDEX_BACKFILL:
+            sessions = list_sessions(main_table.table, METADATA_COLUMN_FAMILY, SCAN_PARALLELISM, SCAN_SPLIT_KEYS, HBASE_WIRE_FORMAT)
+            if sessions is None:
+                track_laps = None
+            else:
+                unindexed = sorted(sessions - indexed)
+                print(f"\n{len(unindexed)} of {len(sessions)} sessions have no lap index entries - scanning them")
+                if unindexed:
+                    for track_id, laps in (find_valid_laps_by_scan(main_table.table, sessions=unindexed) or {}).items():
+                        track_laps.setdefault(track_id, []).extend(laps)
+    
+    if track_laps is None:
+        track_laps = find_valid_laps_by_scan(main_table.table)
+        if track_laps is None:
+            close_tables(main_table, leaderboard_table, lap_index_table)
             return
-        
-        print(f"\n✓ Successfully read {len(all_rows)} rows from main table")
     
-    except Exception as e:
-        print(f"\n✗ Error scanning main table: {e}")
-        import traceback
-        traceback.print_exc()
-        sys.exit(1)
-    
-    # Step 2: Group by track and UUID
-    print("\n" + "="*70)
-    print("STEP 2: Organizing data by track and session")
-    print("="*70)
-    
-    grouped_data = group_by_track_and_uuid(all_rows)
-    
-    # Step 3: Find all valid laps and create leaderboards
+    # Step 3: Rank valid laps and create leaderboards
     print("\n" + "="*70)
     print("STEP 3: Finding all valid laps and ranking them")
     print("="*70)
     
     track_leaderboards = {}
     
-    for track_id, sessions_data in grouped_data.items():
-        if track_id == 'unknown':
-            print(f"\n  Skipping track: {track_id} (invalid data)")
-            continue
-        
-        # Get all valid laps for this track
-        all_valid_laps = find_all_valid_laps(track_id, sessions_data)
-        
+    for track_id, all_valid_laps in track_laps.items():
         if not all_valid_laps:
             print(f"  ✗ No valid laps found for track '{track_id}'")
             continue
@@ -479,30 +506,9 @@ def main():
     print("STEP 4: Writing leaderboards to table")
     print("="*70)
     
-    for track_id, top_laps in track_leaderboards.items():
-        print(f"\nProcessing leaderboard for track: {track_id}")
-        
-        try:
-            # Delete old leaderboard for this track
-            row_prefix = f"{track_id}:"
-            client.delete_rows_by_prefix(leaderboard_table, row_prefix)
-            
-            # Create new leaderboard rows
-            hbase_rows = create_leaderboard_rows(track_id, top_laps)
-            
-            # Convert to JSON
-            rows_json = json.dumps({'Row': hbase_rows})
-            
-            # Insert into leaderboard table
-            print(f"  Inserting {len(hbase_rows)} leaderboard entries...")
-            client.insert_rows(leaderboard_table, rows_json)
-            
-            print(f"  ✓ Successfully wrote leaderboard for track '{track_id}'")
-        
-        except Exception as e:
-            print(f"  ✗ Error writing leaderboard for track '{track_id}': {e}")
-            import traceback
-            traceback.print_exc()
+    # Every track is rewritten concurrently
+    asyncio.run(write_leaderboards(leaderboard_table, track_leaderboards))
+    close_tables(main_table, leaderboard_table, lap_index_table)
     
     # Summary
     print("\n" + "="*70)
@@ -518,6 +524,15 @@ def main():
             driver = metadata.get('metadata:DriverInfo_Username', 'Unknown')
             print(f"    #{rank}: {driver} - {lap_time:.3f}s")
     print()
+    print("HBase REST calls:")
+    print(hbase_calls.report())
+    if isinstance(session, GatewaySession):
+        print("HBase REST gateways:")
+        print(session.gateways.report())
+    batch_sizer.save()
+    for table, state in batch_sizer.stats().items():
+        print(f"Scanner batch for {table}: {state['cells']} cells (~{state['bytes_per_cell'] * state['cells'] / (1024*1024):.1f} MB per read)")
+    print()
 
 
 if __name__ == '__main__':
@@ -3,22 +3,30 @@
 
 import os
 import sys
+import mmap
 import requests
 import logging
 from logging.handlers import RotatingFileHandler 
 import json
 import urllib3
 import base64
-import irsdk
+from IbtReader import IbtReader, required_ranges, HEADER_SIZE as IBT_HEADER_SIZE
 import pandas as pd
+import numpy as np
 import csv
 import time
 import yaml
 import uuid
 from datetime import datetime
+import queue
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from minio import Minio
 from minio.error import S3Error
-from HBaseRest import HBaseRest, HBaseRestTable
+from HBaseRest import HBaseRest, HBaseRestTable, HBaseChunkedWriter, ScanBatchSizer, GatewayPool
+from HbaseEncoder import TelemetryRowEncoder, SampleBlockEncoder
+from HbaseMetrics import HistogramSink, JsonLinesSink
 
 # disable unsigned HTTPS certificate warnings
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -49,6 +57,13 @@ table_name = 'ctc-table'
 hbase_rest_node_ip = '10.1.84.212'
 hbase_rest_node = 'ezdf-core3.ezmeral.demo.local'
 hbase_rest_port = '8080'
+hbase_pool_size = 10        # keep-alive connections per process (per gateway), shared by all HBase table clients
+# Several REST gateways (host or host:port, comma separated) to spread the calls over, unset = hbase_rest_node only.
+# Scanner reads stay on the gateway that opened the scanner; a gateway failing several calls in a row is ejected for a while
+hbase_rest_nodes = [node for node in os.getenv('LOADER_HBASE_REST_NODES', '').split(',') if node]
+hbase_max_in_flight_per_node = 8    # calls in flight per gateway (per process)
+hbase_call_log = os.getenv('LOADER_HBASE_CALL_LOG')     # JSON-lines file getting one record per HBase REST call (unset = off)
+scan_batch_state = './scan_batch_sizes.json'    # scanner batch sizes learned per table, kept between runs (None = relearned every run)
 
 # MinIO Configuration
 minio_endpoint = "ezdf-core1.ezmeral.demo.local:9000"
@@ -59,6 +74,61 @@ minio_secret_key = "0X9NRDI6OE80X4LRQJDE05B221L3UFX7R5OXSO6D7KWQFTYSD1BHBY2E1UFH
 # Temp directory for downloaded files
 temp_directory = './temp'
 
+# Read IBT objects straight from MinIO into memory instead of staging them in temp_directory
+# (objects larger than stream_size_limit still go through a temp file)
+stream_from_minio = True
+stream_size_limit = 512 * 1024 * 1024
+stream_read_size = 1024 * 1024
+
+# Telemetry upload chunking (a chunk is flushed when either limit is reached)
+insert_chunk_rows = 5000
+insert_chunk_bytes = 16 * 1024 * 1024
+insert_retries = 3          # attempts per chunk before the file is marked failed
+insert_retry_delay = 2      # seconds before first retry, doubled on each further retry
+insert_in_flight = 3        # chunk PUTs kept in flight per file while the next chunk is encoded
+encode_chunk_rows = 1000    # rows encoded per vectorized pass
+
+# Telemetry storage layout:
+#   'rows'   - one HBase row per sample, one text cell per channel (<uuid>:<sample>)
+#   'blocks' - one HBase row per block_samples consecutive samples, one packed little-endian
+#              array cell per channel (<uuid>:<block>), read back with HBaseRestTable.read_sample_blocks
+#              (df_job_bestlap / df_job_leaderboard expand the blocks into samples)
+storage_layout = os.getenv('LOADER_LAYOUT', 'rows')
+block_samples = 600         # samples per block (10 seconds at 60 Hz)
+
+# Wire format of the telemetry inserts: 'json' (base64 cells) or 'protobuf' (CellSet, raw bytes - smaller and no base64 step)
+hbase_wire_format = os.getenv('LOADER_WIRE_FORMAT', 'json')
+
+# Compression of the insert bodies: 'gzip' or 'deflate' (unset = off) - fewer bytes on a slow link to the
+# gateway for some client CPU, streamed so a chunk is not held twice. The HBase call report shows the bytes
+# sent before / after compression and the time spent compressing. Responses are negotiated either way
+# (Accept-Encoding: gzip, deflate)
+hbase_compression = os.getenv('LOADER_COMPRESSION') or None
+
+# Incremental change detection: file status rows and a manifest (object name, ETag, size) live in a
+# dedicated tracking table, so a run diffs the bucket listing against the manifest rows (one key range
+# scan) instead of scanning the telemetry table. Object names are not in upload order (car / track
+# folders), so the whole bucket is listed every run
+incremental_enabled = True
+tracking_table_name = 'ctc-tracking-table'
+
+# Per-lap summary index written alongside the telemetry (read by df_job_bestlap / df_job_leaderboard)
+lap_index_enabled = True
+lap_index_table_name = 'lap-index-table'
+lap_index_column_family = 'lap'
+lap_min_time = 30           # seconds, lap times outside (lap_min_time, lap_max_time) are not recorded
+lap_max_time = 600
+
+# Parallel ingestion: number of worker processes (1 = process files one at a time)
+worker_count = int(os.getenv('LOADER_WORKERS', '1'))
+
+# Pipelined ingestion (single process): download, parse, encode and insert run as concurrent
+# stages connected by bounded queues, so the next download overlaps the current encode and
+# encoded chunks overlap their inserts
+pipeline_enabled = True
+pipeline_file_queue = 2     # downloaded / parsed files buffered between stages (bounds temp space & memory)
+pipeline_chunk_queue = 8    # encoded chunks buffered ahead of the insert stage
+
 # HBase Column Families
 telemetry_column_family = 'telemetry'
 weekenddata_column_family = 'metadata'
@@ -76,9 +146,21 @@ print(f"[CONFIG] App name: {app_name}")
 print(f"[CONFIG] Log level: {log_level}")
 print(f"[CONFIG] Log file: {log_file}")
 print(f"[CONFIG] Table name: {table_name}")
+print(f"[CONFIG] HBase connection pool size: {hbase_pool_size}")
+print(f"[CONFIG] HBase REST gateways: {', '.join(hbase_rest_nodes) or hbase_rest_node}")
+print(f"[CONFIG] HBase call log: {hbase_call_log or 'off'}")
+print(f"[CONFIG] HBase insert compression: {hbase_compression or 'off'}")
 print(f"[CONFIG] MinIO endpoint: {minio_endpoint}")
 print(f"[CONFIG] MinIO bucket: {minio_bucket}")
 print(f"[CONFIG] Temp directory: {temp_directory}")
+print(f"[CONFIG] Stream from MinIO: {stream_from_minio} (limit: {stream_size_limit / (1024*1024):.0f} MB)")
+print(f"[CONFIG] Storage layout: {storage_layout}" + (f" ({block_samples} samples per block)" if storage_layout == 'blocks' else ""))
+print(f"[CONFIG] Telemetry wire format: {hbase_wire_format}")
+print(f"[CONFIG] Incremental mode: {incremental_enabled} (tracking table: {datafabric_volume_mount_path}/{tracking_table_name})")
+print(f"[CONFIG] Lap index: {lap_index_enabled} (table: {datafabric_volume_mount_path}/{lap_index_table_name})")
+print(f"[CONFIG] Worker processes: {worker_count}")
+print(f"[CONFIG] Pipelined stages: {pipeline_enabled} (file queue: {pipeline_file_queue}, chunk queue: {pipeline_chunk_queue})")
+print(f"[CONFIG] Insert chunk size: {insert_chunk_rows} rows / {insert_chunk_bytes / (1024*1024):.0f} MB ({insert_in_flight} in flight)")
 print(f"[CONFIG] Columns of interest: {columns_of_interest}")
 
 # set parameters
@@ -89,6 +171,15 @@ table_path = (datafabric_volume_mount_path + "/" + table_name).replace("/","%2F"
 print(f"[CONFIG] HBase REST URL: {hbase_rest_url}")
 print(f"[CONFIG] Table path: {table_path}")
 
+# every HBase REST call of this process, reported at the end of the run (pool workers send theirs back with each result)
+hbase_calls = HistogramSink()
+
+# gateway selection, health and per-gateway call counts of this process (None without hbase_rest_nodes)
+hbase_gateways = GatewayPool(hbase_rest_nodes, hbase_rest_port, hbase_max_in_flight_per_node) if hbase_rest_nodes else None
+
+# sizes the scanner reads of every table client (tracking / status scans)
+scan_batch_sizer = ScanBatchSizer(path=scan_batch_state)
+
 
 ### functions
 
@@ -141,6 +232,92 @@ def get_processed_files(table_obj):
     return processed_files
 
 
+def list_bucket_objects():
+    """
+    List the .ibt objects in the bucket
+    Returns a dict: {object_name: {'etag': etag, 'size': size}} in key order
+    """
+    bucket_objects = {}
+    for obj in minio_client.list_objects(minio_bucket, recursive=True):
+        if obj.object_name.endswith('.ibt'):
+            bucket_objects[obj.object_name] = {'etag': obj.etag, 'size': obj.size}
+            print(f"[MINIO] Found: {obj.object_name}")
+    return bucket_objects
+
+
+def get_manifest(table_obj):
+    """
+    Read the manifest rows (file:<name> -> status, etag, size) from the tracking table
+    (a row key range scan over the file: rows, not a prefix filter)
+    Returns a dict: {filename: {column_name: value}}
+    """
+    print(f"[HBASE] Reading file manifest")
+    rows = table_obj.scan_table_by_range("file:", "file;", file_tracking_column_family)
+    return {row_key.replace("file:", "", 1): columns for row_key, columns in rows.items()}
+
+
+def needs_processing(filename, object_info, manifest):
+    """
+    A file is (re)loaded unless it completed before and the object has not changed since
+    (ETag and size are only compared when the manifest recorded them)
+    """
+    entry = manifest.get(filename)
+    if not entry or entry.get('status') != 'complete':
+        return True
+    if 'etag' in entry and (entry['etag'] != str(object_info['etag']) or entry.get('size') != str(object_info['size'])):
+        print(f"[PROCESSING] {filename} changed since it was loaded (ETag/size differ), reloading")
+        return True
+    return False
+
+
+def build_tracking_row(row_key, cells):
+    """
+    Row definition for the tracking table with the given {qualifier: value} cells
+    """
+    hbase_row = '{"key":"' + base64.b64encode(row_key.encode('utf-8')).decode('utf-8') + '","Cell":['
+    for col_name, value in cells.items():
+        hbase_row += '{"column":"' + base64.b64encode(f"{file_tracking_column_family}:{col_name}".encode('utf-8')).decode('utf-8') + '",'
+        hbase_row += '"$":"' + base64.b64encode(str(value).encode('utf-8')).decode('utf-8') + '"},'
+    return hbase_row[:-1] + ']}'
+
+
+def update_manifest(bucket_objects, manifest, results, bootstrap=False):
+    """
+    Record ETag and size of every file handled this run (plus, on the first incremental run, every
+    file already complete)
+    """
+    statuses = {filename: entry.get('status') for filename, entry in manifest.items()}
+    statuses.update({r['file']: r['status'] for r in results})
+    handled = [r['file'] for r in results]
+    imported = [f for f in bucket_objects if f not in handled and statuses.get(f) == 'complete' and 'etag' not in manifest.get(f, {})] if bootstrap else []
+
+    writer = HBaseChunkedWriter(table_tracking, max_rows=1000, retries=insert_retries, retry_delay=insert_retry_delay)
+    try:
+        for filename in handled + imported:
+            if filename not in bucket_objects:
+                continue
+            cells = {'etag': bucket_objects[filename]['etag'], 'size': bucket_objects[filename]['size']}
+            if filename in imported:
+                cells.update(status='complete', timestamp=datetime.now().isoformat())
+            writer.add(build_tracking_row(f"file:{filename}", cells), 1)
+        writer.flush()
+    except Exception as e:
+        # file status rows are already written - the next run compares those files by status only
+        print(f"[WARNING] Could not update manifest: {str(e)}")
+        logger.warning(f"Could not update manifest: {str(e)}")
+        return
+    print(f"[HBASE] Manifest updated ({writer.rows_sent} rows)")
+
+
+def report_chunk(stats):
+    """
+    Print per-chunk throughput reported by HBaseChunkedWriter
+    """
+    retry_note = f", {stats['attempts']} attempts" if stats['attempts'] > 1 else ""
+    print(f"[HBASE] Chunk {stats['chunk']}: {stats['rows']} rows, {stats['bytes'] / (1024*1024):.2f} MB in {stats['seconds']:.2f} seconds ({stats['rows_per_sec']:.0f} rows/s, {stats['mb_per_sec']:.2f} MB/s{retry_note})")
+    logger.debug(f"Inserted chunk {stats['chunk']}: {stats['rows']} rows in {stats['seconds']:.2f} seconds")
+
+
 def mark_file_processing(table_obj, file_name, status, row_count=0, error_msg=""):
     """
     Mark a file as being processed in HBase
@@ -211,367 +388,986 @@ if not os.path.exists(temp_directory):
     os.makedirs(temp_directory)
 
 
-### Initialize MinIO client
-print(f"[MINIO] Initializing MinIO client for endpoint: {minio_endpoint}")
-try:
-    minio_client = Minio(
+def create_minio_client():
+    """
+    Create a MinIO client for the configured endpoint
+    """
+    return Minio(
         minio_endpoint,
         access_key=minio_access_key,
         secret_key=minio_secret_key,
         secure=True,
         http_client=urllib3.PoolManager(cert_reqs='CERT_NONE')
     )
-    print("[MINIO] MinIO client initialized successfully")
-    logger.info("MinIO client initialized")
-except Exception as e:
-    print(f"[ERROR] Failed to initialize MinIO client: {str(e)}")
-    logger.exception(f"Failed to initialize MinIO client: {str(e)}")
-    sys.exit(1)
 
 
-### Get list of IBT files from MinIO bucket
-print(f"[MINIO] Listing .ibt files in bucket: {minio_bucket}")
-ibt_files_in_bucket = []
-try:
-    objects = minio_client.list_objects(minio_bucket, recursive=True)
-    for obj in objects:
-        if obj.object_name.endswith('.ibt'):
-            ibt_files_in_bucket.append(obj.object_name)
-            print(f"[MINIO] Found: {obj.object_name}")
-    
-    print(f"[MINIO] Total .ibt files found: {len(ibt_files_in_bucket)}")
-    logger.info(f"Found {len(ibt_files_in_bucket)} .ibt files in bucket")
-    
-except S3Error as e:
-    print(f"[ERROR] Failed to list objects in bucket: {str(e)}")
-    logger.exception(f"Failed to list objects in bucket: {str(e)}")
-    sys.exit(1)
+def create_hbase_hooks():
+    """
+    Hooks measuring every HBase REST call of this process: the call histogram reported at the
+    end of the run and, with hbase_call_log set, the JSON-lines call log
+    """
+    hooks = [hbase_calls]
+    if hbase_call_log:
+        hooks.append(JsonLinesSink(hbase_call_log))
+    return hooks
 
 
-### Initialize HBase table connection
-print(f"[HBASE] Instantiating HBaseRestTable for table: {datafabric_volume_mount_path}/{table_name}")
-table_iracing = HBaseRestTable(user, password, hbase_rest_node, hbase_rest_node_ip, hbase_rest_port, datafabric_volume_mount_path + "/" + table_name)
-print("[HBASE] HBaseRestTable instantiated successfully")
+def create_table_client():
+    """
+    Create the HBaseRestTable client for the master telemetry table
+    """
+    return HBaseRestTable(user, password, hbase_rest_node, hbase_rest_node_ip, hbase_rest_port, datafabric_volume_mount_path + "/" + table_name, pool_size=hbase_pool_size, hooks=create_hbase_hooks(), batch_sizer=scan_batch_sizer, compression=hbase_compression, gateways=hbase_gateways)
 
 
-### Get list of already processed files
-processed_files = get_processed_files(table_iracing)
-print(f"[HBASE] Previously processed files: {len(processed_files)}")
+def create_tracking_client():
+    """
+    Client for the table holding file status rows - the dedicated tracking table in incremental
+    mode, otherwise the master telemetry table (file:<name> rows as before).
+    Both share the telemetry client's keep-alive connection pool.
+    """
+    if incremental_enabled:
+        return HBaseRestTable(user, password, hbase_rest_node, hbase_rest_node_ip, hbase_rest_port, datafabric_volume_mount_path + "/" + tracking_table_name, session=table_iracing.session, hooks=table_iracing.hooks, batch_sizer=scan_batch_sizer, compression=hbase_compression)
+    return table_iracing
 
 
-### Determine which files need to be processed
-files_to_process = [f for f in ibt_files_in_bucket if f not in processed_files or processed_files.get(f) != 'complete']
-print(f"[PROCESSING] Files to process: {len(files_to_process)}")
+def create_lap_index_client():
+    """
+    Create the HBaseRestTable client for the per-lap summary index table
+    (same gateway, so it shares the telemetry client's connection pool)
+    """
+    return HBaseRestTable(user, password, hbase_rest_node, hbase_rest_node_ip, hbase_rest_port, datafabric_volume_mount_path + "/" + lap_index_table_name, session=table_iracing.session, hooks=table_iracing.hooks, batch_sizer=scan_batch_sizer, compression=hbase_compression)
 
-if len(files_to_process) == 0:
-    print("[PROCESSING] No new files to process. Exiting.")
-    logger.info("No new files to process")
-    sys.exit(0)
 
+def init_worker():
+    """
+    Pool worker initializer - every worker process gets its own MinIO / HBase clients
+    (connection pools must not be shared across processes), its own call histogram and gateway pool
+    """
+    global minio_client, table_iracing, table_tracking, table_lap_index, hbase_calls, hbase_gateways
+    hbase_calls = HistogramSink()
+    hbase_gateways = GatewayPool(hbase_rest_nodes, hbase_rest_port, hbase_max_in_flight_per_node) if hbase_rest_nodes else None
+    minio_client = create_minio_client()
+    table_iracing = create_table_client()
+    table_tracking = create_tracking_client()
+    table_lap_index = create_lap_index_client()
 
-### Process each file
-for file_index, ibt_file_key in enumerate(files_to_process, 1):
-    print(f"\n{'='*60}")
-    print(f"[PROCESSING] File {file_index}/{len(files_to_process)}: {ibt_file_key}")
-    print(f"{'='*60}")
-    
-    # Generate UUID for this file's data
-    uuid_value = uuid.uuid4()
-    print(f"[PROCESSING] Using UUID: {uuid_value}")
-    
+
+def fetch_object_range(object_key, offset, length, buf):
+    """
+    Stream one byte range of a MinIO object into buf at the same offset
+    """
+    response = minio_client.get_object(minio_bucket, object_key, offset=offset, length=length)
+    try:
+        pos = offset
+        for piece in response.stream(stream_read_size):
+            buf[pos:pos + len(piece)] = piece
+            pos += len(piece)
+    finally:
+        response.close()
+        response.release_conn()
+
+
+def download_to_memory(object_key, size):
+    """
+    Read an IBT object into an anonymous memory map without touching local disk.
+    Only the header is fetched first; after that just the byte ranges the reader needs
+    (var headers, session info, sample records) are requested, everything else stays unread.
+    """
+    buf = mmap.mmap(-1, size)
+    fetch_object_range(object_key, 0, min(IBT_HEADER_SIZE, size), buf)
+    ranges = []
+    for offset, length in required_ranges(buf[:IBT_HEADER_SIZE], size):
+        # the header itself is already in the buffer
+        end = offset + length
+        offset = max(offset, IBT_HEADER_SIZE)
+        if end > offset:
+            ranges.append((offset, end - offset))
+    fetched = min(IBT_HEADER_SIZE, size)
+    for offset, length in ranges:
+        fetch_object_range(object_key, offset, length, buf)
+        fetched += length
+    print(f"[MINIO] Read {fetched / (1024*1024):.2f} of {size / (1024*1024):.2f} MB in {len(ranges) + 1} range requests")
+    return buf
+
+
+def download_file(ibt_file_key, file_index):
+    """
+    Mark a file as processing and fetch it from MinIO.
+    Objects up to stream_size_limit are read straight into memory; larger ones (or all of
+    them when streaming is disabled) are downloaded to the temp directory.
+    Returns the source to parse - an in-memory buffer or a local file path.
+    """
     # Local temp file path
-    local_file_path = os.path.join(temp_directory, os.path.basename(ibt_file_key))
+    # (prefixed with the file index so concurrent workers never share a temp file)
+    local_file_path = os.path.join(temp_directory, f"{file_index}_{os.path.basename(ibt_file_key)}")
     
     # The actual file in MinIO has spaces, not + signs
     # list_objects returns + but we need to convert to spaces for download
     actual_minio_key = ibt_file_key.replace('+', ' ')
     
+    # Mark as processing
+    mark_file_processing(table_tracking, ibt_file_key, 'processing')
+    
+    if stream_from_minio:
+        size = minio_client.stat_object(minio_bucket, actual_minio_key).size
+        if size <= stream_size_limit:
+            print(f"[MINIO] Streaming {ibt_file_key} (actual key: {actual_minio_key}) into memory ({size / (1024*1024):.2f} MB)")
+            logger.info(f"Streaming {ibt_file_key} into memory")
+            return download_to_memory(actual_minio_key, size)
+        print(f"[MINIO] {ibt_file_key} is {size / (1024*1024):.2f} MB, above the {stream_size_limit / (1024*1024):.0f} MB streaming limit - using temp file")
+    
+    # Download file from MinIO
+    print(f"[MINIO] Downloading {ibt_file_key} (actual key: {actual_minio_key}) to {local_file_path}")
+    logger.info(f"Downloading {ibt_file_key}")
+    minio_client.fget_object(minio_bucket, actual_minio_key, local_file_path)
+    print(f"[MINIO] Download complete: {local_file_path}")
+    return local_file_path
+
+
+def release_source(source):
+    """
+    Remove the temp file behind a source (in-memory buffers are simply dropped)
+    """
+    if isinstance(source, str) and os.path.exists(source):
+        print(f"[CLEANUP] Removing temp file: {source}")
+        os.remove(source)
+
+
+def parse_file(source, ibt_file_key):
+    """
+    Extract telemetry channels and session metadata from a downloaded IBT file
+    (source is a local path or an in-memory buffer).
+    Returns (channels, metadata_values, session_id) where channels maps each column of interest to a
+    NumPy array of all its samples, metadata_values maps each metadata_field_list entry to its value
+    and session_id is a UUID derived from the file content.
+    """
+    # Open IBT file (memory-mapped, every channel is a zero-copy view into the mapping)
+    print(f"[IBT] Opening file: {ibt_file_key}")
+    logger.info(f"Opening file: {ibt_file_key}")
+    ibt = IbtReader(source)
+    print(f"[IBT] File opened successfully ({len(ibt)} samples, {len(ibt.var_headers)} channels available)")
+
+    # Session id derived from the file content, so a rerun of the same file writes the same row keys
+    session_id = uuid.uuid5(uuid.NAMESPACE_URL, "ibt:sha256:" + ibt.content_hash())
+    print(f"[IBT] Session id: {session_id}")
+    
+    # Extract telemetry data
+    print(f"[IBT] Extracting telemetry data")
+    column_list = columns_of_interest.replace(" ", "").split(',')
+    print(f"[IBT] Columns being extracted: {len(column_list)} columns")
+    channels = ibt.channels(column_list)
+    missing = ibt.missing_channels(column_list)
+    if missing:
+        print(f"[WARNING] Channels not present in file, skipped: {', '.join(missing)}")
+        logger.warning(f"Channels not present in {ibt_file_key}: {', '.join(missing)}")
+    
+    print(f"[IBT] Extracted {len(ibt)} samples for {len(channels)} columns")
+    logger.info(f"Extracted {len(ibt)} rows of telemetry data")
+    
+    # Extract metadata
+    print("[IBT] Extracting metadata from IBT file")
+    ibt_meta = ibt.session_info.decode('unicode-escape')
+    print(f"[IBT] Metadata extracted")
+    
+    # Close IBT file (the channel views keep the mapping alive until they are released)
+    print(f"[IBT] Closing file: {ibt_file_key}")
+    ibt.close()
+    print(f"[IBT] File closed successfully")
+    
+    # Parse metadata
+    print("[METADATA] Parsing metadata YAML")
+    metadata = yaml.safe_load(ibt_meta)
+
+    # Extract metadata fields with error handling
+    print("[METADATA] Extracting metadata fields")
     try:
-        # Mark as processing
-        mark_file_processing(table_iracing, ibt_file_key, 'processing')
-        
-        # Download file from MinIO
-        print(f"[MINIO] Downloading {ibt_file_key} (actual key: {actual_minio_key}) to {local_file_path}")
-        logger.info(f"Downloading {ibt_file_key}")
-        minio_client.fget_object(minio_bucket, actual_minio_key, local_file_path)
-        print(f"[MINIO] Download complete: {local_file_path}")
-        
-        # Initialize irsdk
-        if 'ir' not in globals():
-            print("[IBT] Initializing irsdk.IBT() object")
-            ir = irsdk.IBT()
-            print("[IBT] irsdk.IBT() object initialized successfully")
-        
-        # Open IBT file
-        print(f"[IBT] Opening file: {local_file_path}")
-        logger.info(f"Opening file: {local_file_path}")
-        ir.open(local_file_path)
-        file_open_status = True
-        print(f"[IBT] File opened successfully")
-        
-        # Extract telemetry data
-        print(f"[IBT] Extracting telemetry data")
-        df = pd.DataFrame()
-        column_list = columns_of_interest.replace(" ", "").split(',')
-        print(f"[IBT] Columns being extracted: {len(column_list)} columns")
-        
-        for param in column_list:
-            data = ir.get_all(param)
-            # Handle scalar values (convert to single-element list)
-            if not hasattr(data, '__len__') or isinstance(data, (int, float)):
-                data = [data]
-            df = pd.concat([df, pd.DataFrame({param: data})], axis=1, ignore_index=False)
-        
-        print(f"[IBT] DataFrame created with {len(df)} rows and {len(df.columns)} columns")
-        logger.info(f"Extracted {len(df)} rows of telemetry data")
-        
-        # Extract metadata
-        print("[IBT] Extracting metadata from IBT file")
-        ibt_meta = (ir._shared_mem[ir._header.session_info_offset:ir._header.session_info_offset+ir._header.session_info_len]).decode('unicode-escape')
-        print(f"[IBT] Metadata extracted")
-        
-        # Close IBT file
-        print(f"[IBT] Closing file: {local_file_path}")
-        ir.close()
-        file_open_status = False
-        print(f"[IBT] File closed successfully")
-        
-        # Parse metadata
-        print("[METADATA] Parsing metadata YAML")
-        metadata = yaml.safe_load(ibt_meta)
-        
-        # Extract metadata fields with error handling
-        print("[METADATA] Extracting metadata fields")
-        try:
-            DriverInfo_Username = metadata['DriverInfo']['Drivers'][0]['UserName']
-        except:
-            DriverInfo_Username = 'unknown'
-        
-        try:
-            WeekendInfo_TrackID = metadata['WeekendInfo']['TrackID']
-        except:
-            WeekendInfo_TrackID = 'unknown'
-        
-        try:
-            WeekendInfo_TrackDisplayName = metadata['WeekendInfo']['TrackDisplayName']
-        except:
-            WeekendInfo_TrackDisplayName = 'unknown'
-        
-        try:
-            WeekendInfo_TrackSurfaceTemp = metadata['WeekendInfo']['TrackSurfaceTemp']
-        except:
-            WeekendInfo_TrackSurfaceTemp = 'unknown'
-        
-        try:
-            WeekendInfo_WeekendOptions_TimeOfDay = metadata['WeekendInfo']['WeekendOptions']['TimeOfDay']
-        except:
-            WeekendInfo_WeekendOptions_TimeOfDay = 'unknown'
-        
-        try:
-            WeekendInfo_WeekendOptions_Date = metadata['WeekendInfo']['WeekendOptions']['Date']
-        except:
-            WeekendInfo_WeekendOptions_Date = 'unknown'
-        
-        try:
-            DriverInfo_Drivers_CarNumber = metadata['DriverInfo']['Drivers'][0]['CarNumber']
-        except:
-            DriverInfo_Drivers_CarNumber = 'unknown'
-        
-        try:
-            DriverInfo_Drivers_CarScreenName = metadata['DriverInfo']['Drivers'][0]['CarScreenName']
-        except:
-            DriverInfo_Drivers_CarScreenName = 'unknown'
-        
-        try:
-            CarSetup_TiresAero_TireType = metadata['CarSetup']['TiresAero']['TireType']
-        except:
-            CarSetup_TiresAero_TireType = 'unknown'
-        
-        try:
-            Chassis_Front_ArbBlades = metadata['CarSetup']['Chassis']['Front']['ArbBlades']
-        except:
-            Chassis_Front_ArbBlades = 'unknown'
-        
-        try:
-            Chassis_LeftFront_CornerWeight = metadata['CarSetup']['Chassis']['LeftFront']['CornerWeight']
-        except:
-            Chassis_LeftFront_CornerWeight = 'unknown'
-        
-        try:
-            Chassis_LeftFront_RideHeight = metadata['CarSetup']['Chassis']['LeftFront']['RideHeight']
-        except:
-            Chassis_LeftFront_RideHeight = 'unknown'
-        
-        try:
-            Chassis_RightFront_CornerWeight = metadata['CarSetup']['Chassis']['RightFront']['CornerWeight']
-        except:
-            Chassis_RightFront_CornerWeight = 'unknown'
-        
-        try:
-            Chassis_RightFront_RideHeight = metadata['CarSetup']['Chassis']['RightFront']['RideHeight']
-        except:
-            Chassis_RightFront_RideHeight = 'unknown'
-        
-        try:
-            Chassis_LeftRear_CornerWeight = metadata['CarSetup']['Chassis']['LeftRear']['CornerWeight']
-        except:
-            Chassis_LeftRear_CornerWeight = 'unknown'
-        
-        try:
-            Chassis_LeftRear_RideHeight = metadata['CarSetup']['Chassis']['LeftRear']['RideHeight']
-        except:
-            Chassis_LeftRear_RideHeight = 'unknown'
-        
-        try:
-            Chassis_RightRear_CornerWeight = metadata['CarSetup']['Chassis']['RightRear']['CornerWeight']
-        except:
-            Chassis_RightRear_CornerWeight = 'unknown'
-        
-        try:
-            Chassis_RightRear_RideHeight = metadata['CarSetup']['Chassis']['RightRear']['RideHeight']
-        except:
-            Chassis_RightRear_RideHeight = 'unknown'
-        
-        print(f"[METADATA] Driver: {DriverInfo_Username}, Track: {WeekendInfo_TrackDisplayName}, Car: {DriverInfo_Drivers_CarScreenName}")
-        
-        # Create HBase metadata row
-        index = 0
-        print("[HBASE] Creating HBase row for metadata")
-        hbase_meta_row = '{"Row":[' + '{"key":"' + base64.b64encode((str(uuid_value) + ":" + str(index)).encode('utf-8')).decode('utf-8') + '","Cell":['
-        
-        # add column with uuid
-        hbase_meta_row = hbase_meta_row + '{"column":"' + base64.b64encode((weekenddata_column_family + ":" + "uuid").encode('utf-8')).decode('utf-8') + '","$":"' + base64.b64encode((str(uuid_value)).encode('utf-8')).decode('utf-8') + '"},'
-        
-        # add source file name
-        hbase_meta_row = hbase_meta_row + '{"column":"' + base64.b64encode((weekenddata_column_family + ":" + "source_file").encode('utf-8')).decode('utf-8') + '","$":"' + base64.b64encode((str(ibt_file_key)).encode('utf-8')).decode('utf-8') + '"},'
-        
-        # loop over fields and create column syntax
-        g = globals()
-        for col_name in metadata_field_list:
-            hbase_meta_row = hbase_meta_row + '{"column":"' + base64.b64encode((weekenddata_column_family + ":" + str(col_name)).encode('utf-8')).decode('utf-8') + '","$":"' + base64.b64encode((str(g[col_name])).encode('utf-8')).decode('utf-8') + '"},'
-        
-        hbase_meta_row = hbase_meta_row[:-1] + ']}' + ']}'
-        print(f"[HBASE] Metadata row created")
-        
-        # Create HBase telemetry rows
-        print("[HBASE] Creating payload for HBase REST call")
-        logger.info("Creating payload for HBase REST call")
-        
-        # Filter DataFrame to include only the specified columns
-        df = df[columns_of_interest.replace(" ", "").split(',')]
-        
-        hbase_rows = []
-        # loop over df rows and create list of hbase rows
-        print(f"[HBASE] Processing {len(df)} dataframe rows for HBase")
-        row_count = 0
-        print_interval = max(1, min(1000, len(df) // 10))
-        
-        for index, row in df.iterrows():
-            row_count += 1
-            if row_count % print_interval == 0 or row_count == 1 or row_count == len(df):
-                print(f"[HBASE] Processing row {row_count} of {len(df)} ({row_count/len(df)*100:.1f}%)")
-            
-            hbase_row = '{"key":"' + base64.b64encode((str(uuid_value) + ":" + str(index)).encode('utf-8')).decode('utf-8') + '","Cell":['
-            
-            # add column with uuid
-            hbase_row = hbase_row + '{"column":"' + base64.b64encode((telemetry_column_family + ":" + "uuid").encode('utf-8')).decode('utf-8') + '","$":"' + base64.b64encode((str(uuid_value)).encode('utf-8')).decode('utf-8') + '"},'
-            
-            # add column TrackID
-            hbase_row = hbase_row + '{"column":"' + base64.b64encode((telemetry_column_family + ":" + "TrackID").encode('utf-8')).decode('utf-8') + '","$":"' + base64.b64encode((str(WeekendInfo_TrackID)).encode('utf-8')).decode('utf-8') + '"},'
-            
-            # add source file
-            hbase_row = hbase_row + '{"column":"' + base64.b64encode((telemetry_column_family + ":" + "source_file").encode('utf-8')).decode('utf-8') + '","$":"' + base64.b64encode((str(ibt_file_key)).encode('utf-8')).decode('utf-8') + '"},'
-            
-            for col_name, value in row.items():
-                hbase_row = hbase_row + '{"column":"' + base64.b64encode((telemetry_column_family + ":" + str(col_name)).encode('utf-8')).decode('utf-8') + '","$":"' + base64.b64encode((str(value)).encode('utf-8')).decode('utf-8') + '"},'
-            
-            hbase_row = hbase_row[:-1] + ']}'
-            hbase_rows.append(hbase_row)
+        DriverInfo_Username = metadata['DriverInfo']['Drivers'][0]['UserName']
+    except:
+        DriverInfo_Username = 'unknown'
+
+    try:
+        WeekendInfo_TrackID = metadata['WeekendInfo']['TrackID']
+    except:
+        WeekendInfo_TrackID = 'unknown'
+
+    try:
+        WeekendInfo_TrackDisplayName = metadata['WeekendInfo']['TrackDisplayName']
+    except:
+        WeekendInfo_TrackDisplayName = 'unknown'
+
+    try:
+        WeekendInfo_TrackSurfaceTemp = metadata['WeekendInfo']['TrackSurfaceTemp']
+    except:
+        WeekendInfo_TrackSurfaceTemp = 'unknown'
+
+    try:
+        WeekendInfo_WeekendOptions_TimeOfDay = metadata['WeekendInfo']['WeekendOptions']['TimeOfDay']
+    except:
+        WeekendInfo_WeekendOptions_TimeOfDay = 'unknown'
+
+    try:
+        WeekendInfo_WeekendOptions_Date = metadata['WeekendInfo']['WeekendOptions']['Date']
+    except:
+        WeekendInfo_WeekendOptions_Date = 'unknown'
+
+    try:
+        DriverInfo_Drivers_CarNumber = metadata['DriverInfo']['Drivers'][0]['CarNumber']
+    except:
+        DriverInfo_Drivers_CarNumber = 'unknown'
+
+    try:
+        DriverInfo_Drivers_CarScreenName = metadata['DriverInfo']['Drivers'][0]['CarScreenName']
+    except:
+        DriverInfo_Drivers_CarScreenName = 'unknown'
+
+    try:
+        CarSetup_TiresAero_TireType = metadata['CarSetup']['TiresAero']['TireType']
+    except:
+        CarSetup_TiresAero_TireType = 'unknown'
+
+    try:
+        Chassis_Front_ArbBlades = metadata['CarSetup']['Chassis']['Front']['ArbBlades']
+    except:
+        Chassis_Front_ArbBlades = 'unknown'
+
+    try:
+        Chassis_LeftFront_CornerWeight = metadata['CarSetup']['Chassis']['LeftFront']['CornerWeight']
+    except:
+        Chassis_LeftFront_CornerWeight = 'unknown'
+
+    try:
+        Chassis_LeftFront_RideHeight = metadata['CarSetup']['Chassis']['LeftFront']['RideHeight']
+    except:
+        Chassis_LeftFront_RideHeight = 'unknown'
+
+    try:
+        Chassis_RightFront_CornerWeight = metadata['CarSetup']['Chassis']['RightFront']['CornerWeight']
+    except:
+        Chassis_RightFront_CornerWeight = 'unknown'
+
+    try:
+        Chassis_RightFront_RideHeight = metadata['CarSetup']['Chassis']['RightFront']['RideHeight']
+    except:
+        Chassis_RightFront_RideHeight = 'unknown'
+
+    try:
+        Chassis_LeftRear_CornerWeight = metadata['CarSetup']['Chassis']['LeftRear']['CornerWeight']
+    except:
+        Chassis_LeftRear_CornerWeight = 'unknown'
+
+    try:
+        Chassis_LeftRear_RideHeight = metadata['CarSetup']['Chassis']['LeftRear']['RideHeight']
+    except:
+        Chassis_LeftRear_RideHeight = 'unknown'
+
+    try:
+        Chassis_RightRear_CornerWeight = metadata['CarSetup']['Chassis']['RightRear']['CornerWeight']
+    except:
+        Chassis_RightRear_CornerWeight = 'unknown'
+
+    try:
+        Chassis_RightRear_RideHeight = metadata['CarSetup']['Chassis']['RightRear']['RideHeight']
+    except:
+        Chassis_RightRear_RideHeight = 'unknown'
+
+    print(f"[METADATA] Driver: {DriverInfo_Username}, Track: {WeekendInfo_TrackDisplayName}, Car: {DriverInfo_Drivers_CarScreenName}")
+    
+    g = locals()
+    metadata_values = {col_name: g[col_name] for col_name in metadata_field_list}
+    return channels, metadata_values, session_id
+
+
+def sample_count(channels):
+    """
+    Number of samples in a channels dict
+    """
+    return len(next(iter(channels.values()))) if channels else 0
+
+
+def build_metadata_row(uuid_value, ibt_file_key, metadata_values):
+    """
+    Build the REST payload for the session metadata row (<uuid>:0 in the metadata column family)
+    """
+    index = 0
+    print("[HBASE] Creating HBase row for metadata")
+    hbase_meta_row = '{"Row":[' + '{"key":"' + base64.b64encode((str(uuid_value) + ":" + str(index)).encode('utf-8')).decode('utf-8') + '","Cell":['
+    
+    # add column with uuid
+    hbase_meta_row = hbase_meta_row + '{"column":"' + base64.b64encode((weekenddata_column_family + ":" + "uuid").encode('utf-8')).decode('utf-8') + '","$":"' + base64.b64encode((str(uuid_value)).encode('utf-8')).decode('utf-8') + '"},'
+    
+    # add source file name
+    hbase_meta_row = hbase_meta_row + '{"column":"' + base64.b64encode((weekenddata_column_family + ":" + "source_file").encode('utf-8')).decode('utf-8') + '","$":"' + base64.b64encode((str(ibt_file_key)).encode('utf-8')).decode('utf-8') + '"},'
+    
+    # record the telemetry layout so readers know how to decode this session
+    if storage_layout == 'blocks':
+        hbase_meta_row = hbase_meta_row + '{"column":"' + base64.b64encode((weekenddata_column_family + ":" + "storage_layout").encode('utf-8')).decode('utf-8') + '","$":"' + base64.b64encode(storage_layout.encode('utf-8')).decode('utf-8') + '"},'
+        hbase_meta_row = hbase_meta_row + '{"column":"' + base64.b64encode((weekenddata_column_family + ":" + "block_samples").encode('utf-8')).decode('utf-8') + '","$":"' + base64.b64encode(str(block_samples).encode('utf-8')).decode('utf-8') + '"},'
+    
+    # loop over fields and create column syntax
+    for col_name in metadata_field_list:
+        hbase_meta_row = hbase_meta_row + '{"column":"' + base64.b64encode((weekenddata_column_family + ":" + str(col_name)).encode('utf-8')).decode('utf-8') + '","$":"' + base64.b64encode((str(metadata_values[col_name])).encode('utf-8')).decode('utf-8') + '"},'
+    
+    hbase_meta_row = hbase_meta_row[:-1] + ']}' + ']}'
+    print(f"[HBASE] Metadata row created")
+    return hbase_meta_row
+
+
+def compute_lap_index(channels):
+    """
+    Split a session into laps while the samples are still in memory.
+    Samples are grouped by their Lap value; the lap time is the first valid LapLastLapTime
+    reported during the following lap, falling back to the highest LapCurrentLapTime of the lap
+    (the same rules df_job_bestlap / df_job_leaderboard apply to the raw telemetry).
+    The Lap value is not always monotonic (a pit reset or tow can report the same lap again),
+    so first_sample/last_sample/sample_count describe the longest contiguous run of samples with
+    that Lap value, never a span that takes in other laps' samples.
+    Returns a list of dicts: {lap_number, lap_time, first_sample, last_sample, sample_count}
+    (lap_time is None when no valid time was found)
+    """
+    if not all(col_name in channels for col_name in ('Lap', 'LapLastLapTime', 'LapCurrentLapTime')):
+        print("[LAPS] Lap channels not extracted, skipping lap index")
+        return []
+    lap = np.asarray(channels['Lap']).astype(np.int64)
+    if len(lap) == 0:
+        return []
+    last_lap_time = np.asarray(channels['LapLastLapTime'], dtype=np.float64)
+    current_lap_time = np.asarray(channels['LapCurrentLapTime'], dtype=np.float64)
+
+    # sample indices of every lap, in sample order
+    order = np.argsort(lap, kind='stable')
+    groups = np.split(order, np.flatnonzero(np.diff(lap[order])) + 1)
+    samples_by_lap = {int(lap[indices[0]]): indices for indices in groups}
+
+    # longest contiguous run of every lap, as [start, stop) sample indices
+    changes = np.flatnonzero(np.diff(lap)) + 1
+    runs = {}
+    for start, stop in zip(np.concatenate(([0], changes)), np.concatenate((changes, [len(lap)]))):
+        lap_number = int(lap[start])
+        if lap_number not in runs or stop - start > runs[lap_number][1] - runs[lap_number][0]:
+            runs[lap_number] = (int(start), int(stop))
+
+    laps = []
+    for lap_number, indices in samples_by_lap.items():
+        lap_time = None
+        next_lap = samples_by_lap.get(lap_number + 1)
+        if next_lap is not None:
+            reported = last_lap_time[next_lap]
+            valid = (reported > lap_min_time) & (reported < lap_max_time)
+            if valid.any():
+                lap_time = float(reported[valid.argmax()])
+        if lap_time is None:
+            max_current_time = float(current_lap_time[indices].max())
+            if lap_min_time < max_current_time < lap_max_time:
+                lap_time = max_current_time
+        start, stop = runs[lap_number]
+        laps.append({
+            'lap_number': lap_number,
+            'lap_time': lap_time,
+            'first_sample': start,
+            'last_sample': stop - 1,
+            'sample_count': stop - start
+        })
+    print(f"[LAPS] Found {len(laps)} laps, {sum(1 for l in laps if l['lap_time'] is not None)} with a valid lap time")
+    return laps
+
+
+def build_lap_index_rows(uuid_value, ibt_file_key, metadata_values, laps):
+    """
+    Build the REST payload for the lap index rows of one session.
+    Row key format: <track_id>:<uuid>:<lap_number padded> so a track's laps can be read with a prefix scan.
+    The session row (<track_id>:<uuid>:session, no lap_number) marks the session as covered by the
+    index, even when it has no laps, so the daily jobs never need to list the main table's sessions
+    """
+    track_id = metadata_values['WeekendInfo_TrackID']
+    session_fields = [
+        ("track_id", track_id),
+        ("uuid", uuid_value),
+        ("lap_count", len(laps)),
+        ("source_file", ibt_file_key)
+    ]
+    index_rows = [(f"{track_id}:{uuid_value}:session", session_fields)]
+    for lap in laps:
+        fields = [
+            ("track_id", track_id),
+            ("uuid", uuid_value),
+            ("lap_number", lap['lap_number']),
+            ("lap_time", "" if lap['lap_time'] is None else repr(lap['lap_time'])),
+            ("first_sample", lap['first_sample']),
+            ("last_sample", lap['last_sample']),
+            ("sample_count", lap['sample_count']),
+            ("driver_name", metadata_values['DriverInfo_Username']),
+            ("car_model", metadata_values['DriverInfo_Drivers_CarScreenName']),
+            ("car_number", metadata_values['DriverInfo_Drivers_CarNumber']),
+            ("track_name", metadata_values['WeekendInfo_TrackDisplayName']),
+            ("date_recorded", metadata_values['WeekendInfo_WeekendOptions_Date']),
+            ("source_file", ibt_file_key)
+        ]
+        # readers fetch the lap's sample blocks (<uuid>:<block>) instead of its sample rows
+        if storage_layout == 'blocks':
+            fields += [("storage_layout", storage_layout), ("block_samples", block_samples)]
+        index_rows.append((f"{track_id}:{uuid_value}:{lap['lap_number']:04d}", fields))
+    
+    hbase_rows = []
+    for row_key, fields in index_rows:
+        hbase_row = '{"key":"' + base64.b64encode(row_key.encode('utf-8')).decode('utf-8') + '","Cell":['
+        for col_name, value in fields:
+            hbase_row = hbase_row + '{"column":"' + base64.b64encode((lap_index_column_family + ":" + col_name).encode('utf-8')).decode('utf-8') + '","$":"' + base64.b64encode((str(value)).encode('utf-8')).decode('utf-8') + '"},'
+        hbase_rows.append(hbase_row[:-1] + ']}')
+    return '{"Row":[' + ', '.join(hbase_rows) + ']}'
+
+
+def insert_lap_index(ibt_file_key, uuid_value, metadata_values, laps):
+    """
+    Write the lap index rows for a file (its session row even without laps), raising an exception
+    if the REST call fails. Called once the telemetry is loaded, so the index never points at missing samples.
+    """
+    if not lap_index_enabled:
+        return
+    print(f"[HBASE] Writing {len(laps)} lap index rows and the session row")
+    res = table_lap_index.insert(build_lap_index_rows(uuid_value, ibt_file_key, metadata_values, laps))
+    if res.status_code != 200:
+        raise Exception(f"Failed to load lap index: HTTP {res.status_code}")
+    logger.info(f"Wrote {len(laps)} lap index rows for file: {ibt_file_key}")
+
+
+def create_encoder(channels, uuid_value, ibt_file_key, metadata_values):
+    """
+    Encoder for the telemetry rows (qualifiers and constant cells encoded once per file)
+    in the configured storage layout
+    """
+    if storage_layout == 'blocks':
+        return SampleBlockEncoder(
+            telemetry_column_family,
+            list(channels),
+            str(uuid_value) + ":",
+            [("uuid", uuid_value), ("TrackID", metadata_values['WeekendInfo_TrackID']), ("source_file", ibt_file_key)],
+            block_samples=block_samples
+        )
+    return TelemetryRowEncoder(
+        telemetry_column_family,
+        list(channels),
+        str(uuid_value) + ":",
+        [("uuid", uuid_value), ("TrackID", metadata_values['WeekendInfo_TrackID']), ("source_file", ibt_file_key)],
+        chunk_rows=encode_chunk_rows
+    )
+
+
+def insert_metadata(ibt_file_key, hbase_meta_row):
+    """
+    Write the metadata row, raising an exception if the REST call fails
+    """
+    print("[HBASE] Starting metadata insertion")
+    st = time.time()
+    logger.info(f"Starting metadata load for file: {ibt_file_key}")
+    res = table_iracing.insert(hbase_meta_row)
+    print(f"[HBASE] Metadata insertion API call completed with status code: {res.status_code}")
+    et = time.time()
+    if res.status_code != 200:
+        raise Exception(f"Failed to load metadata: HTTP {res.status_code}")
+    print(f"[HBASE] Successfully loaded metadata. Execution time: {et - st:.2f} seconds")
+    logger.info(f"Successfully loaded metadata. Execution time: {et - st:.2f} seconds")
+
+
+def get_checkpoint(ibt_file_key, session_id):
+    """
+    Number of samples of this session already committed by an earlier, interrupted run.
+    0 when there is no checkpoint or it belongs to another session id (the file content changed).
+    In the blocks layout it is rounded down to a block boundary, as blocks are always written whole.
+    """
+    try:
+        row = table_tracking.get_row(f"file:{ibt_file_key}", file_tracking_column_family)
+    except Exception as e:
+        print(f"[WARNING] Could not read checkpoint for {ibt_file_key}, starting from the beginning: {str(e)}")
+        logger.warning(f"Could not read checkpoint for {ibt_file_key}: {str(e)}")
+        return 0
+    if row.get('session_id') != str(session_id):
+        return 0
+    committed_rows = int(row.get('committed_rows', 0))
+    if storage_layout == 'blocks':
+        committed_rows -= committed_rows % block_samples
+    if committed_rows:
+        print(f"[RESUME] {ibt_file_key}: {committed_rows} samples already committed, resuming from there")
+        logger.info(f"Resuming {ibt_file_key} from sample {committed_rows}")
+    return committed_rows
+
+
+def save_checkpoint(ibt_file_key, session_id, committed_rows):
+    """
+    Record how many samples of a session are committed (called after every inserted chunk).
+    A lost checkpoint only means a rerun rewrites some rows, so failures are not fatal.
+    """
+    try:
+        res = table_tracking.insert('{"Row":[' + build_tracking_row(f"file:{ibt_file_key}", {'session_id': session_id, 'committed_rows': committed_rows}) + ']}')
+        if res.status_code != 200:
+            raise Exception(f"HTTP {res.status_code}")
+    except Exception as e:
+        print(f"[WARNING] Could not save checkpoint for {ibt_file_key}: {str(e)}")
+        logger.warning(f"Could not save checkpoint for {ibt_file_key}: {str(e)}")
+
+
+def create_writer(ibt_file_key, session_id, resume_from=0):
+    """
+    Chunked writer for telemetry rows, checkpointing the committed sample count after every chunk
+    (chunks complete in order even with insert_in_flight > 1, so everything before the checkpoint is in the table)
+    """
+    def on_chunk(stats):
+        report_chunk(stats)
+        save_checkpoint(ibt_file_key, session_id, resume_from + stats['total_rows'])
+
+    return HBaseChunkedWriter(
+        table_iracing,
+        max_rows=insert_chunk_rows,
+        max_bytes=insert_chunk_bytes,
+        retries=insert_retries,
+        retry_delay=insert_retry_delay,
+        on_chunk=on_chunk,
+        in_flight=insert_in_flight,
+        wire_format=hbase_wire_format
+    )
+
+
+def fail_file(result, stage, error, rows_sent=0, source=None):
+    """
+    Record a failed file: status row, result dict and temp file cleanup
+    """
+    print(f"[ERROR] {stage} failed for file {result['file']}: {str(error)}")
+    logger.error(f"{stage} failed for file {result['file']}: {str(error)}")
+    mark_file_processing(table_tracking, result['file'], 'failed', row_count=rows_sent, error_msg=str(error))
+    result.update(status='failed', error=str(error), rows=rows_sent)
+    release_source(source)
+
+
+def process_file(ibt_file_key, file_index, file_count):
+    """
+    Download, parse, encode and insert a single IBT file.
+    Status rows are written by whichever process handles the file, so each file's
+    'processing' -> 'complete' / 'failed' transition stays with a single writer.
+    Returns a result dict: {file, status, rows, resumed_rows, bytes, seconds, error}
+    where rows counts the rows written in this run and resumed_rows those an earlier
+    run had already committed before the checkpoint
+    """
+    result = {'file': ibt_file_key, 'status': 'failed', 'rows': 0, 'resumed_rows': 0, 'bytes': 0, 'seconds': 0.0, 'error': ''}
+    file_st = time.time()
+    print(f"\n{'='*60}")
+    print(f"[PROCESSING] File {file_index}/{file_count}: {ibt_file_key}")
+    print(f"{'='*60}")
+    
+    source = None
+    try:
+        source = download_file(ibt_file_key, file_index)
+        channels, metadata_values, uuid_value = parse_file(source, ibt_file_key)
+        print(f"[PROCESSING] Using UUID: {uuid_value}")
         
-        # create string for REST payload
-        print("[HBASE] Finalizing REST payload")
-        hrows = '{"Row":' + str(hbase_rows).replace("'{","{").replace("}'","}") + '}'
-        print(f"[HBASE] Payload ready, size: {len(hrows) / (1024*1024):.2f} MB")
-        logger.info("Payload ready for HBase REST call")
+        # Clean up temp file
+        release_source(source)
         
-        # Write metadata to HBase
-        print("[HBASE] Starting metadata insertion")
+        # Skip the samples an earlier run already committed (rows are upserts, so overlap is harmless)
+        resume_from = get_checkpoint(ibt_file_key, uuid_value)
+        result['resumed_rows'] = resume_from
+        laps = compute_lap_index(channels) if lap_index_enabled else []
+        insert_metadata(ibt_file_key, build_metadata_row(uuid_value, ibt_file_key, metadata_values))
+        encoder = create_encoder(channels, uuid_value, ibt_file_key, metadata_values)
+    except Exception as e:
+        logger.exception(f"Exception processing file {ibt_file_key}: {str(e)}")
+        fail_file(result, "Processing", e, source=source)
+        result['seconds'] = time.time() - file_st
+        return result
+    
+    # Write telemetry data to HBase in bounded chunks as they are encoded
+    print(f"[HBASE] Starting chunked telemetry data insertion ({sample_count(channels)} rows, {insert_chunk_rows} rows / {insert_chunk_bytes / (1024*1024):.0f} MB per chunk)")
+    st = time.time()
+    writer = create_writer(ibt_file_key, uuid_value, resume_from)
+    try:
+        logger.info(f"Starting telemetry data load for file: {ibt_file_key}")
+        writer.write(encoder.iter_rows(channels, start=resume_from, wire_format=hbase_wire_format))
+        insert_lap_index(ibt_file_key, uuid_value, metadata_values, laps)
+    except Exception as e:
+        logger.exception(f"Failed to load telemetry data: {str(e)}")
+        writer.close()
+        fail_file(result, "Telemetry load", e, rows_sent=writer.rows_sent)
+        result.update(bytes=writer.bytes_sent, seconds=time.time() - file_st)
+        return result
+    
+    et = time.time()
+    print(f"[HBASE] Successfully loaded telemetry data in {writer.chunks_sent} chunks. Execution time: {et - st:.2f} seconds ({writer.rows_sent / max(et - st, 1e-9):.0f} rows/s, {writer.bytes_sent / (1024*1024) / max(et - st, 1e-9):.2f} MB/s)")
+    logger.info(f"Successfully loaded telemetry data in {writer.chunks_sent} chunks. Execution time: {et - st:.2f} seconds")
+    
+    # Mark file as complete
+    mark_file_processing(table_tracking, ibt_file_key, 'complete', row_count=resume_from + writer.rows_sent)
+    print(f"[SUCCESS] File {ibt_file_key} processed successfully!")
+    result.update(status='complete', rows=writer.rows_sent, bytes=writer.bytes_sent, seconds=time.time() - file_st)
+    return result
+
+
+def run_sequential(files_to_process):
+    """
+    Process files one at a time in this process
+    """
+    results = []
+    for file_index, ibt_file_key in enumerate(files_to_process, 1):
+        results.append(process_file(ibt_file_key, file_index, len(files_to_process)))
+    return results
+
+
+def process_file_in_worker(ibt_file_key, file_index, file_count):
+    """
+    process_file in a pool worker - the HBase calls the worker made for the file travel back with the result
+    """
+    result = process_file(ibt_file_key, file_index, file_count)
+    result['hbase_calls'] = hbase_calls.snapshot(reset=True)
+    if hbase_gateways:
+        result['hbase_gateways'] = hbase_gateways.snapshot(reset=True)
+    return result
+
+
+def run_pool(files_to_process, workers):
+    """
+    Process files concurrently in a pool of worker processes (parsing and encoding are
+    CPU bound, so processes rather than threads). Each file is handled end to end by one worker.
+    """
+    print(f"[POOL] Starting {workers} worker processes for {len(files_to_process)} files")
+    logger.info(f"Starting {workers} worker processes for {len(files_to_process)} files")
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+        futures = {
+            pool.submit(process_file_in_worker, ibt_file_key, file_index, len(files_to_process)): ibt_file_key
+            for file_index, ibt_file_key in enumerate(files_to_process, 1)
+        }
+        for future in as_completed(futures):
+            ibt_file_key = futures[future]
+            try:
+                result = future.result()
+                hbase_calls.merge(result.pop('hbase_calls'))
+                if hbase_gateways:
+                    hbase_gateways.merge(result.pop('hbase_gateways'))
+            except Exception as e:
+                # worker died before it could record an outcome - don't leave the file 'processing'
+                print(f"[ERROR] Worker failed on file {ibt_file_key}: {str(e)}")
+                logger.exception(f"Worker failed on file {ibt_file_key}: {str(e)}")
+                mark_file_processing(table_tracking, ibt_file_key, 'failed', error_msg=f"worker failure: {str(e)}")
+                result = {'file': ibt_file_key, 'status': 'failed', 'rows': 0, 'resumed_rows': 0, 'bytes': 0, 'seconds': 0.0, 'error': str(e)}
+            results.append(result)
+            print(f"[POOL] {len(results)}/{len(futures)} finished: {ibt_file_key} ({result['status']}, {result['rows']} rows in {result['seconds']:.1f} seconds)")
+    return results
+
+
+class PipelineStats():
+    """
+    Per-stage busy time and queue occupancy for the pipelined loader.
+    Busy time is time spent doing work (not waiting on queues); occupancy is sampled
+    every time a stage takes an item off a queue.
+    """
+    def __init__(self, stages, queues):
+        self.stages = stages
+        self.queues = queues
+        self.busy = {stage: 0.0 for stage in stages}
+        self.items = {stage: 0 for stage in stages}
+        self.blocked = {name: 0.0 for name in queues}
+        self.samples = {name: [] for name in queues}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def timed(self, stage):
         st = time.time()
         try:
-            logger.info(f"Starting metadata load for file: {ibt_file_key}")
-            res = table_iracing.insert(hbase_meta_row)
-            print(f"[HBASE] Metadata insertion API call completed with status code: {res.status_code}")
-        except Exception as e:
-            print(f"[ERROR] Failed to load metadata: {str(e)}")
-            logger.exception(f"Failed to load metadata: {str(e)}")
-            mark_file_processing(table_iracing, ibt_file_key, 'failed', error_msg=str(e))
-            # Clean up temp file
-            if os.path.exists(local_file_path):
-                os.remove(local_file_path)
-            continue
-        
-        et = time.time()
-        if res.status_code == 200:
-            print(f"[HBASE] Successfully loaded metadata. Execution time: {et - st:.2f} seconds")
-            logger.info(f"Successfully loaded metadata. Execution time: {et - st:.2f} seconds")
-        else:
-            print(f"[ERROR] Failed to load metadata. Error code: {res.status_code}")
-            logger.error(f"Failed to load metadata. Error code: {res.status_code}")
-            mark_file_processing(table_iracing, ibt_file_key, 'failed', error_msg=f"HTTP {res.status_code}")
-            # Clean up temp file
-            if os.path.exists(local_file_path):
-                os.remove(local_file_path)
-            continue
-        
-        # Write telemetry data to HBase
-        print("[HBASE] Starting telemetry data insertion")
+            yield
+        finally:
+            with self.lock:
+                self.busy[stage] += time.time() - st
+                self.items[stage] += 1
+
+    def put(self, name, item):
+        # time blocked on a full queue is back-pressure from the next stage
         st = time.time()
-        try:
-            logger.info(f"Starting telemetry data load for file: {ibt_file_key}")
-            res = table_iracing.insert(hrows)
-            print(f"[HBASE] Telemetry data insertion API call completed with status code: {res.status_code}")
-        except Exception as e:
-            print(f"[ERROR] Failed to load telemetry data: {str(e)}")
-            logger.exception(f"Failed to load telemetry data: {str(e)}")
-            mark_file_processing(table_iracing, ibt_file_key, 'failed', error_msg=str(e))
-            # Clean up temp file
-            if os.path.exists(local_file_path):
-                os.remove(local_file_path)
-            continue
-        
-        et = time.time()
-        if res.status_code == 200:
-            print(f"[HBASE] Successfully loaded telemetry data. Execution time: {et - st:.2f} seconds")
-            logger.info(f"Successfully loaded telemetry data. Execution time: {et - st:.2f} seconds")
-            
-            # Mark file as complete
-            mark_file_processing(table_iracing, ibt_file_key, 'complete', row_count=len(df))
-            print(f"[SUCCESS] File {ibt_file_key} processed successfully!")
-            
+        self.queues[name].put(item)
+        with self.lock:
+            self.blocked[name] += time.time() - st
+
+    def get(self, name):
+        q = self.queues[name]
+        with self.lock:
+            self.samples[name].append(q.qsize())
+        return q.get()
+
+    def report(self, elapsed):
+        print("[PIPELINE] Stage breakdown:")
+        for stage in self.stages:
+            utilization = self.busy[stage] / elapsed * 100 if elapsed else 0
+            print(f"[PIPELINE]   {stage:<9} busy {self.busy[stage]:8.1f} seconds ({utilization:5.1f}% of wall time, {self.items[stage]} work items)")
+        print("[PIPELINE] Queue occupancy:")
+        for name, q in self.queues.items():
+            samples = self.samples[name] or [0]
+            full = sum(1 for size in samples if size >= q.maxsize) / len(samples) * 100
+            print(f"[PIPELINE]   {name:<10} avg {sum(samples) / len(samples):.1f}/{q.maxsize}, max {max(samples)}, full {full:.0f}% of reads, producer blocked {self.blocked[name]:.1f} seconds")
+        bottleneck = max(self.stages, key=lambda stage: self.busy[stage])
+        print(f"[PIPELINE] Busiest stage: {bottleneck}")
+        logger.info(f"Pipeline stage busy seconds: {self.busy}")
+
+
+def run_pipeline(files_to_process):
+    """
+    Process files through download -> parse -> encode -> insert stages running in their own
+    threads, connected by bounded queues. Each stage handles one file (or chunk) at a time,
+    so e.g. the next file downloads and parses while the current one is being encoded,
+    and encoded chunks are inserted while later chunks are still being encoded.
+    """
+    end = object()
+    queues = {
+        'downloaded': queue.Queue(maxsize=pipeline_file_queue),
+        'parsed': queue.Queue(maxsize=pipeline_file_queue),
+        'chunks': queue.Queue(maxsize=pipeline_chunk_queue)
+    }
+    stats = PipelineStats(['download', 'parse', 'encode', 'insert'], queues)
+    results = []
+    fail_lock = threading.Lock()
+
+    def fail_job(job, stage, error, source=None):
+        """
+        fail_file for a pipeline job, once: the encode and insert stages can both hit an error for
+        the same file, only the first is recorded. The file's writer (owned by the insert stage, which
+        is where failures of a file with a writer are recorded) is closed first, so no chunk of the
+        file is still being inserted. Returns whether this call recorded it
+        """
+        with fail_lock:
+            first = not job['failed']
+            job['failed'] = True
+        if first:
+            writer = job.get('writer')
+            if writer is not None:
+                writer.close()
+            fail_file(job['result'], stage, error, rows_sent=writer.rows_sent if writer else 0, source=source)
         else:
-            print(f"[ERROR] Failed to load telemetry data. Error code: {res.status_code}")
-            logger.error(f"Failed to load telemetry data. Error code: {res.status_code}")
-            mark_file_processing(table_iracing, ibt_file_key, 'failed', error_msg=f"HTTP {res.status_code}")
-        
-        # Clean up temp file
-        if os.path.exists(local_file_path):
-            print(f"[CLEANUP] Removing temp file: {local_file_path}")
-            os.remove(local_file_path)
-            
+            release_source(source)
+        return first
+    print(f"[PIPELINE] Starting staged pipeline for {len(files_to_process)} files")
+    logger.info(f"Starting staged pipeline for {len(files_to_process)} files")
+
+    def download_stage():
+        try:
+            for file_index, ibt_file_key in enumerate(files_to_process, 1):
+                job = {
+                    'result': {'file': ibt_file_key, 'status': 'failed', 'rows': 0, 'resumed_rows': 0, 'bytes': 0, 'seconds': 0.0, 'error': ''},
+                    'index': file_index, 'start': time.time(), 'failed': False, 'source': None
+                }
+                results.append(job['result'])
+                print(f"[PIPELINE] File {file_index}/{len(files_to_process)}: {ibt_file_key}")
+                try:
+                    with stats.timed('download'):
+                        job['source'] = download_file(ibt_file_key, file_index)
+                except Exception as e:
+                    fail_job(job, "Download", e, source=job['source'])
+                    continue
+                stats.put('downloaded', job)
+        finally:
+            stats.put('downloaded', end)
+
+    def parse_stage():
+        try:
+            while True:
+                job = stats.get('downloaded')
+                if job is end:
+                    break
+                try:
+                    with stats.timed('parse'):
+                        job['channels'], job['metadata'], job['uuid'] = parse_file(job['source'], job['result']['file'])
+                    release_source(job.pop('source'))
+                except Exception as e:
+                    fail_job(job, "Parse", e, source=job.get('source'))
+                    continue
+                stats.put('parsed', job)
+        finally:
+            stats.put('parsed', end)
+
+    def encode_stage():
+        try:
+            while True:
+                job = stats.get('parsed')
+                if job is end:
+                    break
+                ibt_file_key = job['result']['file']
+                try:
+                    uuid_value = job['uuid']
+                    print(f"[PROCESSING] {ibt_file_key} using UUID: {uuid_value}")
+                    # a tracking table read, not encoding work
+                    job['resume_from'] = get_checkpoint(ibt_file_key, uuid_value)
+                    job['result']['resumed_rows'] = job['resume_from']
+                    with stats.timed('encode'):
+                        job['laps'] = compute_lap_index(job['channels']) if lap_index_enabled else []
+                        meta_row = build_metadata_row(uuid_value, ibt_file_key, job['metadata'])
+                        encoder = create_encoder(job['channels'], uuid_value, ibt_file_key, job['metadata'])
+                        fragments = encoder.iter_rows(job.pop('channels'), start=job['resume_from'], wire_format=hbase_wire_format)
+                    stats.put('chunks', ('metadata', job, meta_row))
+                    while not job['failed']:
+                        with stats.timed('encode'):
+                            item = next(fragments, None)
+                        if item is None:
+                            break
+                        stats.put('chunks', ('rows', job, item))
+                except Exception as e:
+                    # recorded by the insert stage, after the chunks already queued for the file
+                    stats.put('chunks', ('failed', job, e))
+                    continue
+                stats.put('chunks', ('done', job, None))
+        finally:
+            stats.put('chunks', end)
+
+    def insert_stage():
+        while True:
+            item = stats.get('chunks')
+            if item is end:
+                break
+            kind, job, payload = item
+            if job['failed']:
+                continue
+            result = job['result']
+            writer = job.get('writer')
+            if kind == 'failed':
+                fail_job(job, "Encode", payload)
+                continue
+            try:
+                with stats.timed('insert'):
+                    if kind == 'metadata':
+                        insert_metadata(result['file'], payload)
+                        job['writer'] = create_writer(result['file'], job['uuid'], job['resume_from'])
+                    elif kind == 'rows':
+                        chunk_start, chunk_stop, fragment = payload
+                        writer.add(fragment, chunk_stop - chunk_start)
+                    else:
+                        writer.flush()
+                        insert_lap_index(result['file'], job['uuid'], job['metadata'], job['laps'])
+                        mark_file_processing(table_tracking, result['file'], 'complete', row_count=job['resume_from'] + writer.rows_sent)
+                        result.update(status='complete', rows=writer.rows_sent, bytes=writer.bytes_sent, seconds=time.time() - job['start'])
+                        print(f"[SUCCESS] File {result['file']} processed successfully! ({writer.rows_sent} rows in {writer.chunks_sent} chunks, {job['resume_from']} resumed)")
+            except Exception as e:
+                # stop the encode stage feeding this file and drop anything already queued
+                if fail_job(job, "Insert", e):
+                    result.update(bytes=writer.bytes_sent if writer else 0, seconds=time.time() - job['start'])
+
+    run_st = time.time()
+    threads = [threading.Thread(target=stage, name=stage.__name__) for stage in (download_stage, parse_stage, encode_stage, insert_stage)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats.report(time.time() - run_st)
+    return results
+
+
+def print_summary(results, elapsed):
+    """
+    Combined progress and throughput summary for the run
+    """
+    complete = [r for r in results if r['status'] == 'complete']
+    failed = [r for r in results if r['status'] != 'complete']
+    total_rows = sum(r['rows'] for r in results)
+    resumed_rows = sum(r.get('resumed_rows', 0) for r in results)
+    total_mb = sum(r['bytes'] for r in results) / (1024*1024)
+    busy = sum(r['seconds'] for r in results)
+    print(f"Files complete: {len(complete)}/{len(results)}, failed: {len(failed)}")
+    resumed_note = f", plus {resumed_rows} resumed from earlier runs" if resumed_rows else ""
+    print(f"Rows loaded: {total_rows} ({total_mb:.2f} MB of payload{resumed_note})")
+    print(f"Wall time: {elapsed:.1f} seconds, summed file time: {busy:.1f} seconds")
+    if elapsed > 0:
+        print(f"Throughput: {len(results) / elapsed * 60:.2f} files/min, {total_rows / elapsed:.0f} rows/s, {total_mb / elapsed:.2f} MB/s")
+    for r in failed:
+        print(f"  FAILED {r['file']}: {r['error']}")
+    logger.info(f"Loaded {len(complete)}/{len(results)} files, {total_rows} rows in {elapsed:.1f} seconds")
+
+
+def main():
+    global minio_client, table_iracing, table_tracking, table_lap_index
+
+    ### Initialize MinIO client
+    print(f"[MINIO] Initializing MinIO client for endpoint: {minio_endpoint}")
+    try:
+        minio_client = create_minio_client()
+        print("[MINIO] MinIO client initialized successfully")
+        logger.info("MinIO client initialized")
     except Exception as e:
-        print(f"[ERROR] Exception processing file {ibt_file_key}: {str(e)}")
-        logger.exception(f"Exception processing file {ibt_file_key}: {str(e)}")
-        mark_file_processing(table_iracing, ibt_file_key, 'failed', error_msg=str(e))
-        
-        # Clean up temp file if it exists
-        if os.path.exists(local_file_path):
-            print(f"[CLEANUP] Removing temp file: {local_file_path}")
-            os.remove(local_file_path)
-        
-        continue
+        print(f"[ERROR] Failed to initialize MinIO client: {str(e)}")
+        logger.exception(f"Failed to initialize MinIO client: {str(e)}")
+        sys.exit(1)
+
+
+    ### Initialize HBase table connection
+    print(f"[HBASE] Instantiating HBaseRestTable for table: {datafabric_volume_mount_path}/{table_name}")
+    table_iracing = create_table_client()
+    table_tracking = create_tracking_client()
+    table_lap_index = create_lap_index_client()
+    print("[HBASE] HBaseRestTable instantiated successfully")
+
+
+    ### Get list of IBT files from MinIO bucket
+    detect_st = time.time()
+    print(f"[MINIO] Listing .ibt files in bucket: {minio_bucket}")
+    try:
+        bucket_objects = list_bucket_objects()
+        ibt_files_in_bucket = list(bucket_objects)
+
+        print(f"[MINIO] Total .ibt files found: {len(ibt_files_in_bucket)}")
+        logger.info(f"Found {len(ibt_files_in_bucket)} .ibt files in bucket")
+
+    except S3Error as e:
+        print(f"[ERROR] Failed to list objects in bucket: {str(e)}")
+        logger.exception(f"Failed to list objects in bucket: {str(e)}")
+        sys.exit(1)
+
+
+    ### Get list of already processed files
+    bootstrap = False
+    if incremental_enabled:
+        manifest = get_manifest(table_tracking)
+        if not manifest:
+            # first incremental run - carry over the status rows kept in the telemetry table
+            bootstrap = True
+            print("[HBASE] Empty manifest - importing file status from the telemetry table")
+            for filename, status in get_processed_files(table_iracing).items():
+                manifest.setdefault(filename, {'status': status})
+    else:
+        manifest = {filename: {'status': status} for filename, status in get_processed_files(table_iracing).items()}
+    print(f"[HBASE] Previously processed files: {len(manifest)}")
+
+
+    ### Determine which files need to be processed
+    # (deduplicated so no file is ever handed to two workers)
+    files_to_process = list(dict.fromkeys(f for f in ibt_files_in_bucket if needs_processing(f, bucket_objects[f], manifest)))
+    print(f"[PROCESSING] Files to process: {len(files_to_process)} (change detection took {time.time() - detect_st:.2f} seconds)")
+
+    if len(files_to_process) == 0:
+        if incremental_enabled:
+            update_manifest(bucket_objects, manifest, [], bootstrap)
+        print("[PROCESSING] No new files to process. Exiting.")
+        logger.info("No new files to process")
+        scan_batch_sizer.save()
+        sys.exit(0)
+
+
+    ### Process files (in parallel worker processes, as a staged pipeline, or one at a time)
+    run_st = time.time()
+    if worker_count > 1 and len(files_to_process) > 1:
+        results = run_pool(files_to_process, min(worker_count, len(files_to_process)))
+    elif pipeline_enabled:
+        results = run_pipeline(files_to_process)
+    else:
+        results = run_sequential(files_to_process)
+    run_elapsed = time.time() - run_st
+    
+    if incremental_enabled:
+        update_manifest(bucket_objects, manifest, results, bootstrap)
+    
+    print("\n" + "="*60)
+    print("====== MOTORSPORT DATA LOADING COMPLETE ======")
+    print(f"Processed {len(files_to_process)} files")
+    print_summary(results, run_elapsed)
+    print("HBase REST calls:")
+    print(hbase_calls.report())
+    if hbase_gateways:
+        print("HBase REST gateways:")
+        print(hbase_gateways.report())
+    scan_batch_sizer.save()
+    print("Script execution completed at:", time.strftime("%Y-%m-%d %H:%M:%S"))
+    print("="*60)
+
 
-print("\n" + "="*60)
-print("====== MOTORSPORT DATA LOADING COMPLETE ======")
-print(f"Processed {len(files_to_process)} files")
-print("Script execution completed at:", time.strftime("%Y-%m-%d %H:%M:%S"))
-print("="*60)
\ No newline at end of file
+if __name__ == '__main__':
+    main()
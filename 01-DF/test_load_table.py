@@ -0,0 +1,149 @@
+"""
+Tests of the loader (df_load_table) against the local stand-in gateway (HbaseRestServer):
+lap index, chunk checkpoints and the file manifest
+
+Usage:
+    python -m pytest -q test_load_table.py
+"""
+
+import os
+import sys
+from itertools import islice
+import numpy as np
+import pytest
+import HbaseRest
+from HbaseEncoder import TelemetryRowEncoder, SampleBlockEncoder
+from HbaseRest import HBaseRestTable
+from HbaseRestServer import HBaseRestServer
+
+
+@pytest.fixture(scope="module")
+def loader(tmp_path_factory):
+    """df_load_table, imported in a scratch directory (it creates its log and temp directories on import)"""
+    pytest.importorskip("minio")
+    # the loader imports the client as HBaseRest (HbaseRest.py on a case-insensitive file system)
+    sys.modules.setdefault("HBaseRest", HbaseRest)
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("loader"))
+    try:
+        import df_load_table
+    finally:
+        os.chdir(cwd)
+    return df_load_table
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = HBaseRestServer(tls=False).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def tables(loader, server, monkeypatch, request):
+    """Empty main, tracking and lap index tables named after the test, set as the loader's clients"""
+    clients = {}
+    for name in ("table_iracing", "table_tracking", "table_lap_index"):
+        path = f"/test/{request.node.name}/{name}"
+        server.store.create_table(path)
+        clients[name] = HBaseRestTable('mapr', 'mapr', server.host, server.host, str(server.port), path)
+        clients[name].url = server.url
+        # set by main() / init_worker() in a run
+        monkeypatch.setattr(loader, name, clients[name], raising=False)
+    yield clients
+    for client in clients.values():
+        client.close()
+
+
+def stored_keys(server, table):
+    return server.store.table(table.table.replace("%2F", "/")).keys
+
+
+METADATA = {
+    'WeekendInfo_TrackID': '163', 'DriverInfo_Username': 'D', 'DriverInfo_Drivers_CarScreenName': 'Car',
+    'DriverInfo_Drivers_CarNumber': '7', 'WeekendInfo_TrackDisplayName': 'Spa', 'WeekendInfo_WeekendOptions_Date': '2024-01-01'
+}
+
+
+def test_compute_lap_index_with_a_lap_reported_again(loader):
+    # lap 1 comes back after lap 2 (eg. a reset in the pits)
+    channels = {
+        'Lap':               [0, 0, 1, 1, 1, 2, 2, 1, 1, 3, 3],
+        'LapLastLapTime':    [0, 0, 0, 0, 0, 95, 95, 0, 0, 93, 93],
+        'LapCurrentLapTime': [10, 20, 31, 61, 91, 40, 80, 20, 25, 5, 6],
+    }
+    laps = loader.compute_lap_index(channels)
+    # lap times come from the next lap's LapLastLapTime; a lap's samples are its longest contiguous run
+    assert laps == [
+        {'lap_number': 0, 'lap_time': None, 'first_sample': 0, 'last_sample': 1, 'sample_count': 2},
+        {'lap_number': 1, 'lap_time': 95.0, 'first_sample': 2, 'last_sample': 4, 'sample_count': 3},
+        {'lap_number': 2, 'lap_time': 93.0, 'first_sample': 5, 'last_sample': 6, 'sample_count': 2},
+        {'lap_number': 3, 'lap_time': None, 'first_sample': 9, 'last_sample': 10, 'sample_count': 2},
+    ]
+
+
+def test_lap_index_session_row_without_laps(loader, tables, server):
+    loader.insert_lap_index("a.ibt", "u", METADATA, [])
+    assert stored_keys(server, tables["table_lap_index"]) == [b"163:u:session"]
+    assert tables["table_lap_index"].get_row("163:u:session")["lap_count"] == "0"
+
+
+def test_checkpoint_resume(loader, tables, server, monkeypatch):
+    monkeypatch.setattr(loader, "storage_layout", "rows")
+    data = {"Speed": np.arange(25.0)}
+    encoder = TelemetryRowEncoder("telemetry", ["Speed"], "u:", chunk_rows=10)
+    assert loader.get_checkpoint("a.ibt", "u") == 0
+
+    # a run interrupted after two chunks
+    writer = loader.create_writer("a.ibt", "u")
+    writer.write(islice(encoder.iter_rows(data), 2))
+    assert loader.get_checkpoint("a.ibt", "u") == 20
+    # another session id means the file changed, so it is loaded from the start
+    assert loader.get_checkpoint("a.ibt", "other") == 0
+
+    writer = loader.create_writer("a.ibt", "u", resume_from=20)
+    writer.write(encoder.iter_rows(data, start=20))
+    assert writer.rows_sent == 5
+    assert loader.get_checkpoint("a.ibt", "u") == 25
+    assert len(stored_keys(server, tables["table_iracing"])) == 25
+
+
+def test_checkpoint_resume_blocks_layout(loader, tables, server, monkeypatch):
+    monkeypatch.setattr(loader, "storage_layout", "blocks")
+    monkeypatch.setattr(loader, "block_samples", 10)
+    data = {"Speed": np.arange(25.0)}
+    encoder = SampleBlockEncoder("telemetry", ["Speed"], "u:", block_samples=10)
+
+    # eg. committed by a run with the row layout: blocks are written whole, so resuming starts at the block boundary
+    loader.save_checkpoint("b.ibt", "u", 23)
+    resume_from = loader.get_checkpoint("b.ibt", "u")
+    assert resume_from == 20
+    writer = loader.create_writer("b.ibt", "u", resume_from)
+    writer.write(encoder.iter_rows(data, start=resume_from))
+    assert writer.rows_sent == 5
+    # the partial last block is read back whole too
+    assert loader.get_checkpoint("b.ibt", "u") == 20
+    assert stored_keys(server, tables["table_iracing"]) == [b"u:000002"]
+
+
+def test_manifest(loader, tables):
+    tracking = tables["table_tracking"]
+    objects = {name: {'etag': f"etag-{name}", 'size': size} for name, size in (("a.ibt", 10), ("b.ibt", 20), ("c.ibt", 30))}
+    # a and c were handled by this run, b completed in a run before the manifest existed
+    for name, status in (("a.ibt", "complete"), ("b.ibt", "complete"), ("c.ibt", "failed")):
+        assert tracking.insert('{"Row":[' + loader.build_tracking_row(f"file:{name}", {'status': status}) + ']}').status_code == 200
+    manifest = loader.get_manifest(tracking)
+    assert not loader.needs_processing("b.ibt", objects["b.ibt"], manifest)
+
+    loader.update_manifest(objects, manifest, [{'file': 'a.ibt', 'status': 'complete'}, {'file': 'c.ibt', 'status': 'failed'}], bootstrap=True)
+    manifest = loader.get_manifest(tracking)
+    assert {name: (entry.get('etag'), entry.get('size')) for name, entry in manifest.items()} == {
+        name: (info['etag'], str(info['size'])) for name, info in objects.items()
+    }
+    assert not loader.needs_processing("a.ibt", objects["a.ibt"], manifest)
+    assert not loader.needs_processing("b.ibt", objects["b.ibt"], manifest)
+    # changed, failed and new files are (re)loaded
+    assert loader.needs_processing("a.ibt", {'etag': "etag-new", 'size': 10}, manifest)
+    assert loader.needs_processing("a.ibt", {'etag': "etag-a.ibt", 'size': 11}, manifest)
+    assert loader.needs_processing("c.ibt", objects["c.ibt"], manifest)
+    assert loader.needs_processing("d.ibt", {'etag': "etag-d.ibt", 'size': 40}, manifest)